@@ -0,0 +1,117 @@
+import os
+import hashlib
+import logging
+from pathlib import Path
+
+# youtube_video_id() 从链接中取得的ID属于该提取器
+YOUTUBE_EXTRACTOR = 'youtube'
+
+# 决定下载结果的参数，不同的格式（如视频和仅音频）分别记录
+_FORMAT_OPTIONS = ("-f", "--audio-format", "--merge-output-format", "--remux-video", "--recode-video")
+
+
+def format_key(args):
+    """从下载参数中取得格式相关的部分，默认格式时为空字符串"""
+    parts = []
+    for i, arg in enumerate(args):
+        if arg in _FORMAT_OPTIONS and i + 1 < len(args):
+            parts.append(f"{arg} {args[i + 1]}")
+        elif arg == "-x":
+            parts.append(arg)
+    return " ".join(parts)
+
+
+class DownloadArchive:
+    """每个下载目录一份 yt-dlp 下载记录（--download-archive）
+
+    文件由 yt-dlp 在下载完成后追加，每行为“提取器 视频ID”（如 youtube dQw4w9WgXcQ）。
+    这里按目录缓存其内容，文件变化（大小或修改时间）后才重新读取，
+    调度器可以在启动进程之前判断链接是否已经下载过。
+    记录只包含视频ID，因此同一目录中每种格式（format_key()）使用单独的记录文件，
+    换一种格式下载同一个视频时不会被当作已下载。
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._cache = {}  # 记录文件 -> ((大小, 修改时间), 已下载的视频集合)
+
+    def _root_digest(self, root):
+        root = os.path.normpath(os.path.abspath(os.path.expanduser(root)))
+        return hashlib.sha1(root.encode('utf-8')).hexdigest()[:16]
+
+    def archive_file(self, root, fmt=""):
+        """下载目录和格式对应的记录文件（以目录路径和格式的哈希命名）"""
+        digest = self._root_digest(root)
+        if fmt:
+            digest += "-" + hashlib.sha1(fmt.encode('utf-8')).hexdigest()[:8]
+        return self.archive_dir / f"{digest}.txt"
+
+    def _entries(self, root, fmt=""):
+        path = self.archive_file(root, fmt)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return set()
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        entries = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entries.add(line)
+        except OSError as e:
+            logging.warning(f"读取下载记录失败 {path}: {e}")
+        self._cache[path] = (signature, entries)
+        return entries
+
+    def contains(self, root, extractor, video_id, fmt=""):
+        """视频是否已经以该格式记录在该目录的下载记录中"""
+        if not video_id:
+            return False
+        return f"{extractor.lower()} {video_id}" in self._entries(root, fmt)
+
+    def add(self, root, extractor, video_id, fmt=""):
+        """追加一条记录（例如在下载目录中已经找到了文件）"""
+        if not video_id or self.contains(root, extractor, video_id, fmt):
+            return
+        try:
+            with open(self.archive_file(root, fmt), 'a', encoding='utf-8') as f:
+                f.write(f"{extractor.lower()} {video_id}\n")
+        except OSError as e:
+            logging.warning(f"写入下载记录失败: {e}")
+
+    def count(self, root, fmt=""):
+        return len(self._entries(root, fmt))
+
+    def clear(self, root):
+        """删除该目录所有格式的下载记录，返回删除的记录条数"""
+        digest = self._root_digest(root)
+        paths = [self.archive_dir / f"{digest}.txt"] + list(self.archive_dir.glob(f"{digest}-*.txt"))
+        removed = 0
+        for path in paths:
+            if not path.exists():
+                continue
+            self._cache.pop(path, None)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    removed += sum(1 for line in f if line.strip())
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"删除下载记录失败 {path}: {e}")
+        return removed
+
+
+_shared_archive = None
+
+
+def get_download_archive(config):
+    """获取全局共享的下载记录"""
+    global _shared_archive
+    if _shared_archive is None:
+        _shared_archive = DownloadArchive(config.config_dir / "archives")
+    return _shared_archive
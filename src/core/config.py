@@ -3,35 +3,50 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, QCoreApplication, pyqtSignal
+from .logging_setup import setup_logging, set_log_level, DEFAULT_LOG_LEVEL
 
-class Config:
+# 修改配置后延迟写入的时间（毫秒），期间的多次修改合并为一次写入
+SAVE_DELAY_MS = 250
+
+class Config(QObject):
+    """全局配置，通过 get_config() 获取共享实例"""
+    changed = pyqtSignal(str, object)  # key, value
+    
     def __init__(self):
+        super().__init__()
         # macOS配置目录
         self.config_dir = Path.home() / "Library" / "Application Support" / "YT-DLP-GUI"
         self.config_file = self.config_dir / "config.json"
         self.log_file = self.config_dir / "debug.log"
         self.ensure_config_dir()
         
-        # 初始化日志
-        self.setup_logging()
+        # 写入在单独的线程中按顺序进行，不阻塞界面
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-writer")
+        self._save_timer = None
+        self._pending_write = None
         
         self.load_config()
         
+        # 初始化日志
+        self.setup_logging()
+        self.changed.connect(self._on_changed)
+        
     def ensure_config_dir(self):
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
     def setup_logging(self):
-        """设置日志"""
-        logging.basicConfig(
-            filename=self.log_file,
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        """设置日志，级别由配置 log_level 决定（默认 INFO）"""
+        setup_logging(self.log_file, self.config.get('log_level', DEFAULT_LOG_LEVEL))
         
-    def log(self, message, level=logging.INFO):
-        """记录日志"""
-        logging.log(level, message)
+    def _on_changed(self, key, value):
+        if key == 'log_level':
+            set_log_level(value)
+        
+    def log(self, message, level=logging.INFO, *args):
+        """记录日志；message 可以带 % 占位符，参数只在需要输出时才格式化"""
+        logging.log(level, message, *args)
         
     def load_config(self):
         if self.config_file.exists():
@@ -49,18 +64,63 @@ class Config:
                 'format_settings': {
                     'mode': 'best',  # best, audio_only, custom
                     'custom_format': ''
-                },
-                'download_history': []
+                }
             }
             self.save_config()
             
+    def set(self, key, value):
+        """修改一项配置，通知其他使用者并安排保存"""
+        if self.config.get(key) == value:
+            return
+        self.config[key] = value
+        self.changed.emit(key, value)
+        self.save_config()
+            
     def save_config(self):
+        """安排保存配置，实际写入在短暂延迟后于后台线程进行"""
+        if QCoreApplication.instance() is None:
+            # 没有事件循环时无法延迟，直接写入
+            self._write(json.dumps(self.config, indent=4))
+            return
+        if self._save_timer is None:
+            self._save_timer = QTimer(self)
+            self._save_timer.setSingleShot(True)
+            self._save_timer.setInterval(SAVE_DELAY_MS)
+            self._save_timer.timeout.connect(self._write_behind)
+        self._save_timer.start()
+        
+    def flush(self):
+        """立即写入尚未保存的修改并等待完成（退出程序前调用）"""
+        if self._save_timer is not None and self._save_timer.isActive():
+            self._save_timer.stop()
+            self._write_behind()
+        if self._pending_write is not None:
+            self._pending_write.result()
+            self._pending_write = None
+            
+    def _write_behind(self):
+        # 在主线程中生成快照，写文件交给后台线程
+        data = json.dumps(self.config, indent=4)
+        self._pending_write = self._writer.submit(self._write, data)
+        
+    def _write(self, data):
         try:
             # 创建临时文件
             temp_file = self.config_file.with_suffix('.tmp')
             with open(temp_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
+                f.write(data)
             # 成功写入后才替换原文件
             temp_file.replace(self.config_file)
         except Exception as e:
-            print(f"保存配置文件失败: {e}") 
\ No newline at end of file
+            print(f"保存配置文件失败: {e}")
+
+
+_shared_config = None
+
+
+def get_config():
+    """获取全局共享的配置，第一次调用时读取配置文件"""
+    global _shared_config
+    if _shared_config is None:
+        _shared_config = Config()
+    return _shared_config 
\ No newline at end of file
@@ -0,0 +1,245 @@
+from PyQt6.QtCore import QObject, QProcess, pyqtSignal
+import os
+import re
+import sys
+import json
+import time
+import logging
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+# 缓存的 cookies 文件默认有效期（秒）
+DEFAULT_COOKIE_TTL = 30 * 60
+
+# 各浏览器 cookies 数据库的位置，用于在浏览器写入新 cookies 后让缓存失效
+if sys.platform == 'darwin':
+    BROWSER_COOKIE_DBS = {
+        'safari': [
+            "~/Library/Containers/com.apple.Safari/Data/Library/Cookies/Cookies.binarycookies",
+            "~/Library/Cookies/Cookies.binarycookies",
+        ],
+        'chrome': [
+            "~/Library/Application Support/Google/Chrome/Default/Network/Cookies",
+            "~/Library/Application Support/Google/Chrome/Default/Cookies",
+        ],
+        'edge': [
+            "~/Library/Application Support/Microsoft Edge/Default/Network/Cookies",
+            "~/Library/Application Support/Microsoft Edge/Default/Cookies",
+        ],
+    }
+else:
+    BROWSER_COOKIE_DBS = {
+        'chrome': [
+            "%LOCALAPPDATA%/Google/Chrome/User Data/Default/Network/Cookies",
+            "%LOCALAPPDATA%/Google/Chrome/User Data/Default/Cookies",
+        ],
+        'edge': [
+            "%LOCALAPPDATA%/Microsoft/Edge/User Data/Default/Network/Cookies",
+            "%LOCALAPPDATA%/Microsoft/Edge/User Data/Default/Cookies",
+        ],
+    }
+
+
+def private_copy(path):
+    """复制一份 cookies 文件给单个进程使用，返回副本路径，失败时返回 None
+
+    yt-dlp 退出时会把 cookies 写回 --cookies 指定的文件，多个进程共用缓存文件时会互相覆盖，
+    启动中的进程还可能读到写了一半的文件。缓存文件只由导出进程写入。
+    """
+    jobs_dir = Path(path).parent / "jobs"
+    try:
+        jobs_dir.mkdir(mode=0o700, exist_ok=True)
+        fd, copy = tempfile.mkstemp(prefix=f"{Path(path).stem}.", suffix=".txt", dir=jobs_dir)
+        with os.fdopen(fd, 'wb') as target, open(path, 'rb') as source:
+            shutil.copyfileobj(source, target)
+        return copy
+    except OSError as e:
+        logging.warning(f"复制 cookies 文件失败: {e}")
+        return None
+
+
+def remove_copy(copy):
+    """进程结束后删除 private_copy() 创建的副本"""
+    if copy:
+        try:
+            os.remove(copy)
+        except OSError:
+            pass
+
+
+class CookieJarCache(QObject):
+    """把浏览器 cookies 导出为私有的 Netscape cookies 文件，供所有任务通过 --cookies 复用
+
+    浏览器数据库更新或超过有效期后重新导出；导出失败时退回 --cookies-from-browser。
+    """
+    extraction_finished = pyqtSignal(str, bool)  # browser, success
+
+    def __init__(self, cache_dir, ttl=DEFAULT_COOKIE_TTL):
+        super().__init__()
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        os.chmod(self.cache_dir, 0o700)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._blocking_lock = threading.Lock()  # 同时分析多个链接时只导出一次
+        self._entries = {}  # browser -> {'created': 导出时间, 'source_mtime': 数据库修改时间}
+        self._failed = {}  # browser -> 最近一次导出失败的时间
+        self._processes = {}  # browser -> 正在导出的 QProcess
+        self._load_entries()
+        # 上次异常退出时留下的进程副本
+        for leftover in (self.cache_dir / "jobs").glob("*.txt"):
+            remove_copy(leftover)
+
+    def _safe_name(self, browser):
+        # 浏览器参数可能带有配置文件路径，如 "chrome:Profile 1"
+        return re.sub(r'[^\w.-]', '_', browser)
+
+    def cookie_file(self, browser):
+        return self.cache_dir / f"{self._safe_name(browser)}.txt"
+
+    def _meta_file(self, browser):
+        return self.cache_dir / f"{self._safe_name(browser)}.json"
+
+    def _load_entries(self):
+        """读取上次会话留下的缓存信息，仍在有效期内的可以直接使用"""
+        for meta_file in self.cache_dir.glob("*.json"):
+            try:
+                with open(meta_file, 'r') as f:
+                    entry = json.load(f)
+                self._entries[entry['browser']] = entry
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def _source_mtime(self, browser):
+        """浏览器 cookies 数据库的修改时间，找不到时返回 None（此时只按有效期判断）"""
+        for path in BROWSER_COOKIE_DBS.get(browser, []):
+            try:
+                return os.stat(os.path.expandvars(os.path.expanduser(path))).st_mtime
+            except OSError:
+                continue
+        return None
+
+    def is_valid(self, browser):
+        """缓存文件存在、未过期且浏览器数据库没有更新"""
+        with self._lock:
+            entry = self._entries.get(browser)
+        if not entry or not self.cookie_file(browser).exists():
+            return False
+        if time.time() - entry['created'] > self.ttl:
+            return False
+        source_mtime = self._source_mtime(browser)
+        if source_mtime is not None and entry.get('source_mtime') is not None:
+            return source_mtime <= entry['source_mtime']
+        return True
+
+    def cookie_args(self, browser):
+        """任务启动时使用的 cookies 参数"""
+        if self.is_valid(browser):
+            return ["--cookies", str(self.cookie_file(browser))]
+        return ["--cookies-from-browser", browser]
+
+    def process_cookie_args(self, browser):
+        """单个 yt-dlp 进程使用的 cookies 参数，返回 (参数, 副本路径)
+
+        使用缓存时给进程一份自己的副本，进程结束后用 remove_copy() 删除；没有副本时路径为 None。
+        """
+        if self.is_valid(browser):
+            copy = private_copy(self.cookie_file(browser))
+            if copy:
+                return ["--cookies", copy], copy
+        return ["--cookies-from-browser", browser], None
+
+    def request(self, browser, binary_path):
+        """确保缓存可用，必要时开始异步导出
+
+        返回 ready（可以使用缓存）、extracting（等待 extraction_finished）
+        或 unavailable（导出失败，调用方应退回 --cookies-from-browser）
+        """
+        if self.is_valid(browser):
+            return 'ready'
+        if browser in self._processes:
+            return 'extracting'
+        failed_at = self._failed.get(browser)
+        if failed_at is not None and time.time() - failed_at < self.ttl:
+            return 'unavailable'
+
+        process = QProcess(self)
+        source_mtime = self._source_mtime(browser)
+        temp_file = self.cookie_file(browser).with_suffix('.tmp')
+        process.finished.connect(
+            lambda code, status: self._handle_finished(process, browser, temp_file, source_mtime))
+        process.errorOccurred.connect(
+            lambda error: self._handle_error(process, browser, error))
+        self._processes[browser] = process
+        logging.info(f"开始导出 {browser} cookies")
+        process.start(binary_path, self._extract_args(browser, temp_file))
+        return 'extracting'
+
+    def ensure_blocking(self, browser, binary_path, timeout=60000):
+        """在工作线程中同步导出并返回 cookies 参数（用于格式分析）"""
+        with self._blocking_lock:
+            failed_at = self._failed.get(browser)
+            recently_failed = failed_at is not None and time.time() - failed_at < self.ttl
+            if not self.is_valid(browser) and not recently_failed:
+                temp_file = self.cache_dir / f"{self._safe_name(browser)}.analyze.tmp"
+                source_mtime = self._source_mtime(browser)
+                process = QProcess()
+                process.start(binary_path, self._extract_args(browser, temp_file))
+                process.waitForFinished(timeout)
+                self._store(browser, temp_file, source_mtime)
+        return self.cookie_args(browser)
+
+    def _extract_args(self, browser, temp_file):
+        # 不提供 URL 时 yt-dlp 会报错退出，但退出前仍会把 cookies 写入 --cookies 指定的文件
+        return ["--cookies-from-browser", browser, "--cookies", str(temp_file), "--no-warnings"]
+
+    def _store(self, browser, temp_file, source_mtime):
+        """导出成功时把临时文件替换为正式缓存，返回是否成功"""
+        if not temp_file.exists() or temp_file.stat().st_size == 0:
+            with self._lock:
+                self._failed[browser] = time.time()
+            logging.warning(f"导出 {browser} cookies 失败，将直接从浏览器读取")
+            return False
+        os.chmod(temp_file, 0o600)
+        temp_file.replace(self.cookie_file(browser))
+        entry = {'browser': browser, 'created': time.time(), 'source_mtime': source_mtime}
+        with self._lock:
+            self._entries[browser] = entry
+            self._failed.pop(browser, None)
+        try:
+            with open(self._meta_file(browser), 'w') as f:
+                json.dump(entry, f)
+        except OSError as e:
+            logging.warning(f"保存 cookies 缓存信息失败: {e}")
+        logging.info(f"{browser} cookies 已导出到缓存")
+        return True
+
+    def _handle_finished(self, process, browser, temp_file, source_mtime):
+        self._processes.pop(browser, None)
+        process.deleteLater()
+        success = self._store(browser, temp_file, source_mtime)
+        self.extraction_finished.emit(browser, success)
+
+    def _handle_error(self, process, browser, error):
+        if error != QProcess.ProcessError.FailedToStart:
+            return
+        self._processes.pop(browser, None)
+        with self._lock:
+            self._failed[browser] = time.time()
+        self.extraction_finished.emit(browser, False)
+
+
+_shared_cookie_cache = None
+
+
+def get_cookie_cache(config):
+    """获取全局共享的 cookies 缓存，第一次调用时创建"""
+    global _shared_cookie_cache
+    if _shared_cookie_cache is None:
+        _shared_cookie_cache = CookieJarCache(
+            config.config_dir / "cookies",
+            config.config.get('cookie_cache_ttl', DEFAULT_COOKIE_TTL)
+        )
+    return _shared_cookie_cache
@@ -2,19 +2,97 @@ from PyQt6.QtCore import QObject, QProcess, pyqtSignal, QProcessEnvironment
 import shlex
 import sys
 import os
+import re
+import math
 import logging
-from .config import Config
+import tempfile
+import json
+import time
+from collections import deque
+from PyQt6.QtCore import QTimer
+from .config import get_config
+from .probe import get_probe
+from .cookies import get_cookie_cache, remove_copy
+from .archive import get_download_archive, format_key, YOUTUBE_EXTRACTOR
+from .file_index import get_download_index, youtube_video_id, ID_SUFFIX_RE, VIDEO_EXTENSIONS, AUDIO_EXTENSIONS
+from . import embedded_engine
+from .progress import parse_line, structured_args, format_progress_text, parse_bytes, parse_eta
+from .events import DownloadEvent
+from .playlist import EXPAND_ARGS, should_expand, parse_expand_output, playlist_entries
+from .info_cache import get_info_cache
+from .prefetch import get_info_prefetcher
+from .line_reader import LineReader
+from .retry import (FailureClassifier, RetryPolicy, STALLED, DEFAULT_MAX_RETRIES, DEFAULT_RETRY_DELAY,
+                    DEFAULT_MAX_RETRY_DELAY)
+
+# 默认同时运行的 yt-dlp 进程数
+DEFAULT_MAX_PARALLEL = 3
+
+# 批量模式下单个 yt-dlp 进程最多处理的链接数
+DEFAULT_BATCH_SIZE = 50
+
+# 分段下载播放列表时每段的条目数（--playlist-items 范围）
+DEFAULT_SHARD_SIZE = 100
+
+# 批量模式下用于区分当前处理的是哪个链接
+EXTRACTING_URL_RE = re.compile(r'Extracting URL: (\S+)')
+# 非 verbose 模式下 yt-dlp 把过长的链接显示为 前 97 个字符 + "..." + 后 20 个字符
+TRUNCATE_LEFT = 100
+TRUNCATE_RIGHT = 20
+
+
+def shown_url_matches(url, shown):
+    """“Extracting URL”中显示的链接（可能被截断）是否为 url"""
+    if shown == url:
+        return True
+    return (len(url) > TRUNCATE_LEFT + TRUNCATE_RIGHT
+            and shown == f"{url[:TRUNCATE_LEFT - 3]}...{url[-TRUNCATE_RIGHT:]}")
+
+# 旧版 yt-dlp 不支持 --print after_move 时，从这些提示中获取最终文件路径
+MERGED_FILE_RE = re.compile(r'^\[Merger\] Merging formats into "(.+)"$')
+AUDIO_FILE_RE = re.compile(r'^\[ExtractAudio\] Destination: (.+)$')
+
+# 开始处理播放列表：“[youtube:tab] Playlist 名称: Downloading 100 items of 300”（总数可能没有）
+PLAYLIST_ITEMS_RE = re.compile(r'^\[[^\]]+\] Playlist (.*): Downloading (\d+) items(?: of (\d+))?')
+
+# 下载进程多久没有进展（秒）视为停滞，终止后重新开始；0 表示关闭
+DEFAULT_STALL_TIMEOUT = 120
+# 看门狗检查的间隔（毫秒）
+WATCHDOG_INTERVAL = 5000
+
+# 后处理（合并、转换音频等）期间 ffmpeg 可能长时间没有输出，不算停滞
+POSTPROCESS_RE = re.compile(r'^\[(?:Merger|ExtractAudio|VideoConvertor|VideoRemuxer|Fixup\w*|FFmpeg\w*|Embed\w*|Metadata)\]')
+
+# 下载记录中已有的视频：“[download] 视频ID: 标题 has already been recorded in the archive”（标题可能没有）
+ARCHIVED_RE = re.compile(r'^\[download\] ([^:\s]+): (?:(.*) )?has already been recorded in the archive')
 
 class Downloader(QObject):
     # 修改信号，添加任务ID
-    output_received = pyqtSignal(str, str)  # task_id, message
+    output_received = pyqtSignal(str, str)  # task_id, message（日志文本，界面不再解析）
+    event_received = pyqtSignal(object)  # DownloadEvent
     download_finished = pyqtSignal(bool, str, str, str)  # success, message, title, task_id
+    task_state_changed = pyqtSignal(str, str)  # task_id, state ('queued' / 'running')
     
     def __init__(self):
         super().__init__()
         self.processes = []
+        self.pending_tasks = deque()  # 等待空闲槽位的任务
+        self.batch_jobs = {}  # 批量模式的进程 -> 该进程负责的任务信息
+        self.line_readers = {}  # 进程 -> (标准输出, 标准错误) 的按行读取器
+        self.embedded_tasks = set()  # 内嵌引擎中正在运行的任务
+        self.canceled_embedded = set()  # 已取消、等待工作线程退出的内嵌任务
+        self._schedule_pending = False
         self.task_count = 0  # 只保留这些基本属性
         self.download_paths = {}  # 存储每个任务的下载路径
+        self.task_files = {}  # 任务 -> {视频: (视频ID, 最终文件路径)}，由 yt-dlp 在移动文件后报告
+        self.file_order = {}  # 任务 -> {视频ID: (发布日期, 列表序号)}，用于找出同步到的最新视频
+        self.expanding = {}  # 正在获取条目的播放列表任务ID -> (任务, 进程)，内嵌引擎没有进程
+        self.playlist_jobs = {}  # 已展开的播放列表任务 -> 子任务和完成情况
+        self.shard_jobs = {}  # 分段下载的播放列表任务 -> 各分段和进度
+        self.launched = {}  # 正在运行的单个视频任务ID -> 任务，失败后按原参数重试
+        self.failures = {}  # 正在运行的单个视频任务ID -> 本次尝试的错误分类
+        self.retry_timers = {}  # 等待重试的任务ID -> (任务, 定时器)
+        self.task_metrics = {}  # 任务ID -> 启动次数、重试、停滞和恢复的次数
         
         # 设置 M1 Mac 的 Homebrew 路径
         if "/opt/homebrew/bin" not in os.environ.get('PATH', ''):
@@ -23,11 +101,69 @@ class Downloader(QObject):
         # 更新 QProcess 环境变量
         self.env = QProcessEnvironment.systemEnvironment()
         
-        # 初始化配置
-        self.config = Config()
+        # 全局共享的配置，设置修改后通过 changed 信号同步
+        self.config = get_config()
+        self.config.changed.connect(self._on_config_changed)
+        
+        # 最大并发数
+        self.max_parallel = self.config.config.get('max_parallel_downloads', DEFAULT_MAX_PARALLEL)
+        # 批量模式：多个链接交给同一个 yt-dlp 进程（0 表示关闭）
+        self.batch_size = self.config.config.get('batch_size', 0)
+        # 播放列表先展开为单个视频的子任务，与其他任务一起并发下载
+        self.expand_playlists = self.config.config.get('expand_playlists', True)
+        # 分段下载：大型播放列表按 --playlist-items 范围分给多个进程（0 表示关闭，优先于展开）
+        self.shard_size = self.config.config.get('playlist_shard_size', 0)
         
-        # 记录启动日志
+        # 启动时异步探测 yt-dlp，结果在整个会话内共享
+        self.probe = get_probe()
+        self.probe.probe_finished.connect(self._on_probe_finished)
+        self.probe.start()
+        
+        # 各任务共用的 cookies 缓存，避免每个进程都去解密浏览器数据库
+        self.cookie_cache = get_cookie_cache(self.config)
+        self.cookie_cache.extraction_finished.connect(self._on_cookies_ready)
+        
+        # 下载目录中已有文件的索引，启动进程前先检查视频是否已经下载过
+        self.file_index = get_download_index(self.config)
+        self.file_index.root_ready.connect(lambda root: self._schedule_next())
+        self.file_index.add_root(self.config.config.get('last_download_path', os.path.expanduser("~/Downloads")))
+        
+        # 每个下载目录一份 --download-archive 记录，已下载的视频不再访问网络
+        self.archive = get_download_archive(self.config)
+        self.use_archive = self.config.config.get('download_archive', True)
+        
+        # 分析格式时保存的视频信息，下载时用 --load-info-json 复用
+        self.info_cache = get_info_cache(self.config)
+        # 粘贴链接后的后台预取：同一链接正在预取时等它完成，不再提取第二次
+        self.prefetcher = get_info_prefetcher(self.config)
+        self.prefetcher.finished.connect(lambda url, success: self._schedule_soon())
+        
+        # 单个视频因网络错误或限流失败时，稍后自动重试
+        self.retry_policy = RetryPolicy(self.config.config.get('max_retries', DEFAULT_MAX_RETRIES),
+                                        self.config.config.get('retry_delay', DEFAULT_RETRY_DELAY),
+                                        self.config.config.get('max_retry_delay', DEFAULT_MAX_RETRY_DELAY))
+        
+        # 看门狗：单个视频的下载进程长时间没有进展时终止并重试
+        self.stall_timeout = self.config.config.get('stall_timeout', DEFAULT_STALL_TIMEOUT)
+        self.watchdog = QTimer(self)
+        self.watchdog.setInterval(WATCHDOG_INTERVAL)
+        self.watchdog.timeout.connect(self._check_stalls)
+        
+        # 下载引擎：cli 启动 yt-dlp 进程，embedded 在工作线程中直接调用 yt_dlp
+        self.embedded_engine = None
+        if self.config.config.get('engine', 'cli') == 'embedded':
+            if embedded_engine.is_available():
+                self.embedded_engine = embedded_engine.get_embedded_engine()
+                self.embedded_engine.job_output.connect(self._on_embedded_output)
+                self.embedded_engine.job_event.connect(self._on_embedded_event)
+                self.embedded_engine.job_finished.connect(self._on_embedded_finished)
+                self.embedded_engine.expand_finished.connect(self._on_expanded)
+            else:
+                self.config.log("未找到 yt_dlp Python 包，使用命令行引擎", logging.WARNING)
+        
+        # 记录启动日志，系统环境只在启动时记录一次
         self.config.log("YT-DLP GUI 启动", logging.INFO)
+        self.config.log("系统环境 PATH: %s, 当前工作目录: %s", logging.DEBUG, os.environ.get('PATH', ''), os.getcwd())
         
     def reset_state(self):
         """重置下载器状态"""
@@ -36,71 +172,78 @@ class Downloader(QObject):
         self.cancel_download()
         # 清理进程列表
         self.processes.clear()
+        self.pending_tasks.clear()
+        # 任务ID会从头编号，清除上一轮的文件记录
+        self.task_files.clear()
+        self.file_order.clear()
+        self.playlist_jobs.clear()
+        self.shard_jobs.clear()
+        self.task_metrics.clear()
+        
+    def set_max_parallel(self, value):
+        """设置最大并发下载数，调大时立即启动排队中的任务"""
+        self.max_parallel = max(1, int(value))
+        self._schedule_next()
+        
+    def set_batch_size(self, value):
+        """设置批量模式下每个进程处理的链接数，小于 2 时关闭批量模式"""
+        self.batch_size = max(0, int(value))
+        
+    def _on_config_changed(self, key, value):
+        if key == 'max_parallel_downloads':
+            self.set_max_parallel(value)
+        elif key == 'batch_size':
+            self.set_batch_size(value)
+        elif key == 'download_archive':
+            self.use_archive = bool(value)
+        elif key == 'expand_playlists':
+            self.expand_playlists = bool(value)
+        elif key == 'playlist_shard_size':
+            self.shard_size = max(0, int(value))
+        elif key == 'stall_timeout':
+            self.stall_timeout = max(0, int(value))
+        elif key == 'last_download_path':
+            # 提前索引新的下载目录
+            self.file_index.add_root(value)
         
-    def start_download(self, url, output_path, format_options=None, browser='safari', is_playlist=False):
+    def is_busy(self):
+        """是否还有正在运行或排队中的任务"""
+        return bool(self.processes or self.embedded_tasks or self.pending_tasks or self.expanding
+                    or self.retry_timers)
+        
+    def shutdown(self):
+        """退出程序前取消所有任务并释放内嵌引擎"""
+        self.cancel_download()
+        if self.embedded_engine:
+            self.embedded_engine.shutdown()
+        self.file_index.shutdown()
+        
+    def _running_count(self):
+        return len(self.processes) + len(self.embedded_tasks) + len(self.expanding)
+        
+    def start_download(self, url, output_path, format_options=None, browser='safari', is_playlist=False, task_id=None):
+        """将下载任务加入队列，有空闲槽位时才会真正启动 yt-dlp 进程"""
         try:
-            # 记录系统环境信息
-            self.config.log(f"系统环境 PATH: {os.environ.get('PATH', '')}", logging.DEBUG)
-            self.config.log(f"当前工作目录: {os.getcwd()}", logging.DEBUG)
-            self.config.log(f"下载目录: {output_path}", logging.DEBUG)
-            
-            # 检查 yt-dlp 版本
-            process = QProcess()
-            process.start("yt-dlp", ["--version"])
-            process.waitForFinished()
-            version = process.readAllStandardOutput().data().decode().strip()
-            self.config.log(f"yt-dlp 版本: {version}", logging.DEBUG)
-            
             # 从format_options中获取浏览器设置，如果存在的话
             if format_options and 'browser' in format_options:
                 browser = format_options['browser']
             
-            # 检查浏览器 cookies
-            if browser == 'safari':
-                cookies_path = os.path.expanduser("~/Library/Containers/com.apple.Safari/Data/Library/Cookies/Cookies.binarycookies")
-                self.config.log(f"Safari cookies 路径: {cookies_path}", logging.DEBUG)
-                self.config.log(f"文件存在: {os.path.exists(cookies_path)}", logging.DEBUG)
-                if os.path.exists(cookies_path):
-                    self.config.log(f"文件权限: {oct(os.stat(cookies_path).st_mode)[-3:]}", logging.DEBUG)
-            
-            # 生成任务ID
-            task_id = f"Task-{self.task_count + 1}"
+            # 生成任务ID（调用方可以指定，以便与界面上的任务行对应）
             self.task_count += 1
+            if not task_id:
+                task_id = f"Task-{self.task_count}"
             
-            # 检查 yt-dlp 是否可用
-            if not self._check_yt_dlp_available():
-                raise RuntimeError("未找到 yt-dlp 命令，请确保已正确安装")
-            
-            # 创建新进程
-            process = QProcess()
-            process.setWorkingDirectory(output_path)
-            process.setProperty("url", url)
-            process.setProperty("task_id", task_id)
-            process.setProperty("title", "正在获取视频信息...")  # 初始化标题为更友好的提示
-            process.setProperty("is_playlist", is_playlist)  # 设置播放列表标记
-            process.setProperty("playlist_name", "")  # 初始化播放列表名称
-            process.setProperty("current_item", 0)  # 初始化当前下载项索引
-            process.setProperty("total_items", 0)  # 初始化总项目数
-            
-            # 连接信号
-            process.readyReadStandardOutput.connect(lambda: self._handle_stdout(process))
-            process.readyReadStandardError.connect(lambda: self._handle_stderr(process))
-            process.finished.connect(lambda code, status: self._handle_finished(process, code, status))
+            # 记录下载信息（参数只在对应级别启用时才格式化）
+            self.config.log("加入下载队列: %s", logging.INFO, url)
+            self.config.log("输出路径: %s, 浏览器: %s, 播放列表/频道: %s", logging.DEBUG,
+                            output_path, browser, is_playlist)
             
-            # 添加环境变量 PATH
-            process.setProcessEnvironment(self.env)
-            
-            # 记录下载信息
-            self.config.log(f"开始下载: {url}", logging.INFO)
-            self.config.log(f"输出路径: {output_path}", logging.DEBUG)
-            self.config.log(f"使用浏览器: {browser}", logging.DEBUG)
-            self.config.log(f"是否播放列表/频道: {is_playlist}", logging.DEBUG)
-            
-            # 构建基础参数
-            args = ["--cookies-from-browser", browser, "--progress", "--no-overwrites"]
+            # 构建基础参数（cookies 参数在任务真正启动时再决定）
+            args = ["--progress", "--no-overwrites"]
             args.extend(["--output", "%(title)s.%(ext)s"])
             
             # 添加画质选择参数
+            audio_only = bool(format_options) and format_options.get('height') == "mp3"
             if format_options and 'height' in format_options:
                 height = format_options['height']
                 if height == "mp3":  # MP3 音频选项
@@ -133,7 +276,7 @@ class Downloader(QObject):
                 
                 # 添加自定义格式参数
                 args.extend(['-f', format_options['format']])
-                self.config.log(f"使用自定义格式: {format_options['format']}", logging.INFO)
+                self.config.log("使用自定义格式: %s", logging.INFO, format_options['format'])
             
             # 添加字幕下载参数
             if format_options and format_options.get('download_subs'):
@@ -147,46 +290,916 @@ class Downloader(QObject):
             if is_playlist:
                 args.append("--yes-playlist")
             
-            # 添加URL
-            args.append(url)
-            
-            # 记录完整命令
-            command = "yt-dlp " + " ".join([shlex.quote(str(arg)) for arg in args])
-            print("执行命令:", command)
+            # yt-dlp 下载完成后写入记录；再次下载列表时已记录的条目不再提取信息
+            # 每种格式单独记录，换一种格式（如仅音频）下载同一个视频时不会被跳过
+            archive_format = format_key(args)
+            if self.use_archive:
+                args.extend(["--download-archive", str(self.archive.archive_file(output_path, archive_format))])
             
-            # 启动进程
-            process.start("yt-dlp", args)
-            self.processes.append(process)
-            
-            # 保存下载路径
+            # 保存下载路径，并在后台建立该目录的文件索引
             self.download_paths[task_id] = output_path
+            self.file_index.add_root(output_path)
+            
+            # 加入等待队列，由调度器按并发上限启动
+            self.pending_tasks.append({
+                'task_id': task_id,
+                'url': url,
+                'output_path': output_path,
+                'args': args,
+                'browser': browser,
+                'is_playlist': is_playlist,
+                # 能从链接直接得到视频ID时，调度前先在索引中查找已下载的文件
+                'video_id': "" if is_playlist else youtube_video_id(url),
+                'audio_only': audio_only,
+                'archive_format': archive_format,
+                # 同步订阅来源时只获取上次同步之后的新视频
+                'sync': bool(format_options and format_options.get('sync')),
+                'sync_after': format_options.get('sync_after') if format_options else None,
+                'sync_break': bool(format_options and format_options.get('sync_break')),
+                'parent': None  # 播放列表展开后的子任务所属的列表任务
+            })
+            self.task_state_changed.emit(task_id, 'queued')
+            # 马上认领预取：之后清空输入框时正在进行的预取不会被终止
+            if not is_playlist:
+                self.prefetcher.claim(url, task_id)
+            # 延迟到事件循环中调度，连续添加的任务可以合并成批量进程
+            self._schedule_soon()
             
             return True
             
         except Exception as e:
-            self.download_finished.emit(False, f"启动下载失败: {str(e)}", "正在获取视频信息...", task_id)
+            self._finish_task(False, f"启动下载失败: {str(e)}", "正在获取视频信息...", task_id)
             return False
         
+    def _schedule_soon(self):
+        if not self._schedule_pending:
+            self._schedule_pending = True
+            QTimer.singleShot(0, self._run_scheduled)
+            
+    def _run_scheduled(self):
+        self._schedule_pending = False
+        self._schedule_next()
+        
+    def _schedule_next(self):
+        """在并发上限内启动排队中的任务"""
+        if not self.pending_tasks:
+            return
+        
+        # 探测结果已缓存时这里只是一次 stat，探测中则等待 probe_finished 再调度
+        # 内嵌引擎不依赖 yt-dlp 可执行文件
+        state = self.probe.ensure()
+        if state == 'probing':
+            return
+        if state == 'failed' and self.embedded_engine is None:
+            while self.pending_tasks:
+                task = self.pending_tasks.popleft()
+                self._finish_task(False, "启动下载失败: 未找到 yt-dlp 命令，请确保已正确安装",
+                                            "正在获取视频信息...", task['task_id'])
+            return
+        
+        while self.pending_tasks and self._running_count() < self.max_parallel:
+            # 目录索引通常在启动时就已建立；仍在扫描时等 root_ready 后再调度
+            head = self.pending_tasks[0]
+            # 下载记录中已有的视频直接完成，不访问网络也不启动进程
+            if self._is_archived(head):
+                self._skip_existing(self.pending_tasks.popleft(), self._existing_file(head), "已存在于下载记录中")
+                continue
+            if head['video_id'] and not self.file_index.is_ready(head['output_path']):
+                return
+            # 文件已在下载目录中的任务直接完成，不启动进程
+            filepath = self._existing_file(head)
+            if filepath:
+                if self.use_archive:
+                    self.archive.add(head['output_path'], YOUTUBE_EXTRACTOR, head['video_id'],
+                                     head['archive_format'])
+                self._skip_existing(self.pending_tasks.popleft(), filepath)
+                continue
+            # 预取完成后下载直接使用缓存的信息（重试时重新提取，见 _launch_task）
+            if not head['is_playlist'] and not head.get('attempt') and self.prefetcher.claim(head['url'], head['task_id']):
+                return
+            # 首次使用某个浏览器时先导出 cookies，导出完成后再继续调度
+            browser = self.pending_tasks[0]['browser']
+            if state == 'ready' and self.cookie_cache.request(browser, self.probe.binary_path) == 'extracting':
+                return
+            task = self.pending_tasks.popleft()
+            if self._should_shard(task):
+                self._start_sharding(task)
+                continue
+            if self._should_expand(task):
+                self._start_expansion(task)
+                continue
+            # 内嵌引擎没有进程启动开销，不需要批量模式
+            if self.batch_size > 1 and not task['is_playlist'] and self.embedded_engine is None:
+                task = self._take_batch(task)
+            self._launch_task(task)
+            
+    def _should_shard(self, task):
+        """播放列表是否分段下载：不需要先获取整个列表，适合条目很多的列表
+        
+        分段是多个 yt-dlp 进程，内嵌引擎使用展开的方式。
+        """
+        return (self.shard_size > 0 and self.embedded_engine is None and task['is_playlist']
+                and not task['sync'] and not task.get('expanded') and should_expand(task['url']))
+        
+    def _start_sharding(self, task):
+        """先只加入第一段，yt-dlp 报告列表的条目数后再加入其余各段"""
+        task_id = task['task_id']
+        self.shard_jobs[task_id] = {
+            'task': task,
+            'name': "",
+            'total': 0,  # 列表总数，yt-dlp 报告之前为 0
+            'next_start': 1,
+            'shards': {},  # 排队或运行中的分段 -> {'position': 本段中已开始的条目, 'selected': 本段条目数}
+            'all': [],
+            'processed': 0,  # 已结束的分段处理过的条目数
+            'failed': 0,
+            'exhausted': False,
+            'canceled': False,
+        }
+        self.task_state_changed.emit(task_id, 'running')
+        self.config.log("分段下载播放列表，每段 %d 个: %s", logging.INFO, self.shard_size, task['url'])
+        self.pending_tasks.appendleft(self._next_shard(task_id))
+        
+    def _fill_shards(self, parent_id):
+        """加入后续的分段，使同一列表排队或运行中的分段数与同时下载数相同"""
+        job = self.shard_jobs[parent_id]
+        shards = []
+        while len(job['shards']) < self.max_parallel:
+            shard = self._next_shard(parent_id)
+            if shard is None:
+                break
+            shards.append(shard)
+        self.pending_tasks.extendleft(reversed(shards))
+        
+    def _next_shard(self, parent_id):
+        """生成下一段的任务；已知列表已经结束时返回 None"""
+        job = self.shard_jobs[parent_id]
+        start = job['next_start']
+        if job['exhausted'] or job['canceled'] or (job['total'] and start > job['total']):
+            return None
+        end = start + self.shard_size - 1
+        job['next_start'] = end + 1
+        shard_id = f"{parent_id}#{len(job['all']) + 1}"
+        job['shards'][shard_id] = {'position': 0, 'selected': None}
+        job['all'].append(shard_id)
+        task = job['task']
+        self.download_paths[shard_id] = task['output_path']
+        return dict(task, task_id=shard_id, args=task['args'] + ["--playlist-items", f"{start}-{end}"],
+                    expanded=True, shard_of=parent_id)
+        
+    def _update_shard(self, process, position=None, selected=None, total=None, name=None):
+        """分段进程报告了条目信息，更新并发送列表任务的合并进度"""
+        parent_id = process.property("shard_of")
+        job = self.shard_jobs.get(parent_id)
+        shard = job['shards'].get(process.property("task_id")) if job else None
+        if shard is None:
+            return
+        if position is not None:
+            shard['position'] = position
+        if selected is not None:
+            shard['selected'] = selected
+        if total:
+            job['total'] = total
+        if selected is not None and selected < self.shard_size:
+            job['exhausted'] = True  # 本段条目不足，说明已经到达列表末尾
+        if name and not job['name']:
+            job['name'] = name
+            self.event_received.emit(DownloadEvent(parent_id, 'playlist', title=name, is_playlist=True))
+        if selected is not None:
+            self._fill_shards(parent_id)
+            self._schedule_soon()
+        self._emit_shard_progress(parent_id)
+        
+    def _emit_shard_progress(self, parent_id):
+        job = self.shard_jobs[parent_id]
+        # 每段中当前条目之前的条目都已下载或跳过
+        processed = job['processed'] + sum(max(0, shard['position'] - 1) for shard in job['shards'].values())
+        self.event_received.emit(DownloadEvent(parent_id, 'children', title=job['name'], item_index=processed,
+                                               item_count=job['total'], is_playlist=True))
+        
+    def _finish_shard(self, parent_id, shard_id, success, message):
+        """一段结束：加入下一段，全部结束后完成列表任务"""
+        job = self.shard_jobs[parent_id]
+        shard = job['shards'].pop(shard_id, None)
+        if shard is None:
+            return
+        if message == "下载已取消":
+            job['canceled'] = True
+        else:
+            if not success:
+                job['failed'] += 1
+            # 本段条目不足（或没有得到列表）说明已经到达列表末尾
+            if shard['selected'] is None or shard['selected'] < self.shard_size:
+                job['exhausted'] = True
+            job['processed'] += shard['selected'] or 0
+            self._emit_shard_progress(parent_id)
+            self._fill_shards(parent_id)
+        if job['shards']:
+            return
+        
+        name = job['name'] or "未命名播放列表"
+        title = f"{name} (列表, 共{job['total']}个视频)" if job['total'] else f"{name} (列表)"
+        if job['canceled']:
+            self._finish_task(False, "下载已取消", title, parent_id)
+        else:
+            # 与整个列表交给一个进程时一致：部分分段出错时列表仍视为完成
+            self._finish_task(True, f"下载完成，{job['failed']}段出错" if job['failed'] else "下载完成",
+                              title, parent_id)
+        
+    def _should_expand(self, task):
+        """播放列表是否先展开为子任务
+
+        同步订阅来源时按列表顺序遇到已下载的视频就停止，仍由一个进程处理。
+        """
+        return (self.expand_playlists and task['is_playlist'] and not task['sync']
+                and not task.get('expanded') and should_expand(task['url']))
+        
+    def _start_expansion(self, task):
+        """用 --flat-playlist 获取播放列表的条目，占用一个下载槽位"""
+        task_id = task['task_id']
+        self.task_state_changed.emit(task_id, 'running')
+        self.output_received.emit(task_id, "正在获取播放列表...")
+        if self.embedded_engine:
+            # 内嵌引擎自己复制 cookies 文件
+            self.expanding[task_id] = (task, None)
+            self.embedded_engine.expand(task_id, task['url'], self.cookie_cache.cookie_args(task['browser']) + EXPAND_ARGS)
+            return
+        
+        cookie_args, cookie_copy = self.cookie_cache.process_cookie_args(task['browser'])
+        args = cookie_args + EXPAND_ARGS
+        process = QProcess()
+        process.setProperty("cookie_copy", cookie_copy or "")
+        process.setProcessEnvironment(self.env)
+        process.finished.connect(lambda code, status: self._on_expand_process_finished(process, code, status))
+        process.errorOccurred.connect(lambda error: self._on_expand_process_error(process, error))
+        self.expanding[task_id] = (task, process)
+        args = args + ["-J", task['url']]
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("执行命令: yt-dlp %s", " ".join(shlex.quote(str(arg)) for arg in args))
+        process.start(self.probe.binary_path, args)
+        
+    def _on_expand_process_finished(self, process, exit_code, exit_status):
+        self._release_cookies(process)
+        task_id = next((key for key, (_, running) in self.expanding.items() if running is process), None)
+        if task_id is None:
+            process.deleteLater()  # 已取消
+            return
+        info = None
+        if exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0:
+            info = parse_expand_output(process.readAllStandardOutput().data().decode('utf-8', errors='replace'))
+        else:
+            error = process.readAllStandardError().data().decode('utf-8', errors='replace').strip()
+            if error:
+                self.output_received.emit(task_id, error)
+        process.deleteLater()
+        self._on_expanded(task_id, info)
+        
+    def _on_expand_process_error(self, process, error):
+        # 进程无法启动时不会触发 finished
+        if error == QProcess.ProcessError.FailedToStart:
+            self._on_expand_process_finished(process, -1, QProcess.ExitStatus.CrashExit)
+        
+    def _on_expanded(self, task_id, info):
+        """播放列表条目获取完成：每个条目成为一个子任务，按列表顺序排在队首"""
+        if task_id not in self.expanding:
+            return  # 已取消
+        task, _ = self.expanding.pop(task_id)
+        result = playlist_entries(info)
+        if result is None:
+            # 不是普通的播放列表（如频道首页、单个视频）或获取失败，交给一个进程按原来的方式下载
+            self.config.log("无法展开播放列表，按整个列表下载: %s", logging.INFO, task['url'])
+            self.pending_tasks.appendleft(dict(task, expanded=True))
+            self._schedule_next()
+            return
+        
+        playlist_name, entries = result
+        self.config.log("播放列表 %s 展开为 %d 个任务", logging.INFO, playlist_name, len(entries))
+        self.output_received.emit(task_id, f"开始下载播放列表: {playlist_name}，共{len(entries)}个视频")
+        if not entries:
+            self._finish_task(True, "下载完成", f"{playlist_name} (列表)", task_id)
+            self._schedule_next()
+            return
+        
+        # 子任务只下载单个视频（链接中可能仍带有列表参数）
+        child_args = ["--no-playlist" if arg == "--yes-playlist" else arg for arg in task['args']]
+        children = []
+        for index, (url, video_id, title) in enumerate(entries, 1):
+            child_id = f"{task_id}.{index}"
+            self.download_paths[child_id] = task['output_path']
+            children.append(dict(task, task_id=child_id, url=url, args=child_args, is_playlist=False,
+                                 video_id=video_id, parent=task_id, title=title))
+        self.playlist_jobs[task_id] = {
+            'title': playlist_name,
+            'children': [child['task_id'] for child in children],
+            'remaining': {child['task_id'] for child in children},
+            'failed': 0,
+            'canceled': False,
+        }
+        self.event_received.emit(DownloadEvent(
+            task_id, 'expanded', title=playlist_name, item_count=len(children), is_playlist=True,
+            entries=tuple((child['task_id'], child['url'], child['title']) for child in children)))
+        self.pending_tasks.extendleft(reversed(children))
+        self._schedule_next()
+        
+    def _finish_task(self, success, message, title, task_id):
+        """发送任务完成信号；播放列表的最后一个子任务完成后再结束列表任务"""
+        self.prefetcher.release(task_id)
+        parent_id, separator, _ = task_id.rpartition('#')
+        if separator and parent_id in self.shard_jobs:
+            # 分段不在界面上单独显示
+            self._finish_shard(parent_id, task_id, success, message)
+            return
+        self.download_finished.emit(success, message, title, task_id)
+        parent_id = task_id.rpartition('.')[0]
+        job = self.playlist_jobs.get(parent_id)
+        if job is None or task_id not in job['remaining']:
+            return
+        job['remaining'].discard(task_id)
+        total = len(job['children'])
+        if message == "下载已取消":
+            job['canceled'] = True
+        else:
+            if not success:
+                job['failed'] += 1
+            self.event_received.emit(DownloadEvent(parent_id, 'children', title=job['title'],
+                                                   item_index=total - len(job['remaining']),
+                                                   item_count=total, is_playlist=True))
+        if job['remaining']:
+            return
+        
+        title = f"{job['title']} (列表, 共{total}个视频)"
+        if job['canceled']:
+            self._finish_task(False, "下载已取消", title, parent_id)
+        elif job['failed']:
+            # 与整个列表交给一个进程时一致：部分视频失败时列表仍视为完成
+            success = job['failed'] < total
+            self._finish_task(success, f"下载完成，{job['failed']}个视频失败" if success else "下载失败",
+                              title, parent_id)
+        else:
+            self._finish_task(True, "下载完成", title, parent_id)
+        
+    def _finish_attempt(self, success, message, title, task_id):
+        """单个视频的一次下载结束：网络错误和限流按重试策略稍后重新排队，其余情况结束任务"""
+        task = self.launched.pop(task_id, None)
+        failure = self.failures.pop(task_id, None)
+        if not success and task is not None and failure is not None:
+            attempt = task.get('attempt', 0) + 1
+            delay = self.retry_policy.delay(failure.kind, attempt, failure.retry_after)
+            if delay is not None:
+                self._schedule_retry(dict(task, after_stall=failure.kind == STALLED), attempt, delay, failure.label)
+                return
+            if failure.label:
+                message = f"下载失败：{failure.label}"
+        self._finish_task(success, message, title, task_id)
+        
+    def _schedule_retry(self, task, attempt, delay, reason):
+        """等待一段时间后把任务重新加入队列，--continue 让 yt-dlp 接着已下载的 .part 文件继续"""
+        task_id = task['task_id']
+        args = task['args'] if "--continue" in task['args'] else task['args'] + ["--continue"]
+        task = dict(task, args=args, attempt=attempt)
+        self._metrics(task_id)['retries'] += 1
+        self.config.log("%s，%.0f 秒后第 %d 次重试: %s", logging.WARNING, reason, delay, attempt, task['url'])
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self._requeue_retry(task_id))
+        self.retry_timers[task_id] = (task, timer)
+        timer.start(int(delay * 1000))
+        self.event_received.emit(DownloadEvent(task_id, 'retry', attempt=attempt,
+                                               retry_delay=int(round(delay)), reason=reason))
+        
+    def _requeue_retry(self, task_id):
+        entry = self.retry_timers.pop(task_id, None)
+        if entry is None:
+            return  # 等待期间已取消
+        task, timer = entry
+        timer.deleteLater()
+        self.pending_tasks.append(task)
+        self.task_state_changed.emit(task_id, 'queued')
+        self._schedule_next()
+        
+    def _metrics(self, task_id):
+        return self.task_metrics.setdefault(task_id, {'attempts': 0, 'retries': 0, 'stalls': 0, 'recoveries': 0})
+        
+    def get_task_metrics(self, task_id=None):
+        """任务的启动次数（attempts）、重试（retries）、停滞（stalls）和停滞后恢复（recoveries）的次数
+
+        不指定任务时返回本轮所有任务的合计。
+        """
+        if task_id is not None:
+            return dict(self._metrics(task_id))
+        totals = {'attempts': 0, 'retries': 0, 'stalls': 0, 'recoveries': 0}
+        for metrics in self.task_metrics.values():
+            for name, value in metrics.items():
+                totals[name] += value
+        return totals
+        
+    def _note_activity(self, process, progress=None):
+        """记录进程仍在工作；progress 为已下载字节数，没有变化时不算作进展"""
+        if progress is not None:
+            if progress == process.property("last_progress"):
+                return
+            process.setProperty("last_progress", progress)
+            process.setProperty("postprocessing", False)
+            if process.property("after_stall"):
+                # 停滞后重新开始的任务又有了进展
+                process.setProperty("after_stall", False)
+                self._metrics(process.property("task_id"))['recoveries'] += 1
+                self.config.log("停滞的下载已恢复: %s", logging.INFO, process.property("url"))
+        process.setProperty("last_activity", time.monotonic())
+        
+    def _check_stalls(self):
+        """看门狗：终止长时间没有进展的下载进程，由重试策略重新排队"""
+        now = time.monotonic()
+        watched = False
+        for process in list(self.processes):
+            task_id = process.property("task_id")
+            # 只处理单个视频的任务（播放列表和批量进程没有可以重新排队的单个任务）
+            if task_id not in self.failures or process.property("stalled") or process.property("canceled"):
+                continue
+            watched = True
+            if process.property("postprocessing") or self.stall_timeout <= 0:
+                continue
+            if now - (process.property("last_activity") or now) >= self.stall_timeout:
+                self.config.log("%d 秒没有进展，终止并重新下载: %s", logging.WARNING,
+                                self.stall_timeout, process.property("url"))
+                process.setProperty("stalled", True)
+                self.failures[task_id].mark_stalled()
+                self._metrics(task_id)['stalls'] += 1
+                process.kill()
+        if not watched:
+            self.watchdog.stop()
+        
+    def _take_batch(self, first):
+        """从队列中取出可与 first 共用一个进程的任务，按空闲槽位平均分片"""
+        key = (first['output_path'], first['browser'], first['args'])
+        compatible = [t for t in self.pending_tasks
+                      if not t['is_playlist'] and (t['output_path'], t['browser'], t['args']) == key
+                      and not self._is_archived(t) and not self._existing_file(t)]
+        free_slots = max(1, self.max_parallel - self._running_count())
+        size = min(self.batch_size, math.ceil((len(compatible) + 1) / free_slots))
+        if size <= 1:
+            return first
+        
+        members = [first] + compatible[:size - 1]
+        taken = {t['task_id'] for t in members}
+        self.pending_tasks = deque(t for t in self.pending_tasks if t['task_id'] not in taken)
+        return dict(first, members=members)
+            
+    def _existing_file(self, task):
+        """在下载目录索引中查找任务要下载的视频，目录尚未索引完成时返回 None"""
+        if not task.get('video_id'):
+            return None
+        extensions = AUDIO_EXTENSIONS if task.get('audio_only') else VIDEO_EXTENSIONS
+        return self.file_index.find_video(task['output_path'], task['video_id'], extensions)
+        
+    def _is_archived(self, task):
+        """任务的视频是否已记录在下载目录的下载记录中"""
+        return (self.use_archive and bool(task.get('video_id'))
+                and self.archive.contains(task['output_path'], YOUTUBE_EXTRACTOR, task['video_id'],
+                                          task.get('archive_format', "")))
+        
+    def clear_archive(self, output_path):
+        """清空下载目录的下载记录，之后已下载过的视频会重新下载，返回删除的记录条数"""
+        removed = self.archive.clear(output_path)
+        self.config.log("已清空下载记录 %s（%d 条）", logging.INFO, output_path, removed)
+        return removed
+        
+    def _skip_existing(self, task, filepath, message="文件已存在"):
+        """视频已经下载过：记录文件（如果找得到）并直接结束任务"""
+        task_id = task['task_id']
+        if filepath:
+            title = ID_SUFFIX_RE.sub("", os.path.splitext(os.path.basename(filepath))[0])
+            self._record_file(task_id, filepath, task['video_id'])
+        else:
+            title = f"视频 {task['video_id']}"
+        self.config.log("%s，跳过下载: %s", logging.INFO, message, task['url'])
+        self.output_received.emit(task_id, f"{message}，跳过下载: {title}")
+        self.event_received.emit(DownloadEvent(task_id, 'exists', title=title,
+                                               video_id=task['video_id'], filepath=filepath or ""))
+        self._finish_task(True, message, title, task_id)
+        
+    def _sync_args(self, task):
+        """同步订阅来源的参数
+
+        已下载的条目由下载记录跳过；频道按发布时间从新到旧排列（sync_break），
+        遇到已下载或早于上次同步的视频就可以停止，不必遍历整个频道。
+        """
+        if not task.get('sync'):
+            return []
+        # 内嵌引擎使用的 yt_dlp 包与参数解析一致，不需要探测
+        supports = (lambda option: True) if self.embedded_engine else self.probe.supports
+        args = []
+        if task.get('sync_break'):
+            if self.use_archive and supports("--break-on-existing"):
+                args.append("--break-on-existing")
+            # 没有 --break-match-filters 时 --dateafter 需要提取每个视频，反而更慢
+            if task.get('sync_after') and supports("--break-match-filters"):
+                args.extend(["--dateafter", task['sync_after'],
+                             "--break-match-filters", f"upload_date>={task['sync_after']}"])
+        # 边获取列表边下载，提前停止时不必先取得整个频道的列表
+        if supports("--lazy-playlist"):
+            args.append("--lazy-playlist")
+        return args
+        
+    def _launch_task(self, task):
+        """为任务创建并启动 yt-dlp 进程"""
+        task_id = task['task_id']
+        
+        # 刚分析过格式的视频直接使用缓存的信息，不再提取一次
+        # （重试时重新提取，缓存中的下载地址可能正是失败的原因）
+        info_json = None
+        self._metrics(task_id)['attempts'] += 1
+        if not task['is_playlist'] and 'members' not in task:
+            self.launched[task_id] = task
+            self.failures[task_id] = FailureClassifier()
+            if not task.get('attempt'):
+                info_json = self.info_cache.fresh_path(task['url'])
+        if info_json:
+            self.config.log("使用缓存的视频信息: %s", logging.INFO, task['url'])
+        
+        if self.embedded_engine:
+            self.embedded_tasks.add(task_id)
+            self.task_state_changed.emit(task_id, 'running')
+            self.embedded_engine.submit(dict(task, info_json=info_json),
+                                        self.cookie_cache.cookie_args(task['browser']) + task['args']
+                                        + self._sync_args(task))
+            return
+        
+        # 创建新进程
+        process = QProcess()
+        process.setWorkingDirectory(task['output_path'])
+        process.setProperty("url", task['url'])
+        process.setProperty("task_id", task_id)
+        process.setProperty("title", "正在获取视频信息...")  # 初始化标题为更友好的提示
+        process.setProperty("is_playlist", task['is_playlist'])  # 设置播放列表标记
+        process.setProperty("sync", task['sync'])
+        process.setProperty("shard_of", task.get('shard_of', ""))
+        process.setProperty("playlist_name", "")  # 初始化播放列表名称
+        process.setProperty("current_item", 0)  # 初始化当前下载项索引
+        process.setProperty("total_items", 0)  # 初始化总项目数
+        process.setProperty("after_stall", task.get('after_stall', False))
+        self._note_activity(process)
+        
+        # 输出可能在任意位置被截断，按行读取后再解析
+        self.line_readers[process] = (LineReader(), LineReader())
+        
+        # 连接信号
+        process.readyReadStandardOutput.connect(lambda: self._handle_stdout(process))
+        process.readyReadStandardError.connect(lambda: self._handle_stderr(process))
+        process.finished.connect(lambda code, status: self._handle_finished(process, code, status))
+        process.errorOccurred.connect(lambda error: self._handle_error(process, error))
+        
+        # 添加环境变量 PATH
+        process.setProcessEnvironment(self.env)
+        
+        # 优先使用缓存的 cookies 文件（每个进程一份副本，进程结束后删除）
+        cookie_args, cookie_copy = self.cookie_cache.process_cookie_args(task['browser'])
+        process.setProperty("cookie_copy", cookie_copy or "")
+        args = cookie_args + list(task['args']) + self._sync_args(task)
+        
+        # 支持时让 yt-dlp 输出结构化进度记录，避免解析人类可读文本
+        protocol_args = structured_args(self.probe)
+        args.extend(protocol_args)
+        process.setProperty("structured", bool(protocol_args))
+        
+        if 'members' in task:
+            # 批量模式：把链接写入临时文件，一个进程依次处理
+            fd, batch_file = tempfile.mkstemp(prefix="yt-dlp-gui-batch-", suffix=".txt")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(member['url'] for member in task['members']) + '\n')
+            self.batch_jobs[process] = {
+                'members': task['members'],
+                'current': 0,
+                'started': False,  # 当前任务是否已经有了自己的输出
+                'failed': set(),
+                'archived': set(),
+                'batch_file': batch_file
+            }
+            args.extend(["--ignore-errors", "--batch-file", batch_file])
+            # 合并输出通道，保证错误信息和“Extracting URL”的先后顺序，错误才能记到正确的任务上
+            process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+            self.config.log("批量进程处理 %d 个链接", logging.INFO, len(task['members']))
+        elif info_json:
+            args.extend(["--load-info-json", str(info_json)])
+        else:
+            args.append(task['url'])
+        
+        # 记录完整命令，拼接命令行的开销只在调试级别下才产生
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("执行命令: yt-dlp %s", " ".join(shlex.quote(str(arg)) for arg in args))
+        
+        # 启动进程
+        if task_id in self.failures and self.stall_timeout > 0 and not self.watchdog.isActive():
+            self.watchdog.start()
+        self.processes.append(process)
+        self.task_state_changed.emit(task_id, 'running')
+        process.start(self.probe.binary_path, args)
+        
+    def _on_embedded_output(self, task_id, message):
+        if task_id in self.embedded_tasks and task_id not in self.canceled_embedded:
+            if task_id in self.failures:
+                self.failures[task_id].feed(message)
+            self.output_received.emit(task_id, message)
+            
+    def _on_embedded_event(self, event):
+        if event.task_id in self.embedded_tasks and event.task_id not in self.canceled_embedded:
+            if event.kind == 'file':
+                self._record_file(event.task_id, event.filepath, event.video_id,
+                                  upload_date=event.upload_date, playlist_index=event.item_index)
+            self.event_received.emit(event)
+            
+    def _on_embedded_finished(self, task_id, success, message, title):
+        """内嵌任务结束（信号已排队回到主线程）"""
+        if task_id not in self.embedded_tasks:
+            return
+        self.embedded_tasks.discard(task_id)
+        # 被取消的任务在 cancel_download 中已经发送过完成信号
+        if task_id in self.canceled_embedded:
+            self.canceled_embedded.discard(task_id)
+        else:
+            self._finish_attempt(success, message, title, task_id)
+        self._schedule_next()
+        
+    def _on_probe_finished(self, available):
+        """探测完成后启动等待中的任务"""
+        self._schedule_next()
+        
+    def _on_cookies_ready(self, browser, success):
+        """cookies 导出结束（无论成功与否）后继续调度"""
+        self._schedule_next()
+        
+    def _switch_batch_member(self, process, url=None, video_id=None):
+        """批量进程开始处理某个链接时，结束之前的任务并把输出切换到该任务
+
+        url 来自“Extracting URL”，video_id 来自下载记录中已有的提示（此时 yt-dlp 不提取信息，
+        也不输出“Extracting URL”）。同一链接可能在批量文件中出现多次，当前任务已经开始时
+        优先匹配后面的任务。
+        """
+        job = self.batch_jobs[process]
+        members = job['members']
+        if url is not None:
+            matches = lambda member: shown_url_matches(member['url'], url)
+        else:
+            matches = lambda member: member.get('video_id') == video_id
+        current = members[job['current']]
+        # 下载记录提示也可能出现在提取信息之后，属于当前任务
+        if matches(current) and (not job['started'] or (url is None and current['task_id'] not in job['archived'])):
+            job['started'] = True
+            return
+        for index in range(job['current'] + 1, len(members)):
+            if matches(members[index]):
+                break
+        else:
+            return  # 不是批量文件中的链接（例如重定向）或再次提取当前链接，仍归属当前任务
+        
+        # 中间没有任何输出的任务已被跳过（例如已记录在下载记录中）
+        self._finish_batch_member(process, current, skipped=not job['started'])
+        for member in members[job['current'] + 1:index]:
+            self._finish_batch_member(process, member, skipped=True)
+        job['current'] = index
+        job['started'] = True
+        task_id = members[index]['task_id']
+        process.setProperty("task_id", task_id)
+        process.setProperty("title", "正在获取视频信息...")
+        self.task_state_changed.emit(task_id, 'running')
+        
+    def _finish_batch_member(self, process, member, success=None, skipped=False):
+        job = self.batch_jobs[process]
+        task_id = member['task_id']
+        title = process.property("title") if process.property("task_id") == task_id and not skipped else None
+        title = title or member.get('title') or "视频下载任务"
+        if success is None and (skipped or task_id in job['archived']):
+            # yt-dlp 没有处理该链接，通常是已记录在下载记录中
+            archived = task_id in job['archived'] or self._is_archived(member)
+            self._finish_task(True, "已存在于下载记录中" if archived else "已跳过", title, task_id)
+            return
+        if success is None:
+            success = task_id not in job['failed']
+        self._finish_task(success, "下载完成" if success else "下载失败", title, task_id)
+        
+    def _finish_batch(self, process, exit_code, exit_status):
+        """批量进程结束：当前任务按是否出错判断；未轮到的任务在进程正常结束时视为已跳过，否则视为失败"""
+        job = self.batch_jobs[process]
+        completed = exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0
+        crashed = exit_status != QProcess.ExitStatus.NormalExit
+        members = job['members']
+        remaining = job['current']
+        if job['started']:
+            self._finish_batch_member(process, members[remaining], False if crashed else None)
+            remaining += 1
+        for member in members[remaining:]:
+            self._finish_batch_member(process, member, None if completed else False, skipped=completed)
+        self._cleanup_batch(process)
+        
+    def _cleanup_batch(self, process):
+        job = self.batch_jobs.pop(process, None)
+        if job:
+            try:
+                os.remove(job['batch_file'])
+            except OSError:
+                pass
+        
     def cancel_download(self):
+        # 先取消仍在排队的任务
+        while self.pending_tasks:
+            task = self.pending_tasks.popleft()
+            self.output_received.emit(task['task_id'], "下载已取消")
+            self._finish_task(False, "下载已取消", "视频下载任务", task['task_id'])
+        
+        # 等待重试的任务不再重试
+        for task_id, (_, timer) in list(self.retry_timers.items()):
+            del self.retry_timers[task_id]
+            timer.stop()
+            self.output_received.emit(task_id, "下载已取消")
+            self._finish_task(False, "下载已取消", "视频下载任务", task_id)
+        
+        # 正在获取条目的播放列表不再展开
+        for task_id, (_, process) in list(self.expanding.items()):
+            del self.expanding[task_id]
+            if process is not None:
+                process.kill()
+            self.output_received.emit(task_id, "下载已取消")
+            self._finish_task(False, "下载已取消", "视频下载任务", task_id)
+        
+        # 取消内嵌引擎中的任务，工作线程会在下一次进度回调时退出
+        for task_id in self.embedded_tasks - self.canceled_embedded:
+            self.embedded_engine.cancel(task_id)
+            self.canceled_embedded.add(task_id)
+            self.output_received.emit(task_id, "下载已取消")
+            self._finish_task(False, "下载已取消", "视频下载任务", task_id)
+        
         # 取消所有活跃的下载
-        for process in self.processes:
-            if process.state() == QProcess.ProcessState.Running:
+        for process in list(self.processes):
+            if process.state() != QProcess.ProcessState.NotRunning:  # 包括仍在启动中的进程
                 # 标记任务为已取消
                 process.setProperty("canceled", True)
                 # 记录任务ID用于状态更新
                 task_id = process.property("task_id")
                 title = process.property("title") or "视频下载任务"
+                # 批量进程中尚未完成的任务也一并取消
+                if process in self.batch_jobs:
+                    job = self.batch_jobs[process]
+                    for member in job['members'][job['current'] + 1:]:
+                        self.output_received.emit(member['task_id'], "下载已取消")
+                        self._finish_task(False, "下载已取消", "视频下载任务", member['task_id'])
                 # 发送取消消息
                 self.output_received.emit(task_id, "下载已取消")
                 # 立即发送下载完成信号，确保UI更新
-                self.download_finished.emit(False, "下载已取消", title, task_id)
+                self._finish_task(False, "下载已取消", title, task_id)
                 # 终止进程
                 process.kill()
         self.processes.clear()
+        self.launched.clear()
+        self.failures.clear()
         
     def _handle_stdout(self, process):
-        data = process.readAllStandardOutput().data().decode()
+        readers = self.line_readers.get(process)
+        if not readers:
+            return
+        for line in readers[0].feed(process.readAllStandardOutput().data()):
+            self._handle_line(process, line)
+            
+    def _handle_line(self, process, line):
+        """处理标准输出中的一行完整文本"""
+        # 批量模式下根据 yt-dlp 正在解析的链接切换当前任务，错误记在当时的任务上
+        if process in self.batch_jobs:
+            match = EXTRACTING_URL_RE.search(line)
+            archived = ARCHIVED_RE.match(line)
+            if match:
+                self._switch_batch_member(process, url=match.group(1))
+            elif archived:
+                self._switch_batch_member(process, video_id=archived.group(1))
+                job = self.batch_jobs[process]
+                if job['members'][job['current']].get('video_id') == archived.group(1):
+                    job['archived'].add(process.property("task_id"))
+            elif line.startswith('ERROR:'):
+                self.batch_jobs[process]['failed'].add(process.property("task_id"))
+        
+        # 结构化记录直接按字段处理，其余文本仍按原来的方式解析
+        record = parse_line(line)
+        # 进度行只有已下载字节数变化才算进展（见 _emit_event），其余输出说明进程仍在工作
+        if not (record and record.kind == 'progress') and not (line.startswith('[download]') and '%' in line):
+            self._note_activity(process)
+            if POSTPROCESS_RE.match(line):
+                process.setProperty("postprocessing", True)
+        if record:
+            self._handle_record(process, record)
+        else:
+            self._handle_text(process, line)
+            
+    def _drain_output(self, process):
+        """进程结束时处理缓冲区中剩余的输出，并释放读取器"""
+        self._handle_stdout(process)
+        self._handle_stderr(process)
+        readers = self.line_readers.pop(process, None)
+        if not readers:
+            return
+        task_id = process.property("task_id")
+        for line in readers[0].flush():
+            self._handle_line(process, line)
+        for line in readers[1].flush():
+            self.output_received.emit(task_id, line)
+            
+    def _handle_record(self, process, record):
+        """处理一条结构化进度记录"""
         task_id = process.property("task_id")
+        list_id = task_id.split('-')[1] if '-' in task_id else "1"
+        
+        if record.kind == 'item':
+            title = record.title or "正在获取视频信息..."
+            process.setProperty("title", title)
+            process.setProperty("video_id", record.video_id)
+            if process.property("is_playlist") and record.playlist_index:
+                process.setProperty("current_item", record.playlist_index)
+                if record.playlist_count:
+                    process.setProperty("total_items", record.playlist_count)
+                total = process.property("total_items") or 0
+                self.output_received.emit(task_id, f"列表任务-{list_id}：正在下载第{record.playlist_index}个/共{total}个：{title}")
+            else:
+                self.output_received.emit(task_id, f"单视频任务-{list_id}：{title}")
+            self._emit_event(process, 'item')
+                
+        elif record.kind == 'progress':
+            # 文件已存在时 yt-dlp 也会输出一条没有已下载字节数的记录，由文本提示处理
+            if not record.downloaded_bytes:
+                return
+            current = total = 0
+            if process.property("is_playlist"):
+                current = process.property("current_item") or 0
+                total = process.property("total_items") or 0
+            self.output_received.emit(task_id, format_progress_text(record, current, total))
+            self._emit_event(process, 'progress', percent=record.percent,
+                             downloaded_bytes=record.downloaded_bytes, total_bytes=record.total_bytes,
+                             speed=record.speed, eta=record.eta)
+            
+        elif record.kind == 'file':
+            filepath = self._record_file(task_id, record.filepath, record.video_id,
+                                         upload_date=record.upload_date, playlist_index=record.playlist_index)
+            self._emit_event(process, 'file', video_id=record.video_id, filepath=filepath,
+                             upload_date=record.upload_date)
+            
+    def _record_file(self, task_id, filepath, video_id="", key=None, upload_date="", playlist_index=0):
+        """记录任务生成的文件，返回完整路径
+
+        同一视频（key，默认为视频ID）的后续记录会覆盖之前的路径，
+        例如分别下载的音视频流最终合并为一个文件。
+        """
+        if not filepath:
+            return ""
+        # yt-dlp 输出的路径可能相对于任务的工作目录
+        filepath = os.path.normpath(os.path.join(self.download_paths.get(task_id, ""), filepath))
+        self.task_files.setdefault(task_id, {})[video_id if key is None else key] = (video_id, filepath)
+        if video_id:
+            self.file_order.setdefault(task_id, {})[video_id] = (upload_date, playlist_index)
+        if key is None:
+            # yt-dlp 报告的最终文件，马上加入索引，同一会话中重复的链接不会再次下载
+            self.file_index.add_file(filepath, video_id)
+        return filepath
+        
+    def get_task_files(self, task_id):
+        """获取任务生成的全部文件，[(视频ID, 文件路径)]；展开的播放列表包括所有子任务的文件"""
+        files = list(self.task_files.get(task_id, {}).values())
+        children = (self.playlist_jobs.get(task_id, {}).get('children', [])
+                    + self.shard_jobs.get(task_id, {}).get('all', []))
+        for child_id in children:
+            files.extend(self.task_files.get(child_id, {}).values())
+        return files
+        
+    def get_newest_video(self, task_id):
+        """任务下载的视频中发布最晚的一个的ID，没有时返回 None
+
+        没有发布日期时取列表中最靠前的视频（频道的视频按从新到旧排列）。
+        """
+        order = self.file_order.get(task_id, {})
+        if not order:
+            return None
+        return max(order, key=lambda video_id: (order[video_id][0], -(order[video_id][1] or sys.maxsize)))
+        
+    def get_task_output(self, task_id):
+        """任务只生成一个文件时返回 (视频ID, 文件路径)，否则返回 (None, None)"""
+        files = self.get_task_files(task_id)
+        if len(files) != 1:
+            return None, None
+        video_id, filepath = files[0]
+        return video_id or None, filepath
+            
+    def _emit_event(self, process, kind, **fields):
+        """根据进程当前的状态发送下载事件"""
+        if kind == 'progress':
+            self._note_activity(process, fields.get('downloaded_bytes', 0))
+        if process.property("shard_of"):
+            return  # 分段的进度由 _update_shard 合并到列表任务
+        is_playlist = bool(process.property("is_playlist"))
+        fields.setdefault('title', process.property("title") or "")
+        if is_playlist:
+            fields.setdefault('item_index', process.property("current_item") or 0)
+            fields.setdefault('item_count', process.property("total_items") or 0)
+        self.event_received.emit(DownloadEvent(process.property("task_id"), kind, is_playlist=is_playlist, **fields))
+            
+    def _handle_text(self, process, data):
+        """解析 yt-dlp 的普通文本输出"""
+        task_id = process.property("task_id")
+        structured = process.property("structured")
         
         # 解析进度信息
         if '[download]' in data:
@@ -197,6 +1210,7 @@ class Downloader(QObject):
                     process.setProperty("is_playlist", True)
                     process.setProperty("playlist_name", playlist_name)
                     self.output_received.emit(task_id, f"开始下载播放列表: {playlist_name}")
+                    self._emit_event(process, 'playlist', title=playlist_name)
                 except:
                     self.output_received.emit(task_id, data.strip())
                 return
@@ -206,6 +1220,7 @@ class Downloader(QObject):
                 try:
                     playlist_name = data.split('Finished downloading playlist:')[1].strip()
                     self.output_received.emit(task_id, f"播放列表下载完成: {playlist_name}")
+                    self._emit_event(process, 'playlist_done', title=playlist_name)
                 except:
                     self.output_received.emit(task_id, data.strip())
                 return
@@ -220,6 +1235,9 @@ class Downloader(QObject):
                     # 保存到进程属性中
                     process.setProperty("current_item", current_item)
                     process.setProperty("total_items", total_items)
+                    if process.property("shard_of"):
+                        # 分段中的序号从 1 开始，总数为本段的条目数
+                        self._update_shard(process, position=current_item, selected=total_items)
                     
                     # 获取当前正在下载的视频标题（如果有的话）
                     current_title = process.property("title") or "正在获取视频信息..."
@@ -227,6 +1245,7 @@ class Downloader(QObject):
                     
                     # 发送包含视频标题的消息
                     self.output_received.emit(task_id, f"列表任务-{list_id}：正在下载第{current_item}个/共{total_items}个：{current_title}")
+                    self._emit_event(process, 'item')
                     
                     # 记录调试信息
                     print(f"播放列表项目更新：第{current_item}个/共{total_items}个")
@@ -235,11 +1254,12 @@ class Downloader(QObject):
                     self.output_received.emit(task_id, data.strip())
                 return
             
-            # 检查是否包含视频标题信息
-            elif 'Destination:' in data:
+            # 检查是否包含视频标题信息（结构化模式下标题来自记录）
+            elif 'Destination:' in data and not structured:
                 try:
                     # 从目标文件名中提取标题
                     filename = data.split('Destination: ')[1].strip()
+                    self._record_file(task_id, filename, key=process.property("current_item") or 0)
                     title = filename.rsplit('.', 1)[0]  # 移除扩展名
                     
                     # 更彻底地清理标题中的视频ID和格式ID
@@ -279,17 +1299,31 @@ class Downloader(QObject):
                             list_id = task_id.split('-')[1] if '-' in task_id else "1"
                             # 发送带更新标题的消息
                             self.output_received.emit(task_id, f"列表任务-{list_id}：正在下载第{current}个/共{total}个：{cleaned_title}")
+                            self._emit_event(process, 'item')
                     else:
                         # 单个视频
                         single_id = task_id.split('-')[1] if '-' in task_id else "1"
                         self.output_received.emit(task_id, f"单视频任务-{single_id}：{cleaned_title}")
+                        self._emit_event(process, 'item')
                 except Exception as e:
                     print(f"处理视频标题信息时出错: {str(e)}")
                     pass
+            # 下载记录中已有的视频，yt-dlp 没有再提取信息
+            elif 'has already been recorded in the archive' in data:
+                match = ARCHIVED_RE.match(data)
+                title = (match.group(2) or match.group(1)) if match else data.strip()
+                self.output_received.emit(task_id, f"已在下载记录中，跳过: {title}")
+                # 播放列表中跳过的条目只记录日志，避免整个任务显示为已存在
+                if not process.property("is_playlist"):
+                    process.setProperty("title", title)
+                    process.setProperty("archived", True)
+                    self._emit_event(process, 'exists')
             # 检查是否是文件已存在的情况
             elif 'has already been downloaded' in data:
                 try:
                     filename = data.split('[download] ')[1].split(' has already')[0]
+                    if not structured:
+                        self._record_file(task_id, filename, key=process.property("current_item") or 0)
                     title = filename.rsplit('.', 1)[0]  # 移除扩展名
                     # 清理标题中的视频ID和格式ID
                     if '[' in title and ']' in title:
@@ -332,6 +1366,7 @@ class Downloader(QObject):
                         # 单个视频
                         single_id = task_id.split('-')[1] if '-' in task_id else "1"
                         self.output_received.emit(task_id, f"单视频任务-{single_id}：{title} (已存在)")
+                    self._emit_event(process, 'exists')
                 except Exception as e:
                     print(f"处理已存在文件信息时出错: {str(e)}")
                     pass
@@ -350,7 +1385,7 @@ class Downloader(QObject):
                 except:
                     pass
             # 提取进度百分比和其他信息
-            elif '%' in data:
+            elif '%' in data and not structured:
                 try:
                     parts = data.split()
                     percent_idx = [i for i, part in enumerate(parts) if '%' in part][0]
@@ -368,39 +1403,112 @@ class Downloader(QObject):
                         progress_text = f"下载进度: {percent}% (大小: {size}, 速度: {speed}, 剩余: {eta})"
                     
                     self.output_received.emit(task_id, progress_text)
+                    total_bytes = parse_bytes(size)
+                    self._emit_event(process, 'progress', percent=percent,
+                                     downloaded_bytes=int(total_bytes * percent / 100), total_bytes=total_bytes,
+                                     speed=parse_bytes(speed), eta=parse_eta(eta))
                 except:
                     self.output_received.emit(task_id, data.strip())
         else:
+            if process.property("shard_of"):
+                match = PLAYLIST_ITEMS_RE.match(data)
+                if match:
+                    self._update_shard(process, selected=int(match.group(2)),
+                                       total=int(match.group(3) or 0), name=match.group(1))
+            if not structured:
+                match = MERGED_FILE_RE.match(data) or AUDIO_FILE_RE.match(data)
+                if match:
+                    self._record_file(task_id, match.group(1), key=process.property("current_item") or 0)
             self.output_received.emit(task_id, data.strip())
         
     def _handle_stderr(self, process):
-        data = process.readAllStandardError().data().decode()
-        self.output_received.emit(process.property("task_id"), data)
+        readers = self.line_readers.get(process)
+        if not readers:
+            return
+        task_id = process.property("task_id")
+        failure = self.failures.get(task_id)
+        for line in readers[1].feed(process.readAllStandardError().data()):
+            self._note_activity(process)
+            if failure is not None:
+                failure.feed(line)
+            if line.startswith('ERROR:'):
+                process.setProperty("error_seen", True)
+            self.output_received.emit(task_id, line)
+        
+    def _release_cookies(self, process):
+        """删除进程使用的 cookies 副本"""
+        remove_copy(process.property("cookie_copy"))
+        process.setProperty("cookie_copy", "")
+        
+    def _handle_error(self, process, error):
+        """进程无法启动时不会触发 finished，需要在这里释放槽位"""
+        if error != QProcess.ProcessError.FailedToStart:
+            return
+        self._release_cookies(process)
+        task_id = process.property("task_id")
+        self.line_readers.pop(process, None)
+        self.output_received.emit(task_id, f"无法启动 yt-dlp: {process.errorString()}")
+        if process in self.batch_jobs:
+            self._finish_batch(process, -1, QProcess.ExitStatus.CrashExit)
+        else:
+            self._finish_attempt(False, "下载失败", process.property("title") or "视频下载任务", task_id)
+        if process in self.processes:
+            self.processes.remove(process)
+        self._schedule_next()
         
     def _handle_finished(self, process, exit_code, exit_status):
-        # 检查是否为被取消的任务
+        self._release_cookies(process)
+        # 被取消的任务在 cancel_download 中已经发送过完成信号
         if process.property("canceled") == True:
-            success = False
-            message = "下载已取消"
-        else:
-            # 判断是否为播放列表
-            is_playlist = process.property("is_playlist") or False
+            self.line_readers.pop(process, None)
+            self._cleanup_batch(process)
+            if process in self.processes:
+                self.processes.remove(process)
+            self._schedule_next()
+            return
+        
+        # 最后一行可能没有换行符，结束前先处理完剩余输出
+        self._drain_output(process)
+        
+        # 批量进程需要逐个结束其中的任务
+        if process in self.batch_jobs:
+            self._finish_batch(process, exit_code, exit_status)
+            if process in self.processes:
+                self.processes.remove(process)
+            self._schedule_next()
+            return
+        
+        # 判断是否为播放列表
+        is_playlist = process.property("is_playlist") or False
+        
+        # 对于普通视频，仅检查退出码
+        # 对于播放列表，即使退出码不为0，也认为是成功的
+        # 因为yt-dlp对于播放列表可能会返回非零退出码，即使所有可下载的项目都已下载完成
+        if process.property("sync"):
+            # 同步订阅来源：退出码 101 表示遇到已下载或更早的视频后提前停止；
+            # 失败的同步不能算作成功，否则下次会从错误的位置继续
+            success = (exit_status == QProcess.ExitStatus.NormalExit
+                       and (exit_code in (0, 101) or bool(self.task_files.get(process.property("task_id")))))
+            message = "下载完成" if success else "下载失败"
+        elif process.property("shard_of"):
+            # 分段的结果汇总到列表任务中，出错的分段需要计入出错数
+            success = (exit_code == 0 and exit_status == QProcess.ExitStatus.NormalExit
+                       and not process.property("error_seen"))
+            message = "下载完成" if success else "下载失败"
+        elif is_playlist:
+            # 播放列表下载始终视为成功
+            success = True
+            message = "下载完成"
             
-            # 对于普通视频，仅检查退出码
-            # 对于播放列表，即使退出码不为0，也认为是成功的
-            # 因为yt-dlp对于播放列表可能会返回非零退出码，即使所有可下载的项目都已下载完成
-            if is_playlist:
-                # 播放列表下载始终视为成功
-                success = True
-                message = "下载完成"
-                
-                # 记录日志，但不将非零退出码视为错误
-                if exit_code != 0:
-                    self.config.log(f"播放列表下载完成，但退出码非零: {exit_code}，这通常是正常的", logging.INFO)
-            else:
-                # 单个视频下载
-                success = exit_code == 0 and exit_status == QProcess.ExitStatus.NormalExit
-                message = "下载完成" if success else "下载失败"
+            # 记录日志，但不将非零退出码视为错误
+            if exit_code != 0:
+                self.config.log("播放列表下载完成，但退出码非零: %d，这通常是正常的", logging.INFO, exit_code)
+        else:
+            # 单个视频下载
+            success = exit_code == 0 and exit_status == QProcess.ExitStatus.NormalExit
+            message = "下载完成" if success else "下载失败"
+            if success and process.property("archived"):
+                message = "已存在于下载记录中"
         
         # 获取任务ID
         task_id = process.property("task_id")
@@ -423,84 +1531,44 @@ class Downloader(QObject):
             # 获取单个视频的标题
             title = process.property("title") or "视频下载任务"
         
-        # 发送完成信号，使用标题而不是 URL
-        self.download_finished.emit(success, message, title, task_id)
+        # 发送完成信号，使用标题而不是 URL（临时性错误会稍后重试）
+        self._finish_attempt(success, message, title, task_id)
         
         if process in self.processes:
             self.processes.remove(process)
+        
+        # 释放槽位后启动下一个排队任务
+        self._schedule_next()
             
-    def analyze_formats(self, url):
-        """分析视频可用格式"""
-        process = QProcess()
-        args = ["--cookies-from-browser", "safari", "-F", url]
-        process.start("yt-dlp", args)
-        process.waitForFinished()
-        
-        # 获取输出
-        stdout = process.readAllStandardOutput().data().decode()
-        stderr = process.readAllStandardError().data().decode()
-        
-        # 返回完整输出
-        return stdout + stderr
-        
-    def _parse_format_list(self, output):
-        """解析yt-dlp -F的输出"""
-        formats = []
-        for line in output.split('\n'):
-            if line.startswith('format code') or not line.strip():
-                continue
-            try:
-                parts = line.split()
-                if len(parts) < 3:
-                    continue
-                    
-                code = parts[0]
-                ext = parts[1] if len(parts) > 1 else ""
-                desc = line  # 保存完整的格式描述
-                
-                # 分类格式
-                is_video = "video only" in line or ("p," in line and "audio only" not in line)
-                is_audio = "audio only" in line
-                
-                formats.append({
-                    'code': code,
-                    'ext': ext,
-                    'description': desc,
-                    'is_video': is_video,
-                    'is_audio': is_audio
-                })
-            except:
-                continue
-        return formats 
+    def analyze_formats(self, url, browser=None):
+        """获取视频信息（在工作线程中调用），结果写入缓存供下载时复用
 
-    def _check_yt_dlp_available(self):
-        """检查 yt-dlp 是否可用"""
+        返回 yt-dlp -J 输出的视频信息，失败时抛出 RuntimeError。
+        """
+        info = self.info_cache.get(url)
+        if info is not None:
+            return info
+        browser = browser or self.config.config.get('browser', 'safari')
+        binary_path = self.probe.binary_path or "yt-dlp"
+        process = QProcess()
+        self.cookie_cache.ensure_blocking(browser, binary_path)
+        cookie_args, cookie_copy = self.cookie_cache.process_cookie_args(browser)
         try:
-            process = QProcess()
-            process.start("yt-dlp", ["--version"])
-            process.waitForFinished()
-            success = process.exitCode() == 0
-            if not success:
-                print("yt-dlp 检查失败，退出码:", process.exitCode())
-                print("错误输出:", process.readAllStandardError().data().decode())
-            return success
-        except Exception as e:
-            print("检查 yt-dlp 时出错:", str(e))
-            return False
-
-    def _format_progress(self, data):
-        """格式化进度信息"""
-        # 示例输入: [download]  23.4% of 50.75MiB at 2.52MiB/s ETA 00:15
+            process.start(binary_path, cookie_args + ["-J", "--no-playlist", url])
+            process.waitForFinished(-1)
+        finally:
+            remove_copy(cookie_copy)
+        
+        stdout = process.readAllStandardOutput().data().decode('utf-8', errors='replace')
+        stderr = process.readAllStandardError().data().decode('utf-8', errors='replace')
+        if process.exitCode() != 0 or not stdout.strip():
+            raise RuntimeError(stderr.strip() or f"yt-dlp 退出码 {process.exitCode()}")
         try:
-            parts = data.split()
-            progress = parts[1]  # 23.4%
-            size = parts[3]      # 50.75MiB
-            speed = parts[5]     # 2.52MiB/s
-            eta = parts[7]       # 00:15
-            
-            return f"下载进度: {progress} (大小: {size}, 速度: {speed}, 剩余时间: {eta})"
-        except:
-            return data.strip() 
+            info = json.loads(stdout)
+        except ValueError as e:
+            raise RuntimeError(f"无法解析视频信息: {e}")
+        self.info_cache.put(url, stdout)
+        return info
 
     def get_current_download_path(self, task_id):
         """获取指定任务的下载路径"""
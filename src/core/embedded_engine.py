@@ -0,0 +1,259 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from .progress import ProgressRecord, format_progress_text
+from .events import DownloadEvent
+from .cookies import private_copy, remove_copy
+
+try:
+    import yt_dlp
+    from yt_dlp.utils import DownloadCancelled, ExistingVideoReached, RejectedVideoReached
+except ImportError:  # 未安装 yt-dlp Python 包时只能使用命令行引擎
+    yt_dlp = None
+
+# 线程池大小上限，实际并发数由 Downloader 的调度器控制
+MAX_WORKERS = 16
+
+
+def is_available():
+    """当前环境能否使用内嵌引擎"""
+    return yt_dlp is not None and hasattr(yt_dlp, 'parse_options')
+
+
+class _JobLogger:
+    """把 yt-dlp 的警告和错误转发到当前任务的输出"""
+
+    def __init__(self, entry):
+        self.entry = entry
+
+    def debug(self, message):
+        pass
+
+    def info(self, message):
+        pass
+
+    def warning(self, message):
+        self.entry.output(message)
+
+    def error(self, message):
+        self.entry.output(message)
+
+
+class _PooledYoutubeDL:
+    """一个已初始化的 YoutubeDL 实例，参数相同的任务依次复用它的提取器"""
+
+    def __init__(self, engine, ydl_opts):
+        self.engine = engine
+        self.job = None  # 当前正在执行的任务
+        # 关闭时 YoutubeDL 会写回 cookies 文件，每个实例使用自己的副本
+        self.cookie_copy = private_copy(ydl_opts['cookiefile']) if ydl_opts.get('cookiefile') else None
+        ydl_opts = dict(ydl_opts, logger=_JobLogger(self), quiet=True, noprogress=True)
+        if self.cookie_copy:
+            ydl_opts['cookiefile'] = self.cookie_copy
+        self.ydl = yt_dlp.YoutubeDL(ydl_opts)
+        self.ydl.add_progress_hook(self._progress_hook)
+        self.ydl.add_postprocessor_hook(self._postprocessor_hook)
+
+    def output(self, message):
+        if self.job:
+            self.engine.job_output.emit(self.job['task_id'], message)
+
+    def emit_event(self, kind, **fields):
+        """发送当前任务的下载事件"""
+        job = self.job
+        if job['is_playlist']:
+            fields.setdefault('item_index', job.get('current_item', 0))
+            fields.setdefault('item_count', job.get('total_items', 0))
+        fields.setdefault('title', job['title'])
+        self.engine.job_event.emit(DownloadEvent(job['task_id'], kind, is_playlist=job['is_playlist'], **fields))
+
+    def _check_canceled(self):
+        if self.job and self.job['task_id'] in self.engine._canceled:
+            raise DownloadCancelled("下载已取消")
+
+    def _update_item(self, info):
+        """播放列表条目或单个视频的标题变化时发送提示"""
+        job = self.job
+        title = info.get('title') or "正在获取视频信息..."
+        index = info.get('playlist_index') or 0
+        if (title, index) == job.get('last_item'):
+            return
+        job['last_item'] = (title, index)
+        job['title'] = title
+        list_id = job['task_id'].split('-')[1] if '-' in job['task_id'] else "1"
+        if job['is_playlist'] and index:
+            if not job.get('playlist_name'):
+                job['playlist_name'] = info.get('playlist_title') or info.get('playlist') or ""
+                self.engine.job_output.emit(job['task_id'], f"开始下载播放列表: {job['playlist_name']}")
+                self.emit_event('playlist', title=job['playlist_name'])
+            job['current_item'] = index
+            job['total_items'] = info.get('n_entries') or info.get('playlist_count') or 0
+            self.engine.job_output.emit(
+                job['task_id'],
+                f"列表任务-{list_id}：正在下载第{index}个/共{job['total_items']}个：{title}")
+        else:
+            self.engine.job_output.emit(job['task_id'], f"单视频任务-{list_id}：{title}")
+        self.emit_event('item')
+
+    def _progress_hook(self, status):
+        self._check_canceled()
+        if not self.job:
+            return
+        self._update_item(status.get('info_dict') or {})
+        if status.get('status') != 'downloading':
+            return
+
+        record = ProgressRecord(
+            kind='progress',
+            status=status['status'],
+            downloaded_bytes=status.get('downloaded_bytes') or 0,
+            total_bytes=status.get('total_bytes') or status.get('total_bytes_estimate') or 0,
+            speed=status.get('speed') or 0.0,
+            eta=status.get('eta'),
+        )
+        job = self.job
+        current = job.get('current_item', 0) if job['is_playlist'] else 0
+        self.engine.job_output.emit(
+            job['task_id'], format_progress_text(record, current, job.get('total_items', 0)))
+        self.emit_event('progress', percent=record.percent, downloaded_bytes=record.downloaded_bytes,
+                   total_bytes=record.total_bytes, speed=record.speed, eta=record.eta)
+
+    def _postprocessor_hook(self, status):
+        self._check_canceled()
+        if not self.job:
+            return
+        if status.get('status') == 'started':
+            self.engine.job_output.emit(self.job['task_id'], f"正在处理: {status.get('postprocessor')}")
+        elif status.get('status') == 'finished' and status.get('postprocessor') == 'MoveFiles':
+            # 文件已移动到最终位置
+            info = status.get('info_dict') or {}
+            if info.get('filepath'):
+                self.emit_event('file', video_id=info.get('id') or "", filepath=info['filepath'],
+                                upload_date=info.get('upload_date') or "")
+
+
+class EmbeddedEngine(QObject):
+    """在工作线程中直接调用 yt_dlp.YoutubeDL，通过 progress_hooks 获取结构化进度"""
+    job_output = pyqtSignal(str, str)  # task_id, message
+    job_event = pyqtSignal(object)  # DownloadEvent
+    job_finished = pyqtSignal(str, bool, str, str)  # task_id, success, message, title
+    expand_finished = pyqtSignal(str, object)  # task_id, --flat-playlist 的结果（失败时为 None）
+
+    def __init__(self):
+        super().__init__()
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="yt-dlp")
+        self._lock = threading.Lock()
+        self._idle = {}  # 参数 -> 空闲的 _PooledYoutubeDL 列表
+        self._canceled = set()
+
+    def submit(self, task, args):
+        """提交任务；args 与命令行引擎的参数相同（不含 URL）"""
+        job = {
+            'task_id': task['task_id'],
+            'url': task['url'],
+            'output_path': task['output_path'],
+            'is_playlist': task['is_playlist'],
+            'sync': task.get('sync'),  # 同步失败不能算作完成，否则下次会跳过失败的视频
+            'info_json': task.get('info_json'),  # 分析格式时缓存的视频信息
+            'title': "正在获取视频信息...",
+        }
+        self._canceled.discard(job['task_id'])
+        self._executor.submit(self._run, job, tuple(args))
+
+    def expand(self, task_id, url, args):
+        """在工作线程中获取播放列表的条目（args 中应包含 --flat-playlist）"""
+        self._executor.submit(self._expand, task_id, url, tuple(args))
+
+    def cancel(self, task_id):
+        """请求取消任务，会在下一次进度回调时生效"""
+        self._canceled.add(task_id)
+
+    def shutdown(self):
+        with self._lock:
+            pooled = [entry for entries in self._idle.values() for entry in entries]
+            self._idle.clear()
+        for entry in pooled:
+            entry.ydl.close()
+            remove_copy(entry.cookie_copy)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self, key, output_path, args):
+        with self._lock:
+            entries = self._idle.get(key)
+            if entries:
+                return entries.pop()
+        ydl_opts = yt_dlp.parse_options(list(args)).ydl_opts
+        ydl_opts['paths'] = {'home': output_path}
+        return _PooledYoutubeDL(self, ydl_opts)
+
+    def _release(self, key, entry):
+        entry.job = None
+        with self._lock:
+            self._idle.setdefault(key, []).append(entry)
+
+    def _run(self, job, args):
+        task_id = job['task_id']
+        key = (args, job['output_path'])
+        success = False
+        message = "下载失败"
+        entry = None
+        try:
+            entry = self._acquire(key, job['output_path'], args)
+            entry.job = job
+            # 返回码累计在实例上，复用的实例要先清零，否则之前任务的失败会算到这个任务上
+            entry.ydl._download_retcode = 0
+            if job['info_json']:
+                retcode = entry.ydl.download_with_info_file(str(job['info_json']))
+            else:
+                retcode = entry.ydl.download([job['url']])
+            # 与命令行引擎一致：播放列表即使部分失败也视为完成
+            success = retcode == 0 or (job['is_playlist'] and not job.get('sync'))
+            message = "下载完成" if success else "下载失败"
+        except (ExistingVideoReached, RejectedVideoReached):
+            # 同步订阅来源时遇到已下载或更早的视频，提前结束属于正常情况
+            success = True
+            message = "下载完成"
+        except DownloadCancelled:
+            message = "下载已取消"
+        except Exception as e:
+            logging.error(f"内嵌引擎下载失败 {job['url']}: {e}")
+            self.job_output.emit(task_id, f"ERROR: {e}")
+        finally:
+            if entry is not None:
+                self._release(key, entry)
+
+        if job['is_playlist']:
+            playlist_name = job.get('playlist_name') or "未命名播放列表"
+            total_items = job.get('total_items') or 0
+            title = f"{playlist_name} (列表, 共{total_items}个视频)" if total_items else f"{playlist_name} (列表)"
+        else:
+            title = job['title']
+        self.job_finished.emit(task_id, success, message, title)
+
+    def _expand(self, task_id, url, args):
+        info = None
+        cookie_copy = None
+        try:
+            ydl_opts = yt_dlp.parse_options(list(args)).ydl_opts
+            if ydl_opts.get('cookiefile'):
+                cookie_copy = private_copy(ydl_opts['cookiefile'])
+                ydl_opts['cookiefile'] = cookie_copy
+            with yt_dlp.YoutubeDL(dict(ydl_opts, quiet=True, no_warnings=True)) as ydl:
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        except Exception as e:
+            logging.warning(f"获取播放列表条目失败 {url}: {e}")
+        finally:
+            remove_copy(cookie_copy)
+        self.expand_finished.emit(task_id, info)
+
+
+_shared_engine = None
+
+
+def get_embedded_engine():
+    """获取全局共享的内嵌引擎，多个 Downloader 共用同一组 YoutubeDL 实例"""
+    global _shared_engine
+    if _shared_engine is None:
+        _shared_engine = EmbeddedEngine()
+    return _shared_engine
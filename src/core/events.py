@@ -0,0 +1,38 @@
+# 下载事件：Downloader 通过 event_received 把进度和状态变化以字段的形式交给界面，
+# 界面不再解析 output_received 中的文本（该信号只作为日志输出保留）
+from dataclasses import dataclass
+
+
+@dataclass
+class DownloadEvent:
+    """一次下载状态变化
+
+    kind 取值：
+    playlist       开始下载播放列表，title 为列表名称
+    playlist_done  播放列表下载完成
+    item           开始下载某个视频（或得到了视频标题）
+    exists         文件已存在，已跳过
+    progress       下载进度
+    file           文件已移动到最终位置，filepath 为完整路径，upload_date 为发布日期（YYYYMMDD）
+    expanded       播放列表已展开为子任务，entries 为 [(子任务ID, 链接, 标题)]
+    children       子任务完成了一个，item_index 为已完成数，item_count 为总数
+    retry          临时性错误，稍后重试：attempt 为第几次重试，retry_delay 为等待秒数，reason 为失败原因
+    """
+    task_id: str
+    kind: str
+    percent: float = 0.0
+    downloaded_bytes: int = 0
+    total_bytes: int = 0
+    speed: float = 0.0
+    eta: int = None
+    item_index: int = 0  # 播放列表中的序号，单个视频为 0
+    item_count: int = 0
+    title: str = ""
+    is_playlist: bool = False
+    video_id: str = ""
+    filepath: str = ""
+    upload_date: str = ""
+    entries: tuple = ()
+    attempt: int = 0  # 第几次重试
+    retry_delay: int = 0  # 重试前等待的秒数
+    reason: str = ""  # 失败原因
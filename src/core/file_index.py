@@ -0,0 +1,247 @@
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+import os
+import re
+import logging
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from .history import get_history_store
+
+# 会被索引的文件类型
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.avi', '.mov', '.flv')
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.opus', '.ogg', '.aac', '.flac', '.wav')
+
+# 目录变化后延迟重新扫描的时间（毫秒），下载过程中的连续变化合并为一次扫描
+RESCAN_DELAY_MS = 1000
+
+# yt-dlp 默认文件名末尾的 [视频ID]，以及分别下载音视频时的中间文件（如 .f137）
+ID_SUFFIX_RE = re.compile(r'\s*\[([\w-]{6,})\]$')
+FORMAT_SUFFIX_RE = re.compile(r'\.f[\w-]+$')
+
+# 从 YouTube 链接中直接取得视频ID，不需要访问网络
+YOUTUBE_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([\w-]{11})(?![\w-])')
+
+
+def normalize_title(title):
+    """统一标题的写法，忽略大小写、全角半角和 yt-dlp 替换掉的标点"""
+    title = unicodedata.normalize('NFKC', title).casefold()
+    return ''.join(c for c in title if c.isalnum())
+
+
+def youtube_video_id(url):
+    """从 YouTube 视频链接中取出视频ID，取不到时返回空字符串"""
+    match = YOUTUBE_ID_RE.search(url)
+    return match.group(1) if match else ""
+
+
+class _RootIndex:
+    """一个下载目录中的文件，按视频ID、标题和大小索引"""
+
+    def __init__(self):
+        self.files = {}  # 文件名 -> (路径, 视频ID, 标题, 大小)
+        self.by_id = {}
+        self.by_title = {}
+        self.by_size = {}
+
+    def add(self, name, path, video_id, title, size):
+        self.remove(name)
+        self.files[name] = (path, video_id, title, size)
+        if video_id:
+            self.by_id.setdefault(video_id, []).append(path)
+        self.by_title.setdefault(normalize_title(title), []).append(path)
+        self.by_size.setdefault(size, []).append(path)
+
+    def remove(self, name):
+        old = self.files.pop(name, None)
+        if old is None:
+            return
+        path, video_id, title, size = old
+        for table, key in ((self.by_id, video_id), (self.by_title, normalize_title(title)), (self.by_size, size)):
+            paths = table.get(key)
+            if paths and path in paths:
+                paths.remove(path)
+                if not paths:
+                    del table[key]
+
+
+class DownloadIndex(QObject):
+    """下载目录的内存索引
+
+    每个目录第一次使用时在后台线程中扫描一次，之后通过 QFileSystemWatcher
+    只在目录变化时增量更新。调度器在启动 yt-dlp 之前查询，已存在的文件不再下载。
+    """
+    root_ready = pyqtSignal(str)  # 目录扫描完成
+    _scan_finished = pyqtSignal(str, object)  # 后台线程 -> 主线程：目录, _RootIndex
+
+    def __init__(self, history=None):
+        super().__init__()
+        self.history = history  # 旧文件名中没有视频ID，从下载历史中补充
+        self._lock = threading.Lock()
+        self._roots = {}  # 目录 -> _RootIndex（扫描完成后才有）
+        self._scanning = set()
+        self._rescan_timers = {}
+        self._scanner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-index")
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._scan_finished.connect(self._apply_scan)
+
+    def _key(self, root):
+        return os.path.normpath(os.path.abspath(os.path.expanduser(root)))
+
+    def add_root(self, root, wait=False):
+        """开始索引一个目录；wait 为 True 时在当前线程中立即扫描"""
+        root = self._key(root)
+        if root in self._roots:
+            return
+        if wait:
+            self._apply_scan(root, self._scan(root, None))
+            return
+        if root not in self._scanning:
+            self._scanning.add(root)
+            self._scanner.submit(self._scan_in_background, root)
+
+    def is_ready(self, root):
+        return self._key(root) in self._roots
+
+    def find_video(self, root, video_id, extensions=None):
+        """按视频ID查找文件，目录尚未扫描完成时返回 None"""
+        if not video_id:
+            return None
+        with self._lock:
+            index = self._roots.get(self._key(root))
+            paths = list(index.by_id.get(video_id, ())) if index else []
+        return self._first_match(paths, extensions)
+
+    def find_title(self, root, title, extensions=None):
+        """按标题查找文件：先找完全相同的标题，再找包含该标题的文件名"""
+        key = normalize_title(title)
+        if not key:
+            return None
+        with self._lock:
+            index = self._roots.get(self._key(root))
+            if not index:
+                return None
+            paths = list(index.by_title.get(key, ()))
+            if not paths:
+                paths = [path for title_key, matches in index.by_title.items()
+                         if key in title_key for path in matches]
+        return self._first_match(paths, extensions)
+
+    def find_size(self, root, size):
+        """查找大小相同的文件（用于检测重复下载）"""
+        with self._lock:
+            index = self._roots.get(self._key(root))
+            return list(index.by_size.get(size, ())) if index else []
+
+    def add_file(self, path, video_id=""):
+        """登记刚下载完成的文件，不必等目录重新扫描"""
+        root, name = os.path.split(os.path.normpath(path))
+        with self._lock:
+            index = self._roots.get(self._key(root))
+        if index is None:
+            return
+        entry = self._describe(name, path, video_id)
+        if entry:
+            with self._lock:
+                index.add(name, *entry)
+
+    def shutdown(self):
+        self._scanner.shutdown(wait=False, cancel_futures=True)
+
+    def _first_match(self, paths, extensions):
+        for path in paths:
+            if extensions is None or os.path.splitext(path)[1].lower() in extensions:
+                return path
+        return None
+
+    def _describe(self, name, path, video_id="", size=None):
+        """根据文件名得到 (路径, 视频ID, 标题, 大小)，不需要索引的文件返回 None"""
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in VIDEO_EXTENSIONS + AUDIO_EXTENSIONS or FORMAT_SUFFIX_RE.search(stem):
+            return None
+        match = ID_SUFFIX_RE.search(stem)
+        if match:
+            video_id = video_id or match.group(1)
+            stem = stem[:match.start()]
+        if size is None:
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                return None
+        return path, video_id, stem, size
+
+    def _scan_in_background(self, root):
+        try:
+            with self._lock:
+                previous = self._roots.get(root)
+                previous = dict(previous.files) if previous else None
+            index = self._scan(root, previous)
+        except Exception as e:
+            logging.error(f"扫描下载目录失败 {root}: {e}")
+            index = _RootIndex()  # 仍然通知等待中的调度器
+        self._scan_finished.emit(root, index)
+
+    def _scan(self, root, previous):
+        """扫描目录；previous 中已有的文件沿用上次的信息，只对新文件调用 stat"""
+        index = _RootIndex()
+        known_ids = self.history.video_ids_in(root) if self.history else {}
+        try:
+            with os.scandir(root) as entries:
+                for item in entries:
+                    if previous and item.name in previous:
+                        path, video_id, title, size = previous[item.name]
+                        index.add(item.name, path, video_id or known_ids.get(path, ""), title, size)
+                        continue
+                    try:
+                        if not item.is_file():
+                            continue
+                        size = item.stat().st_size
+                    except OSError:
+                        continue  # 扫描期间被删除
+                    entry = self._describe(item.name, item.path, known_ids.get(item.path, ""), size)
+                    if entry:
+                        index.add(item.name, *entry)
+        except OSError as e:
+            logging.warning(f"无法读取下载目录 {root}: {e}")
+        return index
+
+    def _apply_scan(self, root, index):
+        """在主线程中替换目录的索引并开始监视该目录"""
+        self._scanning.discard(root)
+        with self._lock:
+            first = root not in self._roots
+            self._roots[root] = index
+        if first:
+            if os.path.isdir(root):
+                self._watcher.addPath(root)
+            logging.debug("下载目录索引完成: %s, %d 个文件", root, len(index.files))
+            self.root_ready.emit(root)
+
+    def _on_directory_changed(self, root):
+        # 下载过程中目录会频繁变化，延迟一段时间后统一重新扫描
+        timer = self._rescan_timers.get(root)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(RESCAN_DELAY_MS)
+            timer.timeout.connect(lambda: self._rescan(root))
+            self._rescan_timers[root] = timer
+        timer.start()
+
+    def _rescan(self, root):
+        if root in self._scanning:
+            self._on_directory_changed(root)  # 上一次扫描还没结束
+            return
+        self._scanning.add(root)
+        self._scanner.submit(self._scan_in_background, root)
+
+
+_shared_index = None
+
+
+def get_download_index(config):
+    """获取全局共享的下载目录索引"""
+    global _shared_index
+    if _shared_index is None:
+        _shared_index = DownloadIndex(get_history_store(config))
+    return _shared_index
@@ -0,0 +1,123 @@
+# 视频格式表：从 yt-dlp -J 输出的视频信息中取出每个格式的字段，
+# 代替解析 -F 打印的文本表格
+from dataclasses import dataclass
+
+
+@dataclass
+class VideoFormat:
+    """一个可下载的格式"""
+    format_id: str
+    ext: str = ""
+    resolution: str = ""
+    fps: float = 0.0
+    vcodec: str = ""
+    acodec: str = ""
+    tbr: float = 0.0  # 总码率（KBit/s）
+    filesize: int = 0  # 字节，只有估计值时为估计值，未知为 0
+    note: str = ""
+
+    @property
+    def is_video(self):
+        return self.vcodec not in ("", "none")
+
+    @property
+    def is_audio(self):
+        return self.acodec not in ("", "none")
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_formats(info):
+    """把视频信息中的 formats 转换为 VideoFormat 列表（顺序与 yt-dlp 相同，从差到好）"""
+    formats = []
+    for item in (info or {}).get('formats') or []:
+        if not item.get('format_id'):
+            continue
+        vcodec = item.get('vcodec') or ""
+        acodec = item.get('acodec') or ""
+        resolution = item.get('resolution') or ""
+        if not resolution and item.get('width') and item.get('height'):
+            resolution = f"{item['width']}x{item['height']}"
+        formats.append(VideoFormat(
+            format_id=str(item['format_id']),
+            ext=item.get('ext') or "",
+            resolution=resolution or ("audio only" if vcodec == "none" else ""),
+            fps=_number(item.get('fps')),
+            vcodec=vcodec,
+            acodec=acodec,
+            tbr=_number(item.get('tbr')),
+            filesize=int(_number(item.get('filesize') or item.get('filesize_approx'))),
+            note=item.get('format_note') or "",
+        ))
+    return formats
+
+
+def _size_text(size):
+    if not size:
+        return ""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size}B"
+        size /= 1024
+
+
+def _align(rows):
+    """按列对齐，返回供等宽字体显示的文本"""
+    # 中文表头按两个字符宽度计算
+    width = lambda text: sum(2 if ord(c) > 0x2e80 else 1 for c in text)
+    widths = [max(width(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = [cell + " " * (widths[i] - width(cell)) for i, cell in enumerate(row)]
+        lines.append("  ".join(cells).rstrip())
+    return "\n".join(lines)
+
+
+def format_table(formats):
+    """生成对齐的文本表格，供等宽字体显示"""
+    header = ("ID", "扩展名", "分辨率", "帧率", "视频编码", "音频编码", "码率", "大小", "说明")
+    rows = [header]
+    for item in formats:
+        rows.append((
+            item.format_id,
+            item.ext,
+            item.resolution,
+            f"{item.fps:g}" if item.fps else "",
+            "" if item.vcodec == "none" else item.vcodec,
+            "" if item.acodec == "none" else item.acodec,
+            f"{item.tbr:.0f}k" if item.tbr else "",
+            _size_text(item.filesize),
+            item.note,
+        ))
+    return _align(rows)
+
+
+def format_matrix(format_lists):
+    """多个视频的合并格式表：每个格式ID一行，每个视频一列
+
+    format_lists 为每个视频的 VideoFormat 列表；视频有该格式时显示大小（未知时为 ✓），
+    没有时显示 -。格式的说明取自第一个有该格式的视频。
+    """
+    merged = {}
+    for formats in format_lists:
+        for item in formats:
+            merged.setdefault(item.format_id, item)
+    available = [{item.format_id: item for item in formats} for formats in format_lists]
+    header = ("ID", "扩展名", "分辨率", "视频编码", "音频编码") + tuple(
+        f"#{index}" for index in range(1, len(format_lists) + 1))
+    rows = [header]
+    for format_id, item in merged.items():
+        rows.append((
+            format_id,
+            item.ext,
+            item.resolution,
+            "" if item.vcodec == "none" else item.vcodec,
+            "" if item.acodec == "none" else item.acodec,
+        ) + tuple((_size_text(formats[format_id].filesize) or "✓") if format_id in formats else "-"
+                  for formats in available))
+    return _align(rows)
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import logging
+import datetime
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    path TEXT NOT NULL DEFAULT '',
+    url TEXT,
+    video_id TEXT,
+    filepath TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_timestamp ON downloads (timestamp);
+CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads (status);
+CREATE INDEX IF NOT EXISTS idx_downloads_video_id ON downloads (video_id);
+CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads (url);
+CREATE INDEX IF NOT EXISTS idx_downloads_filepath ON downloads (filepath);
+"""
+
+COLUMNS = ('id', 'timestamp', 'title', 'status', 'path', 'url', 'video_id', 'filepath')
+
+
+class HistoryStore:
+    """下载历史，保存在 SQLite 数据库中
+
+    每条记录只追加一行，不再随历史变长而重写整个 config.json；查询按页读取。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # WAL 模式下写入只追加日志，读取不会被写入阻塞
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def add(self, title, status, path, url=None, video_id=None, filepath=None, timestamp=None):
+        """追加一条历史记录，返回与 recent() 格式相同的记录"""
+        entry = {
+            'timestamp': timestamp or datetime.datetime.now().isoformat(),
+            'title': title,
+            'status': status,
+            'path': path or "",
+            'url': url,
+            'video_id': video_id,
+            'filepath': filepath,
+        }
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO downloads (timestamp, title, status, path, url, video_id, filepath) "
+                "VALUES (:timestamp, :title, :status, :path, :url, :video_id, :filepath)", entry)
+        entry['id'] = cursor.lastrowid
+        return entry
+
+    def recent(self, limit=10, offset=0, status=None):
+        """按时间倒序分页读取历史记录"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM downloads"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def video_ids_in(self, directory):
+        """目录中已知视频ID的文件，{文件路径: 视频ID}"""
+        # 用前缀范围查询，可以使用 filepath 上的索引
+        prefix = os.path.join(os.path.normpath(directory), "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filepath, video_id FROM downloads "
+                "WHERE filepath >= ? AND filepath < ? AND video_id IS NOT NULL",
+                (prefix, prefix + "\uffff")).fetchall()
+        return {row['filepath']: row['video_id'] for row in rows}
+
+    def count(self, status=None):
+        with self._lock:
+            if status:
+                return self._conn.execute("SELECT COUNT(*) FROM downloads WHERE status = ?", (status,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM downloads")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def migrate_from_config(self, config):
+        """把旧版 config.json 中的 download_history 导入数据库（只执行一次）"""
+        entries = config.config.get('download_history')
+        if entries is None:
+            return
+        rows = []
+        for entry in entries:
+            try:
+                rows.append((entry['timestamp'], entry['title'], entry['status'], entry.get('path', "")))
+            except (KeyError, TypeError):
+                continue
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO downloads (timestamp, title, status, path) VALUES (?, ?, ?, ?)", rows)
+        # 导入成功后再从配置中删除，config.json 只保存设置
+        del config.config['download_history']
+        config.save_config()
+        logging.info(f"已将 {len(rows)} 条下载历史迁移到数据库")
+
+
+_shared_history = None
+
+
+def get_history_store(config):
+    """获取全局共享的历史记录，第一次调用时打开数据库并迁移旧数据"""
+    global _shared_history
+    if _shared_history is None:
+        _shared_history = HistoryStore(config.config_dir / "history.db")
+        _shared_history.migrate_from_config(config)
+    return _shared_history
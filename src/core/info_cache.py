@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+from .file_index import youtube_video_id
+
+# 视频信息缓存的有效期（秒）：信息中的下载地址会过期，YouTube 通常为几个小时
+DEFAULT_INFO_TTL = 30 * 60
+
+
+def normalize_url(url):
+    """同一个视频的不同写法（youtu.be 短链接、带时间戳等）得到相同的键"""
+    video_id = youtube_video_id(url)
+    if video_id:
+        return f"youtube:{video_id}"
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+
+
+class InfoCache:
+    """yt-dlp -J 输出的视频信息，按链接保存在磁盘上
+
+    分析格式时写入；下载时如果信息还没过期，用 --load-info-json 直接使用，
+    不必再提取一次视频信息。
+    """
+
+    def __init__(self, cache_dir, ttl=DEFAULT_INFO_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def path(self, url):
+        digest = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{digest}.info.json"
+
+    def fresh_path(self, url):
+        """未过期的缓存文件路径，没有时返回 None"""
+        path = self.path(url)
+        try:
+            if time.time() - os.stat(path).st_mtime < self.ttl:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def get(self, url):
+        """读取未过期的视频信息，没有时返回 None"""
+        path = self.fresh_path(url)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"读取视频信息缓存失败 {path}: {e}")
+            return None
+
+    def put(self, url, text):
+        """保存 -J 的原始输出（先写临时文件再替换，下载进程不会读到写了一半的文件）"""
+        self.prune()
+        path = self.path(url)
+        temp = path.with_suffix('.tmp')
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp, path)
+        except OSError as e:
+            logging.warning(f"写入视频信息缓存失败 {path}: {e}")
+
+    def prune(self):
+        """删除过期的缓存文件"""
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if now - entry.stat().st_mtime >= self.ttl:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+_shared_cache = None
+
+
+def get_info_cache(config):
+    """获取全局共享的视频信息缓存"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = InfoCache(config.config_dir / "info_cache",
+                                  config.config.get('info_cache_ttl', DEFAULT_INFO_TTL))
+    return _shared_cache
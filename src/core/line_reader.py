@@ -0,0 +1,36 @@
+import re
+import codecs
+
+# 单行最大长度（字符），超过后直接作为一行输出，避免异常进程无限占用内存
+MAX_LINE_LENGTH = 64 * 1024
+
+LINE_BREAK_RE = re.compile(r'\r\n|\r|\n')
+
+
+class LineReader:
+    """按行读取进程输出：缓存不完整的行，并以增量方式解码 UTF-8
+
+    读取到的数据块可能包含多行，也可能在某一行（甚至某个多字节字符）的中间截断，
+    这里只返回完整的行。不使用 --newline 时 yt-dlp 用 \\r 刷新进度条，同样视为换行。
+    """
+
+    def __init__(self, max_line_length=MAX_LINE_LENGTH):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ""
+        self.max_line_length = max_line_length
+
+    def feed(self, data):
+        """加入新读取的字节，返回其中完整的行（不含换行符，跳过空行）"""
+        text = self._pending + self._decoder.decode(data)
+        lines = LINE_BREAK_RE.split(text)
+        self._pending = lines.pop()
+        while len(self._pending) > self.max_line_length:
+            lines.append(self._pending[:self.max_line_length])
+            self._pending = self._pending[self.max_line_length:]
+        return [line for line in lines if line]
+
+    def flush(self):
+        """进程结束时取出剩余的不完整行"""
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        return [line for line in LINE_BREAK_RE.split(text) if line]
@@ -0,0 +1,69 @@
+import os
+import gzip
+import queue
+import atexit
+import shutil
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 单个日志文件的大小上限，以及保留的压缩旧日志数量
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+DEFAULT_LOG_LEVEL = 'INFO'
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener = None
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    """轮转时把旧日志压缩保存"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def setup_logging(log_file, level=DEFAULT_LOG_LEVEL):
+    """配置日志：调用方只把记录放入队列，由后台线程写入按大小轮转的日志文件"""
+    global _listener
+    if _listener is not None:
+        set_log_level(level)
+        return
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    set_log_level(level)
+
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    # 退出时写完队列中剩余的日志
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """停止后台写日志的线程，写完队列中剩余的记录"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def set_log_level(level):
+    """运行时修改日志级别，如 'DEBUG'、'INFO'"""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if not isinstance(level, int):
+        level = logging.getLevelName(DEFAULT_LOG_LEVEL)
+    logging.getLogger().setLevel(level)
@@ -0,0 +1,54 @@
+import json
+import logging
+from .file_index import youtube_video_id
+
+# 展开播放列表时传给 yt-dlp 的参数：只获取条目列表，不提取每个视频的信息
+# （命令行引擎另外加上 -J 输出结果，内嵌引擎直接取得 extract_info 的返回值）
+EXPAND_ARGS = ["--yes-playlist", "--flat-playlist"]
+
+# 这些提取器的条目本身还是列表（如频道的“视频”“Shorts”标签页），不能作为单个视频下载
+NESTED_IE_KEYS = ('YoutubeTab', 'YoutubePlaylist')
+
+
+def should_expand(url):
+    """带视频ID但不带列表参数的链接就是单个视频，不需要先展开"""
+    return 'list=' in url or not youtube_video_id(url)
+
+
+def parse_expand_output(output):
+    """解析 yt-dlp -J 的输出，失败时返回 None"""
+    try:
+        return json.loads(output)
+    except (ValueError, TypeError) as e:
+        logging.warning(f"解析播放列表信息失败: {e}")
+        return None
+
+
+def _entry_url(entry):
+    url = entry.get('webpage_url') or entry.get('url') or ""
+    if not url.startswith(('http://', 'https://')) and entry.get('ie_key') == 'Youtube' and entry.get('id'):
+        url = f"https://www.youtube.com/watch?v={entry['id']}"
+    return url
+
+
+def playlist_entries(info):
+    """从 --flat-playlist 的结果中取出 (列表名称, [(链接, 视频ID, 标题)])
+
+    结果不是播放列表、或条目中还有嵌套的列表时返回 None，由调用方按原来的方式
+    交给一个 yt-dlp 进程处理整个列表。
+    """
+    if not isinstance(info, dict) or info.get('_type') != 'playlist':
+        return None
+    entries = []
+    for entry in info.get('entries') or []:
+        if not entry:
+            continue  # 已删除或不可用的视频
+        if entry.get('_type') == 'playlist' or entry.get('ie_key') in NESTED_IE_KEYS:
+            return None
+        url = _entry_url(entry)
+        if not url:
+            continue
+        video_id = entry.get('id') if entry.get('ie_key') == 'Youtube' else youtube_video_id(url)
+        entries.append((url, video_id or "", entry.get('title') or url))
+    title = info.get('title') or info.get('playlist_title') or "未命名播放列表"
+    return title, entries
@@ -0,0 +1,174 @@
+from PyQt6.QtCore import QObject, QProcess, QTimer, pyqtSignal
+import logging
+from urllib.parse import urlsplit
+from .probe import get_probe
+from .cookies import get_cookie_cache, remove_copy
+from .info_cache import get_info_cache, normalize_url
+from .file_index import youtube_video_id
+
+# 输入框停止编辑多久后开始预取（毫秒）
+DEFAULT_PREFETCH_DELAY = 800
+# 同时运行的 yt-dlp -J 进程数
+DEFAULT_PREFETCH_WORKERS = 2
+# 一次最多预取的链接数，粘贴大量链接时只预取前面的部分
+MAX_PREFETCH_URLS = 10
+
+
+class InfoPrefetcher(QObject):
+    """粘贴链接后在后台提前获取视频信息，写入视频信息缓存
+
+    输入框内容变化时调用 schedule()，停止编辑一段时间后才启动进程；
+    内容再次变化时，不再需要的进程会被终止。分析格式和下载时如果缓存中
+    已有信息，就不必再等待 yt-dlp 提取。开始下载的链接由 claim() 认领，
+    下载期间不会再被预取，正在预取的也不会因输入框变化而被终止；任务结束后用 release() 释放。
+    """
+    finished = pyqtSignal(str, bool)  # 链接, 是否成功
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.cache = get_info_cache(config)
+        self.cookie_cache = get_cookie_cache(config)
+        self.probe = get_probe()
+        self.enabled = config.config.get('speculative_analysis', True)
+        self.workers = max(1, config.config.get('prefetch_workers', DEFAULT_PREFETCH_WORKERS))
+        self.browser = None
+        self._candidates = []  # 最近一次 schedule() 传入的链接
+        self._queue = []  # 等待启动的链接
+        self._running = {}  # 规范化的链接 -> QProcess
+        self._failed = set()  # 本次运行中获取失败的链接，不再重复预取
+        self._claimed = {}  # 正在下载的链接 -> 认领它的任务ID集合，下载会使用（或不再需要）预取的结果
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(config.config.get('prefetch_delay', DEFAULT_PREFETCH_DELAY))
+        self._timer.timeout.connect(self.flush)
+        self.cookie_cache.extraction_finished.connect(lambda browser, success: self._start_next())
+        self.probe.probe_finished.connect(lambda available: self._start_next())
+
+    def schedule(self, urls, browser=None):
+        """输入内容变化：重新开始计时，传入空列表会取消所有预取"""
+        if not self.enabled:
+            return
+        self._candidates = list(urls)
+        self.browser = browser
+        if self._candidates:
+            self._timer.start()
+        else:
+            self.flush()
+
+    def flush(self):
+        """立即按最近一次传入的链接开始预取（点击分析时不必等计时结束）"""
+        self._timer.stop()
+        wanted = {}
+        for url in self._candidates:
+            # 频道、播放列表页面没有视频ID，得到的是列表信息，不能用于单个视频的下载
+            if 'youtu' in urlsplit(url).netloc and not youtube_video_id(url):
+                continue
+            key = normalize_url(url)
+            if key in wanted or key in self._failed or key in self._claimed or self.cache.fresh_path(url):
+                continue
+            wanted[key] = url
+            if len(wanted) >= MAX_PREFETCH_URLS:
+                break
+        for key in list(self._running):
+            if key not in wanted and key not in self._claimed:
+                self._cancel(key)
+        self._queue = [url for key, url in wanted.items() if key not in self._running]
+        self._start_next()
+
+    def is_pending(self, url):
+        """链接是否正在预取或排队等待预取"""
+        key = normalize_url(url)
+        return key in self._running or any(normalize_url(item) == key for item in self._queue)
+
+    def claim(self, url, task_id):
+        """链接即将开始下载：排队中的预取不再启动；正在预取时返回 True，
+        下载应等到 finished 之后再启动，直接使用缓存的信息，避免同时提取两次
+        """
+        key = normalize_url(url)
+        self._claimed.setdefault(key, set()).add(task_id)
+        self._queue = [item for item in self._queue if normalize_url(item) != key]
+        return key in self._running
+
+    def release(self, task_id):
+        """任务结束：不再有任务认领的链接可以重新预取（例如缓存过期后再次输入）"""
+        for key, task_ids in list(self._claimed.items()):
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self._claimed[key]
+
+    def shutdown(self):
+        """退出前终止所有预取进程"""
+        self._timer.stop()
+        self._candidates = []
+        self._queue = []
+        for key in list(self._running):
+            self._cancel(key)
+
+    def _cancel(self, key):
+        process = self._running.pop(key)
+        process.setProperty("canceled", True)
+        if process.state() != QProcess.ProcessState.NotRunning:
+            process.kill()
+        logging.debug(f"取消预取视频信息: {key}")
+
+    def _start_next(self):
+        if not self._queue:
+            return
+        if self.probe.ensure() != 'ready':
+            return  # 探测结束后再继续（失败时保留队列，点击分析时会显示错误）
+        browser = self.browser or self.config.config.get('browser', 'safari')
+        binary_path = self.probe.binary_path
+        # 与下载一样先导出 cookies，导出完成后再启动
+        if self.cookie_cache.request(browser, binary_path) == 'extracting':
+            return
+        while self._queue and len(self._running) < self.workers:
+            url = self._queue.pop(0)
+            key = normalize_url(url)
+            process = QProcess(self)
+            process.finished.connect(lambda code, status, p=process, u=url: self._on_finished(p, u))
+            process.errorOccurred.connect(lambda error, p=process, u=url: self._on_error(p, u, error))
+            self._running[key] = process
+            logging.debug(f"预取视频信息: {url}")
+            cookie_args, cookie_copy = self.cookie_cache.process_cookie_args(browser)
+            process.setProperty("cookie_copy", cookie_copy or "")
+            process.start(binary_path, cookie_args + ["-J", "--no-playlist", url])
+
+    def _on_finished(self, process, url):
+        remove_copy(process.property("cookie_copy"))
+        process.deleteLater()
+        if process.property("canceled"):
+            return
+        key = normalize_url(url)
+        self._running.pop(key, None)
+        stdout = process.readAllStandardOutput().data().decode('utf-8', errors='replace')
+        success = process.exitCode() == 0 and bool(stdout.strip())
+        if success:
+            self.cache.put(url, stdout)
+        else:
+            self._failed.add(key)
+            stderr = process.readAllStandardError().data().decode('utf-8', errors='replace')
+            logging.debug(f"预取视频信息失败 {url}: {stderr.strip()}")
+        self.finished.emit(url, success)
+        self._start_next()
+
+    def _on_error(self, process, url, error):
+        if error != QProcess.ProcessError.FailedToStart or process.property("canceled"):
+            return
+        remove_copy(process.property("cookie_copy"))
+        process.deleteLater()
+        key = normalize_url(url)
+        self._running.pop(key, None)
+        self._failed.add(key)
+        self.finished.emit(url, False)
+
+
+_shared_prefetcher = None
+
+
+def get_info_prefetcher(config):
+    """获取全局共享的预取器，基础模式和高级模式共用同一组进程"""
+    global _shared_prefetcher
+    if _shared_prefetcher is None:
+        _shared_prefetcher = InfoPrefetcher(config)
+    return _shared_prefetcher
@@ -0,0 +1,108 @@
+from PyQt6.QtCore import QObject, QProcess, pyqtSignal
+import os
+import re
+import shutil
+import logging
+
+
+class YtDlpProbe(QObject):
+    """探测 yt-dlp 可执行文件，路径、版本和支持的参数在本次会话内缓存"""
+    probe_finished = pyqtSignal(bool)  # 是否可用
+
+    def __init__(self):
+        super().__init__()
+        self.binary_path = None  # yt-dlp 可执行文件的绝对路径
+        self.version = ""
+        self.capabilities = set()  # --help 中列出的所有参数
+        self.mtime = None  # 探测时可执行文件的修改时间
+        self.state = 'idle'  # idle / probing / ready / failed
+        self._process = None
+
+    def start(self):
+        """异步开始探测，已在探测中或已有结果时不重复执行"""
+        if self.state in ('probing', 'ready'):
+            return
+        self._probe()
+
+    def ensure(self):
+        """任务启动前调用，可执行文件被更新或重新安装时才会重新探测
+
+        返回当前状态：ready / probing / failed
+        """
+        if self.state == 'ready':
+            if self._current_mtime() != self.mtime:
+                logging.info("yt-dlp 可执行文件已变化，重新探测")
+                self._probe()
+        elif self.state in ('idle', 'failed'):
+            # 失败后用户可能已经安装了 yt-dlp，查找路径的开销很小
+            if self.state == 'idle' or self._resolve_binary():
+                self._probe()
+        return self.state
+
+    def supports(self, option):
+        """当前 yt-dlp 是否支持指定的命令行参数"""
+        return option in self.capabilities
+
+    def _resolve_binary(self):
+        return shutil.which("yt-dlp", path=os.environ.get('PATH'))
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.binary_path).st_mtime
+        except (OSError, TypeError):
+            return None
+
+    def _probe(self):
+        self.binary_path = self._resolve_binary()
+        if not self.binary_path:
+            logging.error("未找到 yt-dlp 命令")
+            self._set_result(False)
+            return
+        self.state = 'probing'
+        self.mtime = self._current_mtime()
+        self._run(["--version"], self._handle_version)
+
+    def _run(self, args, callback):
+        process = QProcess(self)
+        process.finished.connect(lambda code, status: callback(process, code))
+        process.errorOccurred.connect(lambda error: self._handle_error(process, error))
+        self._process = process
+        process.start(self.binary_path, args)
+
+    def _handle_error(self, process, error):
+        if error == QProcess.ProcessError.FailedToStart and process is self._process:
+            logging.error(f"无法启动 yt-dlp: {process.errorString()}")
+            self._set_result(False)
+
+    def _handle_version(self, process, exit_code):
+        if exit_code != 0:
+            logging.error(f"yt-dlp 检查失败，退出码: {exit_code}, "
+                          f"错误输出: {process.readAllStandardError().data().decode(errors='replace')}")
+            self._set_result(False)
+            return
+        self.version = process.readAllStandardOutput().data().decode(errors='replace').strip()
+        process.deleteLater()
+        self._run(["--help"], self._handle_help)
+
+    def _handle_help(self, process, exit_code):
+        help_text = process.readAllStandardOutput().data().decode(errors='replace')
+        self.capabilities = set(re.findall(r'(?<![\w-])(--[a-z0-9][a-z0-9-]*)', help_text))
+        process.deleteLater()
+        logging.info(f"yt-dlp 路径: {self.binary_path}, 版本: {self.version}")
+        self._set_result(True)
+
+    def _set_result(self, available):
+        self.state = 'ready' if available else 'failed'
+        self._process = None
+        self.probe_finished.emit(available)
+
+
+_shared_probe = None
+
+
+def get_probe():
+    """获取全局共享的探测器，第一次调用时创建"""
+    global _shared_probe
+    if _shared_probe is None:
+        _shared_probe = YtDlpProbe()
+    return _shared_probe
@@ -0,0 +1,189 @@
+# yt-dlp 机器可读进度协议：通过 --progress-template 和 --print 让 yt-dlp 输出
+# 以固定前缀开头、制表符分隔的记录，这里负责生成参数并把输出行解析为 ProgressRecord
+from dataclasses import dataclass
+
+PROGRESS_PREFIX = "[yg-progress]"
+ITEM_PREFIX = "[yg-item]"
+FILE_PREFIX = "[yg-file]"
+FIELD_SEP = "\t"
+
+# 下载进度：状态、已下载字节、总字节、估计总字节、速度、剩余秒数、列表序号、视频ID
+PROGRESS_TEMPLATE = "download:" + PROGRESS_PREFIX + FIELD_SEP.join([
+    "%(progress.status)s",
+    "%(progress.downloaded_bytes)s",
+    "%(progress.total_bytes)s",
+    "%(progress.total_bytes_estimate)s",
+    "%(progress.speed)s",
+    "%(progress.eta)s",
+    "%(info.playlist_index)s",
+    "%(info.id)s",
+])
+
+# 开始下载某个视频：列表序号、列表总数、视频ID、标题（标题放在最后，允许包含分隔符）
+ITEM_TEMPLATE = "before_dl:" + ITEM_PREFIX + FIELD_SEP.join([
+    "%(playlist_index)s",
+    "%(playlist_count)s",
+    "%(id)s",
+    "%(title)s",
+])
+
+# 文件移动到最终位置后：视频ID、发布日期、列表序号、最终文件路径（路径放在最后，允许包含分隔符）
+FILE_TEMPLATE = "after_move:" + FILE_PREFIX + FIELD_SEP.join([
+    "%(id)s",
+    "%(upload_date)s",
+    "%(playlist_index)s",
+    "%(filepath)s",
+])
+
+
+@dataclass
+class ProgressRecord:
+    """一条解析后的进度记录，kind 为 progress / item / file"""
+    kind: str
+    status: str = ""
+    downloaded_bytes: int = 0
+    total_bytes: int = 0
+    speed: float = 0.0
+    eta: int = None
+    playlist_index: int = 0
+    playlist_count: int = 0
+    video_id: str = ""
+    title: str = ""
+    filepath: str = ""
+    upload_date: str = ""  # YYYYMMDD
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 0.0
+        return round(min(self.downloaded_bytes * 100 / self.total_bytes, 100.0), 1)
+
+
+REQUIRED_OPTIONS = ("--newline", "--progress-template", "--print", "--no-quiet", "--no-simulate")
+
+
+def structured_args(probe):
+    """生成结构化输出参数；旧版 yt-dlp 不支持时返回空列表，此时退回文本解析"""
+    if not all(probe.supports(option) for option in REQUIRED_OPTIONS):
+        return []
+    # --print 默认会开启安静模式，需要 --no-quiet 保留其余输出
+    return [
+        "--newline", "--progress-template", PROGRESS_TEMPLATE,
+        "--print", ITEM_TEMPLATE, "--print", FILE_TEMPLATE,
+        "--no-quiet", "--no-simulate",
+    ]
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (ValueError, OverflowError):  # yt-dlp 用 NA 表示缺失字段
+        return 0
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def parse_line(line):
+    """把一行输出解析为 ProgressRecord，不是结构化记录时返回 None"""
+    if not line.startswith("[yg-"):
+        return None
+    if line.startswith(PROGRESS_PREFIX):
+        fields = line[len(PROGRESS_PREFIX):].split(FIELD_SEP)
+        if len(fields) < 8:
+            return None
+        status, downloaded, total, estimate, speed, eta, index, video_id = fields[:8]
+        return ProgressRecord(
+            kind='progress',
+            status=status,
+            downloaded_bytes=_int(downloaded),
+            total_bytes=_int(total) or _int(estimate),
+            speed=_float(speed),
+            eta=_int(eta) if eta != "NA" else None,
+            playlist_index=_int(index),
+            video_id=video_id if video_id != "NA" else "",
+        )
+    if line.startswith(ITEM_PREFIX):
+        fields = line[len(ITEM_PREFIX):].split(FIELD_SEP, 3)
+        if len(fields) < 4:
+            return None
+        index, count, video_id, title = fields
+        return ProgressRecord(
+            kind='item',
+            playlist_index=_int(index),
+            playlist_count=_int(count),
+            video_id=video_id if video_id != "NA" else "",
+            title=title,
+        )
+    if line.startswith(FILE_PREFIX):
+        fields = line[len(FILE_PREFIX):].split(FIELD_SEP, 3)
+        if len(fields) < 4:
+            return None
+        video_id, upload_date, index, filepath = fields
+        return ProgressRecord(kind='file', video_id=video_id, filepath=filepath,
+                              upload_date=upload_date if upload_date != "NA" else "", playlist_index=_int(index))
+    return None
+
+
+def format_bytes(value):
+    """格式化字节数，与 yt-dlp 的显示方式一致（如 50.75MiB）"""
+    if not value:
+        return "未知"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.2f}{unit}"
+        value /= 1024
+    return f"{value:.2f}TiB"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "未知"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def parse_bytes(text):
+    """把 yt-dlp 显示的大小（如 50.75MiB、~1.2GiB、2.52MiB/s）还原为字节数"""
+    text = text.lstrip('~').split('/')[0]
+    for power, unit in enumerate(("KiB", "MiB", "GiB", "TiB"), 1):
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)]) * 1024 ** power)
+            except ValueError:
+                return 0
+    try:
+        return int(float(text.rstrip('B')))
+    except ValueError:
+        return 0
+
+
+def parse_eta(text):
+    """把 00:15 或 1:02:03 形式的剩余时间还原为秒数，无法解析时返回 None"""
+    try:
+        seconds = 0
+        for part in text.split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def format_transfer(total_bytes, speed, eta):
+    """大小、速度和剩余时间，任务列表的状态栏直接显示这一部分"""
+    speed_text = f"{format_bytes(speed)}/s" if speed else "未知"
+    return f"大小: {format_bytes(total_bytes)}, 速度: {speed_text}, 剩余: {format_eta(eta)}"
+
+
+def format_progress_text(record, current_item=0, total_items=0):
+    """生成日志使用的进度文本"""
+    text = f"下载进度: {record.percent}% ({format_transfer(record.total_bytes, record.speed, record.eta)})"
+    if current_item:
+        text += f" - 正在下载第{current_item}个/共{total_items}个"
+    return text
@@ -0,0 +1,127 @@
+# 下载失败后的重试：根据 yt-dlp 的错误输出判断失败的类型，
+# 网络错误和限流稍后自动重试，需要登录或视频不可用时直接失败
+import re
+import random
+
+RETRYABLE = 'retryable'  # 网络中断、超时、服务器 5xx 等临时错误
+RATE_LIMITED = 'rate_limited'  # HTTP 429，需要等待更久
+AUTH = 'auth'  # 需要登录或 cookies 失效，重试没有用
+PERMANENT = 'permanent'  # 视频不存在、已删除、格式不可用等
+STALLED = 'stalled'  # 长时间没有进展，被看门狗终止
+
+# 界面上显示的失败原因
+KIND_LABELS = {
+    RETRYABLE: "网络错误",
+    RATE_LIMITED: "请求过于频繁",
+    AUTH: "需要登录",
+    PERMANENT: "视频不可用",
+    STALLED: "下载停滞",
+}
+
+# 一次失败中出现多种错误时，取排在前面的类型
+_PRECEDENCE = (PERMANENT, AUTH, RATE_LIMITED, RETRYABLE)
+
+_PATTERNS = {
+    PERMANENT: re.compile(
+        r"video unavailable|this video is unavailable|has been removed|copyright|unsupported url"
+        r"|is not a valid url|requested format is not available|no video formats found"
+        r"|http error 404|http error 410|premieres in|live event will begin", re.IGNORECASE),
+    AUTH: re.compile(
+        r"sign in to confirm|login required|\blog ?in\b|members[- ]only|join this channel|private video"
+        r"|http error 401|age[- ]restricted|inappropriate for some users|cookies are no longer valid",
+        re.IGNORECASE),
+    RATE_LIMITED: re.compile(r"http error 429|too many requests|rate[- ]limit", re.IGNORECASE),
+    # YouTube 的下载地址过期时也会返回 403，重新提取后通常可以继续
+    RETRYABLE: re.compile(
+        r"http error 5\d\d|http error 403|connection (?:reset|refused|aborted)|timed out|timeout"
+        r"|temporary failure in name resolution|network is unreachable|incompleteread"
+        r"|remote end closed|eof occurred|unable to download video data"
+        r"|fragment \d+ not found|giving up after \d+ fragment retries", re.IGNORECASE),
+}
+
+# YouTube 限流时报告 "Video unavailable. This content isn't available, try again later."，
+# 虽然包含 PERMANENT 的关键词，但属于 RATE_LIMITED，稍后重试可以成功
+_RATE_LIMITED_OVERRIDE = re.compile(r"content isn.t available, try again later", re.IGNORECASE)
+
+# 错误信息中要求等待的时间，如 "Retry-After: 120" 或 "try again in 5 minutes"
+_RETRY_AFTER_RE = re.compile(r"retry[- ]after[:=]?\s*(\d+)", re.IGNORECASE)
+_TRY_AGAIN_RE = re.compile(r"(?:try again|retry) in (\d+)\s*(second|minute|hour)", re.IGNORECASE)
+_UNIT_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 5  # 第一次重试前的基础等待时间（秒）
+DEFAULT_MAX_RETRY_DELAY = 300
+
+
+def classify_line(line):
+    """判断一行错误输出的失败类型，无法判断时返回 None"""
+    if _RATE_LIMITED_OVERRIDE.search(line):
+        return RATE_LIMITED
+    for kind in _PRECEDENCE:
+        if _PATTERNS[kind].search(line):
+            return kind
+    return None
+
+
+def retry_after_hint(line):
+    """从输出中取出要求等待的秒数，没有时返回 None"""
+    match = _RETRY_AFTER_RE.search(line)
+    if match:
+        return int(match.group(1))
+    match = _TRY_AGAIN_RE.search(line)
+    if match:
+        return int(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+    return None
+
+
+class FailureClassifier:
+    """收集一次下载尝试的错误输出
+
+    只有 ERROR 行决定失败类型（yt-dlp 内部重试时的警告不算），
+    等待时间的提示可以出现在任何一行。
+    """
+
+    def __init__(self):
+        self.kind = None
+        self.retry_after = None
+
+    def feed(self, line):
+        hint = retry_after_hint(line)
+        if hint is not None:
+            self.retry_after = max(hint, self.retry_after or 0)
+        if 'ERROR' not in line:
+            return
+        kind = classify_line(line)
+        if kind and (self.kind is None
+                     or (self.kind in _PRECEDENCE and _PRECEDENCE.index(kind) < _PRECEDENCE.index(self.kind))):
+            self.kind = kind
+
+    def mark_stalled(self):
+        """进程因停滞被终止，之后的输出不再改变失败类型"""
+        self.kind = STALLED
+
+    @property
+    def label(self):
+        return KIND_LABELS.get(self.kind, "")
+
+
+class RetryPolicy:
+    """每个任务最多重试 max_retries 次，等待时间按指数增长并加入随机抖动"""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_RETRY_DELAY,
+                 max_delay=DEFAULT_MAX_RETRY_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, kind, attempt, retry_after=None):
+        """第 attempt 次重试前等待的秒数，不应重试时返回 None"""
+        if kind not in (RETRYABLE, RATE_LIMITED, STALLED) or attempt > self.max_retries:
+            return None
+        if retry_after:
+            # 服务器明确要求的等待时间，但不超过上限（否则任务会长时间停在等待中）
+            return float(min(self.max_delay, retry_after))
+        base = self.base_delay * (4 if kind == RATE_LIMITED else 1)
+        delay = min(self.max_delay, base * 2 ** (attempt - 1))
+        # 一半固定、一半随机，多个任务同时失败时不会在同一时刻一起重试
+        return delay / 2 + random.uniform(0, delay / 2)
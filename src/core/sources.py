@@ -0,0 +1,106 @@
+import sqlite3
+import datetime
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    output_path TEXT NOT NULL,
+    added_at TEXT NOT NULL,
+    last_sync TEXT,
+    last_video_id TEXT,
+    last_status TEXT
+);
+"""
+
+COLUMNS = ('id', 'url', 'title', 'output_path', 'added_at', 'last_sync', 'last_video_id', 'last_status')
+
+
+class SourceStore:
+    """订阅的频道和播放列表，以及每个来源上次同步的状态
+
+    与下载历史保存在同一个数据库中。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def add(self, url, output_path, title=""):
+        """添加来源，链接已存在时只更新保存目录；返回来源 id"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sources (url, title, output_path, added_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET output_path = excluded.output_path",
+                (url, title, output_path, datetime.datetime.now().isoformat()))
+            return self._conn.execute("SELECT id FROM sources WHERE url = ?", (url,)).fetchone()[0]
+
+    def remove(self, source_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+
+    def get(self, source_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM sources WHERE id = ?", (source_id,)).fetchone()
+        return dict(row) if row else None
+
+    def all(self):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM sources ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_synced(self, source_id, success, title=None, last_video_id=None):
+        """记录一次同步的结果；只有成功的同步才更新同步时间，下次从这里继续"""
+        now = datetime.datetime.now().isoformat()
+        with self._lock, self._conn:
+            if success:
+                self._conn.execute(
+                    "UPDATE sources SET last_sync = ?, last_status = ?, "
+                    "last_video_id = COALESCE(?, last_video_id), title = COALESCE(NULLIF(?, ''), title) "
+                    "WHERE id = ?",
+                    (now, '成功', last_video_id, title, source_id))
+            else:
+                self._conn.execute("UPDATE sources SET last_status = ? WHERE id = ?", ('失败', source_id))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_channel_url(url):
+    """频道的视频按发布时间从新到旧排列；播放列表的顺序由创建者决定"""
+    return 'list=' not in url and '/playlist' not in url
+
+
+def sync_options(source):
+    """同步来源时传给 Downloader.start_download 的选项
+
+    sync_break：可以在遇到已下载的视频时停止（只适用于频道）
+    sync_after：上次成功同步的日期（YYYYMMDD），更早发布的视频不再检查
+    """
+    options = {'sync': True, 'sync_break': is_channel_url(source['url']), 'sync_after': None}
+    if options['sync_break'] and source.get('last_sync'):
+        try:
+            options['sync_after'] = datetime.datetime.fromisoformat(source['last_sync']).strftime("%Y%m%d")
+        except ValueError:
+            pass
+    return options
+
+
+_shared_sources = None
+
+
+def get_source_store(config):
+    """获取全局共享的订阅来源"""
+    global _shared_sources
+    if _shared_sources is None:
+        _shared_sources = SourceStore(config.config_dir / "history.db")
+    return _shared_sources
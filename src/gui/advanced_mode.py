@@ -4,36 +4,53 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt6.QtCore import pyqtSignal, Qt, QThread
 from PyQt6.QtGui import QFont, QTextCursor
 from core.downloader import Downloader
+from core.history import get_history_store
+from core.progress import format_transfer
+from core.formats import parse_formats, format_table, format_matrix
+from core.prefetch import get_info_prefetcher
+from core.info_cache import normalize_url
+from concurrent.futures import ThreadPoolExecutor
 import sys
-import datetime
-from PyQt6.QtWidgets import QApplication
 from .styles import *  # 导入样式
+from .progress_coalescer import ProgressCoalescer, DEFAULT_REFRESH_HZ
+
+# 同时分析的链接数
+DEFAULT_ANALYZE_WORKERS = 3
 
 # 添加分析线程类
 class AnalyzeThread(QThread):
-    finished = pyqtSignal(str)  # 分析完成信号
+    result = pyqtSignal(str, object, str)  # 链接, 视频信息（失败时为 None）, 错误信息
     
-    def __init__(self, downloader, url):
+    def __init__(self, downloader, urls, browser=None, workers=DEFAULT_ANALYZE_WORKERS):
         super().__init__()
         self.downloader = downloader
-        self.url = url
+        self.urls = urls
+        self.browser = browser
+        self.workers = max(1, workers)
         
-    def run(self):
+    def _analyze(self, url):
         try:
-            formats = self.downloader.analyze_formats(self.url)
-            self.finished.emit(formats)
+            info = self.downloader.analyze_formats(url, self.browser)
+            self.result.emit(url, info, "")
         except Exception as e:
-            self.finished.emit(f"分析失败: {str(e)}")
+            self.result.emit(url, None, f"分析失败: {str(e)}")
+        
+    def run(self):
+        # 多个链接在线程池中同时分析，每个链接完成后立即发送结果
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(self.urls))) as pool:
+            list(pool.map(self._analyze, self.urls))
 
 class AdvancedModeWidget(QWidget):
     download_requested = pyqtSignal(str, str, dict)  # url, output_path, format_options
     mode_switch_requested = pyqtSignal()
     
-    def __init__(self, config):
+    def __init__(self, config, downloader=None):
         super().__init__()
         self.config = config
-        self.format_list = []  # 存储视频格式信息
-        self.downloader = Downloader()  # 添加下载器实例
+        self.history = get_history_store(config)
+        self.format_lists = {}  # 链接 -> 视频格式信息
+        # 与基础模式共用下载器，任务进入同一个下载队列
+        self.downloader = downloader or Downloader()
         
         # 添加下载任务管理
         self.total_urls = 0
@@ -41,10 +58,21 @@ class AdvancedModeWidget(QWidget):
         self.download_tasks = {}
         
         # 连接下载器信号
-        self.downloader.output_received.connect(self.update_output)
+        # 进度事件先经过合并，按固定频率刷新界面
+        self.progress_coalescer = ProgressCoalescer(
+            self.config.config.get('ui_refresh_hz', DEFAULT_REFRESH_HZ), self)
+        self.downloader.event_received.connect(self.progress_coalescer.push)
+        self.progress_coalescer.event_ready.connect(self.update_event)
         self.downloader.download_finished.connect(self.download_finished)
         
-        self.analyze_thread = None  # 添加线程引用
+        self.analyze_threads = []  # 保留线程引用，运行结束前不能被回收
+        self.analyze_urls = []  # 本次分析的链接
+        self.analyze_results = {}  # 链接 -> (视频信息, 错误信息)
+        
+        # 输入链接后提前在后台获取视频信息，点击分析时通常已经在缓存中
+        self.prefetcher = get_info_prefetcher(config)
+        self.prefetcher.finished.connect(self._on_prefetched)
+        self.waiting_urls = set()  # 点击分析时仍在预取的链接，预取结束后再分析
         
         self.init_ui()
 
@@ -66,8 +94,12 @@ class AdvancedModeWidget(QWidget):
         url_layout = QVBoxLayout()
         url_label = QLabel("视频URL:")
         url_label.setStyleSheet(LABEL_STYLE)
-        self.url_input = QLineEdit()
+        self.url_input = QTextEdit()
         self.url_input.setStyleSheet(INPUT_STYLE)
+        self.url_input.setPlaceholderText("每行一个链接；需要单独指定格式时在链接后加空格和格式，如 137+140")
+        self.url_input.setAcceptRichText(False)
+        self.url_input.setFixedHeight(80)
+        self.url_input.textChanged.connect(self.prefetch_urls)
         url_layout.addWidget(url_label)
         url_layout.addWidget(self.url_input)
         layout.addLayout(url_layout)
@@ -238,15 +270,25 @@ class AdvancedModeWidget(QWidget):
         self.scroll_area.setWidget(progress_area)
         layout.addWidget(self.scroll_area)
 
+    def _input_entries(self):
+        """输入框中的 (链接, 单独指定的格式)，没有指定格式时为空字符串"""
+        entries = []
+        for line in self.url_input.toPlainText().split('\n'):
+            parts = line.split(None, 1)
+            if parts:
+                entries.append((parts[0], parts[1].strip() if len(parts) > 1 else ""))
+        return entries
+
     def analyze_video(self):
-        url = self.url_input.text().strip()
-        if not url:
+        entries = self._input_entries()
+        if not entries:
             self.format_display.append("请输入视频URL！")
             return
             
-        if not self.validate_url(url):
+        if not all(self.validate_url(url) for url, _ in entries):
             self.format_display.append("请输入有效的 YouTube 视频链接！")
             return
+        urls = list(dict.fromkeys(url for url, _ in entries))
             
         # 显示分析提示
         self.analyze_tip.setText("正在分析视频格式，请耐心等待...")
@@ -259,25 +301,74 @@ class AdvancedModeWidget(QWidget):
         
         # 清空输出区域
         self.format_display.clear()
-        
-        # 创建并启动分析线程
-        self.analyze_thread = AnalyzeThread(self.downloader, url)
-        self.analyze_thread.finished.connect(self.handle_analyze_result)
-        self.analyze_thread.start()
+        self.analyze_urls = urls
+        self.analyze_results = {}
+        
+        # 后台已经在获取的链接等预取完成，不再启动第二个进程
+        self.prefetcher.flush()
+        self.waiting_urls = {url for url in urls if self.prefetcher.is_pending(url)}
+        rest = [url for url in urls if url not in self.waiting_urls]
+        if rest:
+            self._start_analyze_thread(rest)
+        
+    def _start_analyze_thread(self, urls):
+        # 创建并启动分析线程（信息已在缓存中时立即返回）
+        self.analyze_threads = [thread for thread in self.analyze_threads if thread.isRunning()]
+        thread = AnalyzeThread(self.downloader, urls, self.browser_combo.currentData(),
+                               self.config.config.get('analyze_workers', DEFAULT_ANALYZE_WORKERS))
+        thread.result.connect(self.handle_analyze_result)
+        self.analyze_threads.append(thread)
+        thread.start()
+        
+    def prefetch_urls(self):
+        """链接变化后在后台提前获取视频信息"""
+        if self.waiting_urls:
+            # 链接变化后预取会被取消，正在等待的分析改为自己获取
+            waiting_urls, self.waiting_urls = list(self.waiting_urls), set()
+            self._start_analyze_thread(waiting_urls)
+        self.prefetcher.schedule([url for url, _ in self._input_entries() if self.validate_url(url)],
+                                 self.browser_combo.currentData())
+        
+    def _on_prefetched(self, url, success):
+        """等待中的预取结束：成功时从缓存读取，失败时重新获取以显示错误信息"""
+        key = normalize_url(url)
+        finished = [item for item in self.waiting_urls if normalize_url(item) == key]
+        if finished:
+            self.waiting_urls.difference_update(finished)
+            self._start_analyze_thread(finished)
 
-    def handle_analyze_result(self, formats):
-        """处理分析结果"""
+    def handle_analyze_result(self, url, info, error):
+        """处理一个链接的分析结果，全部完成后显示格式表"""
+        if url not in self.analyze_urls or url in self.analyze_results:
+            return  # 上一次分析遗留的结果
+        self.analyze_results[url] = (info, error)
+        if len(self.analyze_results) < len(self.analyze_urls):
+            self.analyze_tip.setText(f"正在分析视频格式，已完成 {len(self.analyze_results)}/{len(self.analyze_urls)}...")
+            return
+        
         # 隐藏提示
         self.analyze_tip.hide()
         
-        # 格式化输出
-        formatted_lines = []
-        for line in formats.split('\n'):
-            if '[info]' in line:
-                line = line.split('[info]')[1].strip()
-            formatted_lines.append(line)
-        
-        self.format_display.setText('\n'.join(formatted_lines))
+        self.format_lists = {url: parse_formats(info) for url, (info, error) in self.analyze_results.items()
+                             if info is not None}
+        if len(self.analyze_urls) == 1:
+            info, error = self.analyze_results[url]
+            if info is None:
+                self.format_display.setText(error)
+            else:
+                # 显示视频标题和格式表
+                title = info.get('title') or ""
+                table = format_table(self.format_lists[url])
+                self.format_display.setText(f"{title}\n\n{table}" if title else table)
+        else:
+            # 多个视频：列出编号和标题，格式表中每个视频一列
+            lines = []
+            for index, item in enumerate(self.analyze_urls, 1):
+                info, error = self.analyze_results[item]
+                lines.append(f"#{index} {info.get('title') or item}" if info is not None
+                             else f"#{index} {item}  {error}")
+            table = format_matrix([self.format_lists.get(item, []) for item in self.analyze_urls])
+            self.format_display.setText("\n".join(lines) + "\n\n" + table)
         self.format_display.moveCursor(QTextCursor.MoveOperation.Start)
         
         # 恢复按钮状态
@@ -298,20 +389,20 @@ class AdvancedModeWidget(QWidget):
         self.config.save_config()
         
     def start_download(self):
-        url = self.url_input.text().strip()
-        if not url:
+        entries = self._input_entries()
+        if not entries:
             self.format_display.append("请输入视频URL！")
             return
             
-        if not self.validate_url(url):
+        if not all(self.validate_url(url) for url, _ in entries):
             self.format_display.append("请输入有效的 YouTube 视频链接！")
             return
             
-        # 获取格式ID
+        # 获取格式ID（用于所有没有单独指定格式的链接）
         video_format = self.video_format.text().strip()
         audio_format = self.audio_format.text().strip()
         
-        if not video_format and not audio_format:
+        if not video_format and not audio_format and not all(override for _, override in entries):
             self.format_display.append("请至少输入一个格式ID！")
             return
             
@@ -332,7 +423,6 @@ class AdvancedModeWidget(QWidget):
         
         # 准备下载选项
         format_options = {
-            'format': format_str,
             'browser': self.browser_combo.currentData(),  # 确保正确获取浏览器选择
             'download_subs': self.subtitle_checkbox.isChecked()  # 添加字幕下载选项
         }
@@ -347,7 +437,7 @@ class AdvancedModeWidget(QWidget):
         self.downloader.reset_state()
         
         # 重置界面状态
-        self.total_urls = 1  # 高级模式一次只下载一个视频
+        self.total_urls = len(entries)
         self.completed_urls = 0
         self.download_tasks.clear()
         
@@ -357,18 +447,21 @@ class AdvancedModeWidget(QWidget):
             if item.widget():
                 item.widget().deleteLater()
         
-        # 创建新的进度显示
-        task_id = "Task-1"
-        task_widget = self.create_download_progress_widget(task_id, url)
-        self.progress_layout.addWidget(task_widget)
+        # 创建新的进度显示（任务ID与基础模式的任务区分开）
+        tasks = []
+        for index, (url, override) in enumerate(entries, 1):
+            task_id = f"Advanced-{index}"
+            self.progress_layout.addWidget(self.create_download_progress_widget(task_id, url, index))
+            tasks.append((task_id, url, override or format_str))
         
-        # 开始下载
-        if not self.downloader.start_download(url, output_path, format_options):
-            self.format_display.append("下载已在进行中！")
+        # 全部加入下载队列，按同时下载数依次开始
+        for task_id, url, format_str in tasks:
+            if not self.downloader.start_download(url, output_path, dict(format_options, format=format_str),
+                                                  task_id=task_id):
+                self.format_display.append("下载已在进行中！")
         
     def save_browser_setting(self):
-        self.config.config['browser'] = self.browser_combo.currentData()
-        self.config.save_config() 
+        self.config.set('browser', self.browser_combo.currentData())
 
     def validate_url(self, url):
         """验证 URL 是否是有效的 YouTube 链接"""
@@ -390,12 +483,15 @@ class AdvancedModeWidget(QWidget):
         self.subtitle_checkbox.setEnabled(True)  # 启用字幕复选框
         self.download_button.setEnabled(True)
         self.download_button.setText("开始下载")
+        try:
+            self.download_button.clicked.disconnect()
+        except TypeError:
+            pass
+        self.download_button.clicked.connect(self.start_download)
 
     def switch_to_basic_mode(self):
-        # 在切换模式前保存当前的浏览器设置
+        # 在切换模式前保存当前的浏览器设置（下载位置已经在配置中）
         self.save_browser_setting()
-        # 确保下载位置也被保存（last_download_path已经在配置中了，只需确保保存配置）
-        self.config.save_config()
         # 发送信号给主窗口
         self.mode_switch_requested.emit() 
 
@@ -408,7 +504,7 @@ class AdvancedModeWidget(QWidget):
         self.browser_combo.setEnabled(False)
         self.subtitle_checkbox.setEnabled(False)  # 禁用字幕复选框
 
-    def create_download_progress_widget(self, task_id, url):
+    def create_download_progress_widget(self, task_id, url, index=1):
         """为下载任务创建进度显示组件"""
         task_widget = QWidget()
         layout = QVBoxLayout(task_widget)
@@ -417,7 +513,7 @@ class AdvancedModeWidget(QWidget):
         
         # 任务信息
         info_layout = QHBoxLayout()
-        task_label = QLabel(f"任务 {task_id}:")
+        task_label = QLabel(f"任务 {index}:")
         title_label = QLabel("正在获取视频信息...")
         title_label.setStyleSheet("color: #333333;")
         title_label.setWordWrap(True)
@@ -456,6 +552,7 @@ class AdvancedModeWidget(QWidget):
         # 存储任务信息
         self.download_tasks[task_id] = {
             'widget': task_widget,
+            'url': url,
             'progress_bar': progress_bar,
             'status_label': status_label,
             'title_label': title_label
@@ -463,42 +560,30 @@ class AdvancedModeWidget(QWidget):
         
         return task_widget
 
-    def update_output(self, task_id, text):
-        """更新下载进度显示"""
-        if task_id not in self.download_tasks:
+    def update_event(self, event):
+        """根据下载事件更新进度显示"""
+        if event.task_id not in self.download_tasks:
             return
             
-        task = self.download_tasks[task_id]
+        task = self.download_tasks[event.task_id]
         
-        # 检查是否包含视频标题信息
-        if "单视频任务" in text and "：" in text:
-            # 从输出中提取实际标题
-            title = text.split("：", 1)[1].strip()
-            task['title_label'].setText(title)
+        if event.kind in ('item', 'exists') and event.title:
+            task['title_label'].setText(event.title)
             task['title_label'].setStyleSheet("color: #333333;")
-            task['status_label'].setText("准备下载...")
-            return
+            if not event.is_playlist:
+                task['status_label'].setText("准备下载...")
             
-        if "列表任务" in text and "：" in text:
-            # 从输出中提取实际标题
-            parts = text.split("：")
-            if len(parts) >= 3:  # 确保有足够的部分（任务信息：进度信息：标题）
-                title = parts[-1].strip()
-                task['title_label'].setText(title)
-                task['title_label'].setStyleSheet("color: #333333;")
-            return
+        elif event.kind == 'retry':
+            task['progress_bar'].setValue(0)
+            task['status_label'].setText(f"{event.reason}，{event.retry_delay} 秒后第 {event.attempt} 次重试")
             
-        if "下载进度:" in text:
-            try:
-                percent_text = text.split('%')[0].split(':')[1].strip()
-                progress = float(percent_text)
-                task['progress_bar'].setValue(int(progress))
-                task['status_label'].setText(text.split('(')[1].rstrip(')'))
-            except:
-                task['status_label'].setText(text)
+        elif event.kind == 'progress':
+            task['progress_bar'].setValue(int(event.percent))
+            task['status_label'].setText(format_transfer(event.total_bytes, event.speed, event.eta))
 
     def download_finished(self, success, message, title, task_id):
         """处理下载完成事件"""
+        self.progress_coalescer.discard(task_id)
         if task_id not in self.download_tasks:
             return
             
@@ -528,15 +613,11 @@ class AdvancedModeWidget(QWidget):
             else:
                 status = '完成'
             
-            self.config.config['download_history'].append({
-                'title': title,
-                'path': self.config.config['last_download_path'],
-                'timestamp': datetime.datetime.now().isoformat(),
-                'status': status
-            })
-            self.config.save_config()
+            video_id, filepath = self.downloader.get_task_output(task_id)
+            self.history.add(title, status, self.config.config['last_download_path'], url=task['url'],
+                             video_id=video_id, filepath=filepath)
         else:
-            task['status_label'].setText("下载失败")
+            task['status_label'].setText(message or "下载失败")
             task['progress_bar'].setStyleSheet("""
                 QProgressBar {
                     border: none;
@@ -573,18 +654,11 @@ class AdvancedModeWidget(QWidget):
                         if not title or title == "正在获取视频信息...":
                             title = "未知视频"
                             
-                        self.config.config['download_history'].append({
-                            'title': title,
-                            'path': self.config.config['last_download_path'],
-                            'timestamp': datetime.datetime.now().isoformat(),
-                            'status': '已取消'
-                        })
+                        self.history.add(title, '已取消', self.config.config['last_download_path'], url=task['url'])
                     except Exception as e:
                         print(f"更新任务状态时出错: {str(e)}")
                         continue
             
-            self.config.save_config()
-            
         except Exception as e:
             print(f"取消下载时出错: {str(e)}")
         finally:
@@ -0,0 +1,160 @@
+import datetime
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRect, QRectF, QTimer
+from PyQt6.QtGui import QColor, QFont
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+from .styles import COLORS
+
+HistoryRole = Qt.ItemDataRole.UserRole + 1
+
+# 每次从数据库读取的记录数，滚动到底部时再读取下一页
+HISTORY_PAGE_SIZE = 20
+
+# 时间标签的刷新间隔（毫秒），跨天后“今天/昨天”需要更新
+TIME_REFRESH_INTERVAL = 60 * 1000
+
+# 状态标签颜色
+STATUS_COLORS = {
+    '已取消': '#9E9E9E',
+    '已存在': '#FF9800',
+}
+DEFAULT_STATUS_COLOR = '#4CAF50'
+
+
+def format_history_time(timestamp, now):
+    if timestamp.date() == now.date():
+        return timestamp.strftime("今天 %H:%M")
+    if timestamp.date() == now.date() - datetime.timedelta(days=1):
+        return timestamp.strftime("昨天 %H:%M")
+    return timestamp.strftime("%m-%d %H:%M")
+
+
+class HistoryListModel(QAbstractListModel):
+    """下载历史列表：按页从 HistoryStore 读取，新记录插入到顶部"""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._entries = []
+        self._exhausted = False
+        # 时间文本只在定时器触发时重新计算
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh_times)
+        self._timer.start(TIME_REFRESH_INTERVAL)
+        self.reload()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry['title']
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return entry['title']  # 完整标题
+        if role == HistoryRole:
+            return entry
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        entries = self.store.recent(HISTORY_PAGE_SIZE, len(self._entries))
+        if len(entries) < HISTORY_PAGE_SIZE:
+            self._exhausted = True
+        if not entries:
+            return
+        now = datetime.datetime.now().astimezone()
+        for entry in entries:
+            self._prepare(entry, now)
+        self.beginInsertRows(QModelIndex(), len(self._entries), len(self._entries) + len(entries) - 1)
+        self._entries.extend(entries)
+        self.endInsertRows()
+
+    def reload(self):
+        """重新读取第一页（清空历史或其他界面写入了记录后调用）"""
+        self.beginResetModel()
+        self._entries = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def prepend(self, entry):
+        """把新完成的记录插入到顶部，不重建其他行"""
+        self._prepare(entry, datetime.datetime.now().astimezone())
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._entries.insert(0, entry)
+        self.endInsertRows()
+
+    def refresh_times(self):
+        """重新计算时间文本，只通知有变化的行"""
+        now = datetime.datetime.now().astimezone()
+        for row, entry in enumerate(self._entries):
+            time_text = format_history_time(entry['_time'], now)
+            if time_text != entry['_time_text']:
+                entry['_time_text'] = time_text
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+
+    def _prepare(self, entry, now):
+        # 解析一次时间戳并缓存显示用的文本
+        try:
+            entry['_time'] = datetime.datetime.fromisoformat(entry['timestamp']).astimezone()
+        except (ValueError, TypeError):
+            entry['_time'] = now
+        entry['_time_text'] = format_history_time(entry['_time'], now)
+        entry['_is_playlist'] = "(列表" in entry['title']
+
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    """绘制历史记录行：标题、时间和状态标签"""
+    ROW_HEIGHT = 24
+    TIME_WIDTH = 90
+    STATUS_WIDTH = 55
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        entry = index.data(HistoryRole)
+        if entry is None:
+            return
+        painter.save()
+        rect = option.rect.adjusted(8, 1, -8, -1)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        if hovered:
+            painter.fillRect(option.rect, QColor(0, 0, 0, 5))
+
+        font = QFont(option.font)
+        font.setPixelSize(12)
+
+        # 状态标签
+        status_rect = QRect(rect.right() - self.STATUS_WIDTH, rect.top() + 2, self.STATUS_WIDTH, rect.height() - 4)
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(STATUS_COLORS.get(entry['status'], DEFAULT_STATUS_COLOR)))
+        painter.drawRoundedRect(QRectF(status_rect), 4, 4)
+        painter.setFont(font)
+        painter.setPen(QColor('white'))
+        painter.drawText(status_rect, Qt.AlignmentFlag.AlignCenter, entry['status'])
+
+        # 时间
+        time_rect = QRect(status_rect.left() - self.TIME_WIDTH - 6, rect.top(), self.TIME_WIDTH, rect.height())
+        painter.setPen(QColor(COLORS['text_secondary']))
+        painter.drawText(time_rect, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, entry['_time_text'])
+
+        # 标题：播放列表使用斜体，悬停时加下划线提示可以点击
+        title_font = QFont(option.font)
+        title_font.setPixelSize(12)
+        title_font.setItalic(entry['_is_playlist'])
+        title_font.setUnderline(hovered)
+        painter.setFont(title_font)
+        painter.setPen(QColor(COLORS['text_secondary'] if hovered else COLORS['text']))
+        title_rect = QRect(rect.left() + 2, rect.top(), time_rect.left() - rect.left() - 8, rect.height())
+        title = painter.fontMetrics().elidedText(entry['title'], Qt.TextElideMode.ElideRight, title_rect.width())
+        painter.drawText(title_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, title)
+        painter.restore()
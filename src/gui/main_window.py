@@ -1,15 +1,23 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLineEdit, QPushButton, 
                             QTextEdit, QFileDialog, QLabel, QComboBox,
-                            QProgressBar, QSizePolicy, QFrame, QMessageBox,
-                            QScrollArea, QMenu, QStyle, QCheckBox)
-from PyQt6.QtCore import Qt, QProcess
-from PyQt6.QtGui import QTextCursor
+                            QMessageBox, QMenu, QCheckBox, QSpinBox,
+                            QListView, QAbstractItemView)
+from PyQt6.QtCore import Qt, QTimer
 import os
-import datetime
-from core.downloader import Downloader
-from core.config import Config
+import logging
+from core.downloader import Downloader, DEFAULT_BATCH_SIZE, DEFAULT_SHARD_SIZE
+from core.progress import format_transfer
+from core.config import get_config
+from core.history import get_history_store
+from core.file_index import get_download_index, VIDEO_EXTENSIONS
+from core.sources import get_source_store, sync_options
+from core.prefetch import get_info_prefetcher
 from gui.advanced_mode import AdvancedModeWidget
+from gui.progress_coalescer import ProgressCoalescer, DEFAULT_REFRESH_HZ
+from gui.task_model import TaskListModel, TaskItemDelegate, TaskRole
+from gui.history_model import HistoryListModel, HistoryItemDelegate, HistoryRole
+from gui.sources_dialog import SourcesDialog
 import sys
 from PyQt6.QtWidgets import QApplication
 from .styles import *  # 导入样式
@@ -37,18 +45,38 @@ class MainWindow(QMainWindow):
         self.main_layout = QVBoxLayout(self.main_container)
         
         # 添加配置和下载器
-        self.config = Config()
+        self.config = get_config()
         self.downloader = Downloader()
+        self.history = get_history_store(self.config)  # 下载历史保存在数据库中
+        self.history_model = HistoryListModel(self.history, self)
+        self.file_index = get_download_index(self.config)  # 下载目录中已有文件的索引
+        self.pending_reveal = None  # 等待目录索引完成后再打开的历史记录
+        self.file_index.root_ready.connect(self._on_index_ready)
+        self.prefetcher = get_info_prefetcher(self.config)  # 输入链接后提前获取视频信息
+        
+        # 订阅的频道/播放列表，可以按设定的间隔自动同步
+        self.sources = get_source_store(self.config)
+        self.sources_dialog = None
+        self.sync_tasks = {}  # 同步任务 -> 来源 id
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.sync_all_sources)
+        self._update_sync_timer()
+        self.config.changed.connect(self._on_config_changed)
         
         # 连接下载器信号
-        self.downloader.output_received.connect(self.update_output)
+        # 进度事件先经过合并，按固定频率刷新界面
+        self.progress_coalescer = ProgressCoalescer(
+            self.config.config.get('ui_refresh_hz', DEFAULT_REFRESH_HZ), self)
+        self.downloader.event_received.connect(self.progress_coalescer.push)
+        self.progress_coalescer.event_ready.connect(self.update_event)
         self.downloader.download_finished.connect(self.download_finished)
+        self.downloader.task_state_changed.connect(self.update_task_state)
         
         # 初始化变量
         self.total_urls = 0
         self.completed_urls = 0
-        self.download_tasks = {}
-        self.scroll_area = None
+        self.task_model = TaskListModel(self)  # 下载任务列表，只绘制可见的行
+        self.task_view = None
         self.current_mode_widget = None  # 添加这行
         
         # 创建基础模式界面
@@ -128,8 +156,8 @@ class MainWindow(QMainWindow):
             except:
                 pass
             
-            # 更新历史显示
-            self.update_history_display()
+            # 高级模式中可能新增了历史记录
+            self.history_model.reload()
             
         except Exception as e:
             print(f"创建基础模式时出错: {str(e)}")
@@ -144,9 +172,8 @@ class MainWindow(QMainWindow):
         
     def create_advanced_mode(self):
         """创建高级模式界面"""
-        self.advanced_widget = AdvancedModeWidget(self.config)
+        self.advanced_widget = AdvancedModeWidget(self.config, self.downloader)
         self.advanced_widget.download_requested.connect(self.start_advanced_download)
-        self.downloader.download_finished.connect(self.advanced_widget.reset_ui)
         self.advanced_widget.mode_switch_requested.connect(self.switch_to_basic_mode)
         return self.advanced_widget
         
@@ -165,8 +192,19 @@ class MainWindow(QMainWindow):
         self.playlist_checkbox = QCheckBox()
         self.playlist_checkbox.setText("播放列表/频道")  # 移除方块字符，只保留文本
         self.playlist_checkbox.stateChanged.connect(self.update_checkbox_text)
+        self.playlist_checkbox.stateChanged.connect(self.prefetch_urls)
         url_header_layout.addWidget(self.playlist_checkbox)
         
+        # 分段下载：大型播放列表按范围分给多个进程，不必先获取整个列表
+        self.shard_checkbox = QCheckBox()
+        self.shard_checkbox.setText("分段下载")
+        self.shard_checkbox.setToolTip(f"播放列表按每 {DEFAULT_SHARD_SIZE} 个视频分为一段，多段同时下载\n"
+                                       "适合视频很多、获取完整列表很慢的播放列表")
+        self.shard_checkbox.setChecked(self.downloader.shard_size > 0)
+        self.update_shard_checkbox_text(self.shard_checkbox.checkState())
+        self.shard_checkbox.stateChanged.connect(self.save_shard_setting)
+        url_header_layout.addWidget(self.shard_checkbox)
+        
         url_layout.addLayout(url_header_layout)
         
         self.url_input = QTextEdit()
@@ -174,6 +212,7 @@ class MainWindow(QMainWindow):
         self.url_input.setPlaceholderText("在此输入一个或多个YouTube视频链接，每行一个")
         self.url_input.setMinimumHeight(100)
         self.url_input.setAcceptRichText(False)
+        self.url_input.textChanged.connect(self.prefetch_urls)
         url_layout.addWidget(self.url_input)
         self.layout.addLayout(url_layout)
         
@@ -262,12 +301,43 @@ class MainWindow(QMainWindow):
         self.subtitle_checkbox.setToolTip("下载视频内置的所有非自动生成字幕(格式:SRT)\n不包含自动生成的字幕")
         self.subtitle_checkbox.stateChanged.connect(self.update_subtitle_checkbox_text)
         
+        # 同时下载数
+        parallel_layout = QHBoxLayout()
+        parallel_layout.setSpacing(8)
+        parallel_label = QLabel("同时下载")
+        parallel_label.setStyleSheet(LABEL_STYLE)
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setStyleSheet(INPUT_STYLE)
+        self.parallel_spin.setRange(1, 10)
+        self.parallel_spin.setValue(self.downloader.max_parallel)
+        self.parallel_spin.setToolTip("同时运行的下载任务数，其余任务排队等待")
+        self.parallel_spin.valueChanged.connect(self.save_parallel_setting)
+        parallel_layout.addWidget(parallel_label)
+        parallel_layout.addWidget(self.parallel_spin)
+        
+        # 批量模式：多个链接共用一个 yt-dlp 进程
+        self.batch_checkbox = QCheckBox()
+        self.batch_checkbox.setText("批量模式")
+        self.batch_checkbox.setStyleSheet("""
+            QCheckBox {
+                color: #333333;
+                padding: 0px 2px;
+            }
+        """)
+        self.batch_checkbox.setToolTip("多个链接交给同一个 yt-dlp 进程下载，适合大量短视频\n与同时下载数配合使用，链接会平均分给各个进程")
+        self.batch_checkbox.setChecked(self.downloader.batch_size > 1)
+        self.update_batch_checkbox_text(self.batch_checkbox.checkState())
+        self.batch_checkbox.stateChanged.connect(self.save_batch_setting)
+        parallel_layout.addWidget(self.batch_checkbox)
+        
         # 调整布局和间距
         options_layout.addLayout(browser_layout)
         options_layout.addSpacing(20)  # 浏览器和画质之间的间距
         options_layout.addLayout(quality_layout)
         options_layout.addSpacing(20)  # 画质和字幕之间的间距
         options_layout.addWidget(self.subtitle_checkbox)
+        options_layout.addSpacing(20)  # 字幕和并发数之间的间距
+        options_layout.addLayout(parallel_layout)
         options_layout.addStretch()  # 将选项推到左侧
 
         self.layout.addLayout(options_layout)
@@ -287,7 +357,12 @@ class MainWindow(QMainWindow):
         self.advanced_button.setStyleSheet(BUTTON_STYLE)
         self.advanced_button.clicked.connect(self.toggle_advanced_mode)
         
+        self.sources_button = QPushButton("订阅同步")
+        self.sources_button.setStyleSheet(BUTTON_STYLE)
+        self.sources_button.clicked.connect(self.show_sources_dialog)
+        
         button_layout.addWidget(self.download_button)
+        button_layout.addWidget(self.sources_button)
         button_layout.addWidget(self.advanced_button)
         self.layout.addLayout(button_layout)
         
@@ -305,141 +380,26 @@ class MainWindow(QMainWindow):
         history_header.addWidget(clear_history_button)
         self.layout.addLayout(history_header)
         
-        self.history_area = QScrollArea()
-        self.history_area.setStyleSheet(HISTORY_AREA_STYLE)
-        self.history_area.setWidgetResizable(True)
+        # 历史记录由模型按页读取，滚动到底部时自动加载更多
+        self.history_area = QListView()
+        self.history_area.setStyleSheet(HISTORY_LIST_STYLE)
+        self.history_area.setModel(self.history_model)
+        self.history_area.setItemDelegate(HistoryItemDelegate(self.history_area))
+        self.history_area.setUniformItemSizes(True)
+        self.history_area.setMouseTracking(True)  # 悬停效果
+        self.history_area.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.history_area.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.history_area.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
         self.history_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.history_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         self.history_area.setFixedHeight(104)  # 增加4px高度
-        
-        history_widget = QWidget()
-        self.history_layout = QVBoxLayout(history_widget)
-        self.history_layout.setSpacing(1)  # 进一步减小历史项间距
-        self.history_layout.setContentsMargins(4, 4, 4, 4)  # 减小内边距
-        self.history_area.setWidget(history_widget)
+        self.history_area.clicked.connect(self.open_history_entry)
         self.layout.addWidget(self.history_area)
         
         # 添加右键菜单支持
         self.history_area.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.history_area.customContextMenuRequested.connect(self.show_history_context_menu)
         
-        # 更新显示最近的下载历史
-        self.update_history_display()
-        
-    def update_history_display(self):
-        """更新下载历史显示"""
-        # 清理旧的历史显示
-        while self.history_layout.count():
-            item = self.history_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        # 获取最近的下载历史（最多显示10条）
-        history = self.config.config.get('download_history', [])[-10:]
-        
-        for entry in reversed(history):
-            item = QWidget()
-            item.setObjectName("historyItem")
-            item.setStyleSheet(HISTORY_ITEM_STYLE)
-            layout = QHBoxLayout(item)
-            layout.setContentsMargins(6, 1, 6, 1)  # 减小上下边距
-            
-            # 处理标题，检查是否是播放列表
-            full_title = entry['title']
-            is_playlist = "(列表" in full_title
-            
-            # 截断过长的标题
-            truncated_title = full_title
-            if len(full_title) > 40:  # 将标题长度限制从35增加到60个字符
-                truncated_title = full_title[:38] + "..."
-            
-            # 创建可点击的标题标签
-            title_label = QPushButton(truncated_title)
-            
-            # 为播放列表和单个视频设置相似的样式，只保留细微区别
-            base_style = """
-                QPushButton {
-                    text-align: left;
-                    border: none;
-                    background: transparent;
-                    color: #333333;
-                    font-size: 12px;  /* 从 11px 改为 12px */
-                    padding: 1px 2px;
-                }
-                QPushButton:hover {
-                    color: #666666;
-                    text-decoration: underline;
-                }
-            """
-            
-            if is_playlist:
-                title_label.setStyleSheet(base_style + """
-                    QPushButton {
-                        font-style: italic;
-                    }
-                """)
-            else:
-                title_label.setStyleSheet(base_style)
-            
-            title_label.setCursor(Qt.CursorShape.PointingHandCursor)
-            title_label.setToolTip(full_title)  # 设置完整标题为工具提示
-            
-            # 添加右键菜单支持
-            title_label.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-            title_label.customContextMenuRequested.connect(
-                lambda pos, p=entry['path'], t=entry['title']: self.show_file_context_menu(pos, p, t)
-            )
-
-            # 连接左键点击事件
-            def create_callback(path, title):
-                return lambda: self.open_file_location(path, title)
-            title_label.clicked.connect(create_callback(entry['path'], entry['title']))
-            
-            # 时间
-            timestamp = datetime.datetime.fromisoformat(entry['timestamp']).astimezone()
-            current_time = datetime.datetime.now().astimezone()
-            
-            if timestamp.date() == current_time.date():
-                time_str = timestamp.strftime("今天 %H:%M")
-            elif timestamp.date() == current_time.date() - datetime.timedelta(days=1):
-                time_str = timestamp.strftime("昨天 %H:%M")
-            else:
-                time_str = timestamp.strftime("%m-%d %H:%M")
-            
-            time_label = QLabel(time_str)
-            time_label.setStyleSheet("""
-                color: #666666;
-                font-size: 12px;  /* 从 11px 改为 12px */
-                padding: 1px 2px;
-            """)
-            time_label.setFixedWidth(90)  # 稍微减小宽度
-            time_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-            
-            # 状态标签样式
-            status_label = QLabel(entry['status'])
-            status_style = """
-                color: white;
-                background-color: #4CAF50;
-                padding: 1px 6px;
-                border-radius: 4px;
-                font-size: 12px;
-            """
-            if entry['status'] == '已取消':
-                status_style = status_style.replace('#4CAF50', '#9E9E9E')
-            elif entry['status'] == '已存在':
-                status_style = status_style.replace('#4CAF50', '#FF9800')
-            status_label.setStyleSheet(status_style)
-            status_label.setFixedWidth(55)  # 稍微减小宽度
-            status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            layout.addWidget(title_label, stretch=2)
-            layout.addWidget(time_label)
-            layout.addWidget(status_label)
-            
-            self.history_layout.addWidget(item)
-        
-        self.history_layout.addStretch()
-
     def browse_directory(self):
         directory = QFileDialog.getExistingDirectory(
             self,
@@ -450,8 +410,7 @@ class MainWindow(QMainWindow):
         if directory:
             self.path_input.setText(directory)
             # 立即保存下载路径到配置
-            self.config.config['last_download_path'] = directory
-            self.config.save_config()
+            self.config.set('last_download_path', directory)
             
     def validate_url(self, url):
         """验证 URL 是否是有效的 YouTube 链接"""
@@ -482,63 +441,6 @@ class MainWindow(QMainWindow):
         except:
             return False
 
-    def create_download_progress_widget(self, task_id, url):
-        """为下载任务创建进度显示组件"""
-        task_widget = QWidget()
-        task_widget.setObjectName("taskItem")
-        task_widget.setStyleSheet(TASK_ITEM_STYLE)
-        layout = QVBoxLayout(task_widget)
-        layout.setSpacing(1)
-        layout.setContentsMargins(8, 4, 8, 4)
-        
-        # 设置小字体
-        font = self.font()
-        font.setPointSize(11)  # 设置字体大小，与历史记录一致
-        
-        # 任务信息
-        info_layout = QHBoxLayout()
-        info_layout.setSpacing(5)
-        info_layout.setContentsMargins(0, 0, 0, 0)  # 减少内边距
-        
-        # 移除任务标签，直接显示标题
-        title_label = QLabel("正在准备下载...")
-        title_label.setFont(font)
-        title_label.setWordWrap(True)
-        title_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        title_label.setMinimumHeight(20)  # 确保有足够的高度
-        
-        info_layout.addWidget(title_label, stretch=1)
-        layout.addLayout(info_layout)
-        
-        # 进度条和状态
-        progress_layout = QHBoxLayout()
-        progress_layout.setSpacing(5)
-        
-        progress_bar = QProgressBar()
-        progress_bar.setStyleSheet(PROGRESS_BAR_STYLE)
-        progress_bar.setMinimum(0)
-        progress_bar.setMaximum(100)
-        progress_bar.setTextVisible(False)  # 隐藏进度条文字
-        progress_bar.setFixedHeight(2)  # 更细的进度条
-        
-        status_label = QLabel("准备下载...")
-        status_label.setFont(font)
-        status_label.setMinimumWidth(200)
-        
-        progress_layout.addWidget(progress_bar, stretch=2)
-        progress_layout.addWidget(status_label, stretch=1)
-        layout.addLayout(progress_layout)
-        
-        # 存储任务信息
-        self.download_tasks[task_id] = {
-            'widget': task_widget,
-            'progress_bar': progress_bar,
-            'status_label': status_label,
-            'title_label': title_label
-        }
-        
-        return task_widget
-        
     def start_download(self):
         try:
             urls = self.url_input.toPlainText().strip().split('\n')
@@ -564,8 +466,7 @@ class MainWindow(QMainWindow):
                 return
             
             # 保存当前下载路径到配置
-            self.config.config['last_download_path'] = output_path
-            self.config.save_config()
+            self.config.set('last_download_path', output_path)
             
             # 重置下载器状态
             self.downloader.reset_state()
@@ -573,92 +474,16 @@ class MainWindow(QMainWindow):
             # 重置界面状态
             self.total_urls = len(urls)
             self.completed_urls = 0
-            self.download_tasks.clear()
-            
-            # 安全地清理旧的滚动区域和任务区域
-            try:
-                # 清理旧的滚动区域
-                if hasattr(self, 'scroll_area') and self.scroll_area:
-                    self.scroll_area.setParent(None)
-                    self.scroll_area.deleteLater()
-                
-                # 清理旧的任务标题和容器
-                for item in self.findChildren(QWidget):
-                    if item.objectName() in ["taskHeader", "borderContainer"]:
-                        item.setParent(None)
-                        item.deleteLater()
-                
-                # 重置标记，允许重新创建标题
-                self.task_header_added = False
-                
-                QApplication.processEvents()
-            except:
-                pass
-            
-            # 创建新的任务标题
-            task_header = QWidget()
-            task_header.setObjectName("taskHeader")
-            header_layout = QHBoxLayout(task_header)
-            header_layout.setContentsMargins(12, 6, 12, 0)
-            task_label = QLabel("下载任务")
-            task_label.setStyleSheet(LABEL_STYLE)
-            header_layout.addWidget(task_label)
-            header_layout.addStretch()
-            self.layout.addWidget(task_header)
-            
-            # 创建带边框的外层容器
-            border_container = QWidget()
-            border_container.setObjectName("borderContainer")
-            border_container.setStyleSheet(BORDER_CONTAINER_STYLE)
-            border_layout = QVBoxLayout(border_container)
-            border_layout.setContentsMargins(2, 2, 2, 2)
-            border_layout.setSpacing(0)
-            
-            # 创建新的滚动区域
-            self.scroll_area = QScrollArea()
-            self.scroll_area.setStyleSheet(TASK_SCROLL_AREA_STYLE)
-            self.scroll_area.setWidgetResizable(True)
-            self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-            self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-            
-            # 创建任务容器
-            task_container = QWidget()
-            task_container.setObjectName("taskArea")
-            task_container.setStyleSheet(TASK_CONTAINER_STYLE)
-            task_container_layout = QVBoxLayout(task_container)
-            task_container_layout.setContentsMargins(4, 4, 4, 8)  # 增加底部边距
-            task_container_layout.setSpacing(2)  # 设置任务之间的间距
             
             # 创建所有下载任务的显示
-            for i, url in enumerate(urls, 1):
-                task_id = f"Task-{i}"
-                task_widget = self.create_download_progress_widget(task_id, url)
-                task_container_layout.addWidget(task_widget)
-            
-            # 添加底部空白widget作为缓冲
-            spacer = QWidget()
-            spacer.setFixedHeight(4)
-            task_container_layout.addWidget(spacer)
-            
-            # 设置滚动区域的内容
-            self.scroll_area.setWidget(task_container)
-            
-            # 将滚动区域添加到边框容器
-            border_layout.addWidget(self.scroll_area)
-            
-            # 将边框容器添加到主布局
-            self.layout.addWidget(border_container)
+            self._create_task_list([(f"Task-{i}", url) for i, url in enumerate(urls, 1)])
             
             # 开始所有下载
             browser = self.browser_combo.currentData()
             is_playlist = self.playlist_checkbox.isChecked()
             
             # 获取画质设置
-            quality = self.quality_combo.currentData()
-            format_options = {
-                'height': quality,
-                'download_subs': self.subtitle_checkbox.isChecked()  # 添加字幕选项状态
-            } if quality else {'download_subs': self.subtitle_checkbox.isChecked()}
+            format_options = self._format_options()
             
             for i, url in enumerate(urls, 1):
                 task_id = f"Task-{i}"
@@ -667,7 +492,8 @@ class MainWindow(QMainWindow):
                     output_path=output_path,
                     format_options=format_options,  # 现在包含了字幕选项
                     browser=browser,
-                    is_playlist=is_playlist
+                    is_playlist=is_playlist,
+                    task_id=task_id
                 )
             
             # 禁用控件
@@ -681,266 +507,266 @@ class MainWindow(QMainWindow):
             except:
                 pass
         
+    def prefetch_urls(self):
+        """输入的链接变化后在后台提前获取视频信息，开始下载时可以直接使用"""
+        # 播放列表和批量模式的任务不使用缓存的视频信息
+        if self.playlist_checkbox.isChecked() or self.downloader.batch_size > 1:
+            self.prefetcher.schedule([])
+            return
+        urls = [url.strip() for url in self.url_input.toPlainText().split('\n')]
+        self.prefetcher.schedule([url for url in urls if url and self.validate_url(url)],
+                                 self.browser_combo.currentData())
+        
+    def _format_options(self):
+        """当前选择的画质和字幕设置"""
+        quality = self.quality_combo.currentData()
+        return {
+            'height': quality,
+            'download_subs': self.subtitle_checkbox.isChecked()  # 添加字幕选项状态
+        } if quality else {'download_subs': self.subtitle_checkbox.isChecked()}
+        
+    def show_sources_dialog(self):
+        """打开订阅同步窗口"""
+        if self.sources_dialog is None:
+            self.sources_dialog = SourcesDialog(self.sources, self.config, self.validate_url,
+                                                self.path_input.text, self)
+            self.sources_dialog.sync_requested.connect(self.sync_sources)
+        self.sources_dialog.refresh()
+        self.sources_dialog.show()
+        self.sources_dialog.raise_()
+        
+    def _in_basic_mode(self):
+        return self.current_mode_widget is not None and self.current_mode_widget is not getattr(self, 'advanced_widget', None)
+        
+    def sync_sources(self, sources, auto=False):
+        """同步订阅来源：每个来源一个播放列表任务，只下载上次同步之后的新视频
+
+        所有来源一起加入下载队列，由下载器按同时下载数调度。
+        """
+        if not sources:
+            return
+        if self.downloader.is_busy() or not self._in_basic_mode():
+            if not auto:
+                QMessageBox.warning(self, "警告", "下载进行中，请等待下载完成后再同步")
+            return
+        
+        self.downloader.reset_state()
+        self.total_urls = len(sources)
+        self.completed_urls = 0
+        tasks = [(f"Task-{i}", source['url']) for i, source in enumerate(sources, 1)]
+        self.sync_tasks = {task_id: source['id'] for (task_id, _), source in zip(tasks, sources)}
+        self._create_task_list(tasks)
+        
+        browser = self.browser_combo.currentData()
+        format_options = self._format_options()
+        for (task_id, url), source in zip(tasks, sources):
+            self.downloader.start_download(
+                url=url,
+                output_path=source['output_path'],
+                format_options=dict(format_options, **sync_options(source)),
+                browser=browser,
+                is_playlist=True,
+                task_id=task_id
+            )
+        self.config.log("开始同步 %d 个订阅来源", logging.INFO, len(sources))
+        self._disable_controls()
+        
+    def sync_all_sources(self):
+        """定时同步全部订阅；正在下载时跳过本次"""
+        self.sync_sources(self.sources.all(), auto=True)
+        
+    def _update_sync_timer(self):
+        hours = self.config.config.get('source_sync_interval', 0)
+        if hours:
+            self.sync_timer.start(int(hours) * 3600 * 1000)
+        else:
+            self.sync_timer.stop()
+        
+    def _on_config_changed(self, key, value):
+        if key == 'source_sync_interval':
+            self._update_sync_timer()
+        
+    def _create_task_list(self, tasks):
+        """清除上一次的任务列表并显示新的任务，tasks 为 [(task_id, url)]"""
+        # 安全地清理旧的任务列表和任务区域
+        try:
+            # 清理旧的任务列表
+            if self.task_view:
+                self.task_view.setParent(None)
+                self.task_view.deleteLater()
+                self.task_view = None
+            
+            # 清理旧的任务标题和容器
+            for item in self.findChildren(QWidget):
+                if item.objectName() in ["taskHeader", "borderContainer"]:
+                    item.setParent(None)
+                    item.deleteLater()
+            
+            # 重置标记，允许重新创建标题
+            self.task_header_added = False
+            
+            QApplication.processEvents()
+        except:
+            pass
+        
+        # 创建新的任务标题
+        task_header = QWidget()
+        task_header.setObjectName("taskHeader")
+        header_layout = QHBoxLayout(task_header)
+        header_layout.setContentsMargins(12, 6, 12, 0)
+        task_label = QLabel("下载任务")
+        task_label.setStyleSheet(LABEL_STYLE)
+        header_layout.addWidget(task_label)
+        header_layout.addStretch()
+        self.layout.addWidget(task_header)
+        
+        # 创建带边框的外层容器
+        border_container = QWidget()
+        border_container.setObjectName("borderContainer")
+        border_container.setStyleSheet(BORDER_CONTAINER_STYLE)
+        border_layout = QVBoxLayout(border_container)
+        border_layout.setContentsMargins(2, 2, 2, 2)
+        border_layout.setSpacing(0)
+        
+        # 创建任务列表，所有任务共用一个委托绘制
+        self.task_view = QListView()
+        self.task_view.setStyleSheet(TASK_LIST_STYLE)
+        self.task_view.setModel(self.task_model)
+        self.task_view.setItemDelegate(TaskItemDelegate(self.task_view))
+        self.task_view.setUniformItemSizes(True)
+        self.task_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.task_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.task_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.task_view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.task_view.clicked.connect(self.toggle_task)  # 点击播放列表展开/折叠其中的视频
+        
+        # 创建所有下载任务的显示
+        self.task_model.reset_tasks(tasks)
+        
+        # 将任务列表添加到边框容器
+        border_layout.addWidget(self.task_view)
+        
+        # 将边框容器添加到主布局
+        self.layout.addWidget(border_container)
+        
     def cancel_download(self):
         try:
             self.downloader.cancel_download()
             
             # 更新所有未完成任务的状态并记录到历史
-            for task in self.download_tasks.values():
-                if task['progress_bar'].value() < 100:
+            for task in self.task_model.items():
+                if task.state == 'active':
                     try:
-                        task['status_label'].setText("已取消")
-                        task['progress_bar'].setStyleSheet("QProgressBar::chunk { background-color: #999; }")
+                        self.task_model.update_task(task.task_id, status="已取消", state='canceled')
+                        if task.parent_id:
+                            continue  # 播放列表中的视频只在列表任务的记录中体现
                         
                         # 添加到历史记录，安全地获取标题
-                        title = task.get('title_label', {}).text() if task.get('title_label') else "视频下载任务"
+                        title = task.title
                         if not title or title == "正在准备下载...":
                             title = "视频下载任务"
                             
-                        self.config.config['download_history'].append({
-                            'title': title,
-                            'path': self.path_input.text(),
-                            'timestamp': datetime.datetime.now().isoformat(),
-                            'status': '已取消'
-                        })
+                        self.history_model.prepend(
+                            self.history.add(title, '已取消', self.path_input.text(), url=task.url))
                     except Exception as e:
                         print(f"更新任务状态时出错: {str(e)}")
                         continue
             
-            self.config.save_config()
-            
         except Exception as e:
             print(f"取消下载时出错: {str(e)}")
         finally:
             # 确保控件被重新启用
             self._enable_controls()
         
-    def update_output(self, task_id, text):
-        if task_id not in self.download_tasks:
-            return
-            
-        task = self.download_tasks[task_id]
-        
-        # 处理播放列表信息
-        if "开始下载播放列表:" in text:
-            playlist_name = text.split(': ', 1)[1]
-            task['title_label'].setText(f"播放列表: {playlist_name}")
-            task['status_label'].setText("准备下载...")
-            task['progress_bar'].setValue(0)  # 重置进度条
-            return
-            
-        # 播放列表项目进度
-        if "正在下载此列表中的第" in text and "共" in text:
-            try:
-                # 获取播放列表项目编号
-                parts = text.split("第")[1].split("个")
-                current_item = parts[0].strip()
-                total_items = parts[1].split("共")[1].strip().split("个")[0].strip()
-                
-                # 创建格式化消息，与新格式兼容
-                list_id = task_id.split('-')[1] if '-' in task_id else "1"
-                formatted_message = f"列表任务-{list_id}：正在下载第{current_item}个/共{total_items}个：正在获取视频信息..."
-                
-                # 使用新格式处理播放列表消息
-                return self.update_output(task_id, formatted_message)
-            except Exception as e:
-                print(f"处理旧格式播放列表消息时出错: {e}")
-                task['status_label'].setText(text)
-            return
-            
-        # 播放列表下载完成
-        if "播放列表下载完成:" in text:
-            playlist_name = text.split(': ', 1)[1]
-            task['status_label'].setText("下载完成")
-            task['progress_bar'].setValue(100)
-            return
+    def toggle_task(self, index):
+        item = index.data(TaskRole)
+        if item is not None:
+            self.task_model.toggle(item.task_id)
         
-        # 更新视频标题 - 新格式：列表任务-x：正在下载第y个/共z个：标题
-        if "列表任务-" in text and "正在下载第" in text:
-            try:
-                parts = text.split("：", 2)  # 分成3部分：任务号、进度信息、标题
-                task_info = parts[0]  # "列表任务-1"
-                progress_info = parts[1]  # "正在下载第x个/共y个"
-                
-                # 确保有标题部分，即使没有冒号分隔
-                if len(parts) > 2 and parts[2].strip():
-                    title = parts[2]  # 提取标题
-                else:
-                    title = "正在获取视频信息..."  # 默认标题
-                
-                # 清理标题中的视频ID和格式ID
-                cleaned_title = title
-                if '[' in cleaned_title and ']' in cleaned_title:
-                    cleaned_title = cleaned_title.split('[')[0].strip()
-                if '.f' in cleaned_title and any(c.isdigit() for c in cleaned_title.split('.f')[-1]):
-                    cleaned_title = cleaned_title.split('.f')[0].strip()
-                
-                # 确保标题不为空
-                if not cleaned_title.strip():
-                    cleaned_title = title  # 使用原始标题
-                if not cleaned_title.strip():
-                    cleaned_title = "正在获取视频信息..."  # 最后的保底方案
-                
-                # 检查是否包含"已存在"状态信息
-                if "已存在" in text:
-                    task['status_label'].setText("文件已存在，已跳过")
-                    task['progress_bar'].setValue(100)
-                    task['progress_bar'].setStyleSheet("QProgressBar::chunk { background-color: #FFA500; }")
-                else:
-                    task['status_label'].setText("准备下载...")
-                    task['progress_bar'].setValue(0)  # 重置进度条
-                    
-                # 设置标题格式为：列表任务-x：正在下载第y个/共z个：视频标题
-                # 检查标题长度并在必要时截断
-                full_title = f"{task_info}：{progress_info}：{cleaned_title}"
-                truncated_display = full_title
-                if len(cleaned_title) > 40:  # 限制标题长度
-                    truncated_display = f"{task_info}：{progress_info}：{cleaned_title[:38]}..."
-                task['title_label'].setText(truncated_display)
-                task['title_label'].setToolTip(full_title)  # 设置完整标题作为工具提示
-                
-                # 调试信息
-                print(f"设置播放列表任务标题: {task_info}：{progress_info}：{cleaned_title}")
-            except Exception as e:
-                print(f"处理播放列表消息时出错: {e}")
-                print(f"原始消息: {text}")
-            return
+    def update_task_state(self, task_id, state):
+        """显示任务是在排队还是已开始运行"""
+        if state == 'queued':
+            self.task_model.update_task(task_id, status="排队中...")
+        elif state == 'running':
+            self.task_model.update_task(task_id, status="准备下载...")
         
-        # 处理单个视频 - 新格式：单视频任务-x：标题
-        if "单视频任务-" in text:
-            if "已存在" in text:
-                # 处理已存在的文件
-                parts = text.split("：", 1)  # 分成2部分：任务号、标题+状态
-                task_prefix = parts[0]
-                title = parts[1].split(" (")[0] if len(parts) > 1 else "未知视频"  # 提取标题
-                
-                # 清理标题中的视频ID和格式ID
-                if '[' in title and ']' in title:
-                    title = title.split('[')[0].strip()
-                if '.f' in title and any(c.isdigit() for c in title.split('.f')[-1]):
-                    title = title.split('.f')[0].strip()
-                    
-                # 检查标题长度并在必要时截断
-                if len(title) > 40:  # 限制标题长度
-                    title = title[:38] + "..."
-                task['title_label'].setText(f"{task_prefix}：{title}")  # 显示"单视频任务-x：清理后的标题"
-                task['title_label'].setToolTip(f"{task_prefix}：{title}")  # 添加完整标题作为工具提示
-                task['status_label'].setText("文件已存在，已跳过")
-                task['progress_bar'].setValue(100)
-                # 恢复进度条样式
-                task['progress_bar'].setStyleSheet("QProgressBar::chunk { background-color: #FFA500; }")
-            else:
-                # 正常下载
-                # 提取标题部分
-                parts = text.split('：', 1)
-                task_prefix = parts[0]
-                title = parts[1] if len(parts) > 1 else text
-                
-                # 清理标题中的视频ID和格式ID
-                if '[' in title and ']' in title:
-                    title = title.split('[')[0].strip()
-                if '.f' in title and any(c.isdigit() for c in title.split('.f')[-1]):
-                    title = title.split('.f')[0].strip()
-                    
-                # 准备完整标题和显示标题
-                full_title = f"{task_prefix}：{title}"
-                display_title = full_title
-                # 检查标题长度并在必要时截断
-                if len(title) > 40:  # 限制标题长度
-                    display_title = f"{task_prefix}：{title[:38]}..."
-                task['title_label'].setText(display_title)  # 显示"单视频任务-x：清理后的标题"
-                task['title_label'].setToolTip(full_title)  # 添加完整标题作为工具提示
-                task['status_label'].setText("准备下载...")
-                task['progress_bar'].setValue(0)  # 重置进度条
+    def update_event(self, event):
+        """根据下载事件更新任务显示"""
+        task = self.task_model.get(event.task_id)
+        if task is None:
             return
         
-        # 保留旧代码以兼容性处理
-        if "开始下载:" in text:
-            if "(" in text and ")" in text and "/" in text.split("(")[1]:
-                # 播放列表项目
-                title_parts = text.split(': ', 1)[1]
-                title = title_parts.split(' (')[0]
-                progress = title_parts.split(' (')[1].rstrip(')')
-                task['title_label'].setText(f"{title}")
-                task['status_label'].setText(f"下载中 - {progress}")
+        if event.kind == 'expanded':
+            # 播放列表已展开，每个视频是一个子任务
+            self.task_model.add_children(event.task_id, event.entries)
+            self.task_model.update_task(event.task_id, title=f"播放列表: {event.title}",
+                                        status=f"已完成 0/{event.item_count}", progress=0)
+            
+        elif event.kind == 'children':
+            # 分段下载时列表总数可能还不知道
+            if event.item_count:
+                self.task_model.update_task(event.task_id, status=f"已完成 {event.item_index}/{event.item_count}",
+                                            progress=min(100, event.item_index * 100 // event.item_count))
             else:
-                # 普通视频
-                title = text.split(': ', 1)[1]
-                task['title_label'].setText(title)
-                task['status_label'].setText("准备下载...")
-            task['progress_bar'].setValue(0)  # 重置进度条
-            return
-            
-        # 解析进度信息
-        if "下载进度:" in text:
-            try:
-                percent_text = text.split('%')[0].split(':')[1].strip()
-                progress = float(percent_text)
-                task['progress_bar'].setValue(int(progress))
-                
-                # 检查是否包含播放列表信息
-                if "- 正在下载第" in text and "共" in text:
-                    progress_info = text.split('(')[1].split(')')[0]
-                    task['status_label'].setText(f"{progress_info}")
-                elif "- 项目" in text and "/" in text.split("- 项目")[1]:
-                    # 兼容旧格式
-                    progress_info = text.split('(')[1].split(')')[0]
-                    item_info = text.split('- 项目')[1].strip()
-                    task['status_label'].setText(f"{progress_info} - 项目 {item_info}")
-                else:
-                    task['status_label'].setText(text.split('(')[1].rstrip(')'))
-            except:
-                task['status_label'].setText(text)
-        elif "文件已存在:" in text and not ("列表任务-" in text or "单视频任务-" in text):
-            if "(" in text and ")" in text and "/" in text.split("(")[1]:
-                # 播放列表项目
-                title_parts = text.split(': ', 1)[1]
-                title = title_parts.split(' (')[0]
-                progress = title_parts.split(' (')[1].rstrip(')')
-                task['title_label'].setText(f"{title}")
-                task['status_label'].setText(f"文件已存在 - {progress}")
+                self.task_model.update_task(event.task_id, status=f"已完成 {event.item_index} 个")
+            
+        elif event.kind == 'playlist':
+            self.task_model.update_task(event.task_id, title=f"播放列表: {event.title}",
+                                        status="准备下载...", progress=0)  # 重置进度条
+            
+        elif event.kind == 'playlist_done':
+            self.task_model.update_task(event.task_id, status="下载完成", progress=100)
+            
+        elif event.kind == 'retry':
+            self.task_model.update_task(event.task_id, status=f"{event.reason}，{event.retry_delay} 秒后第 {event.attempt} 次重试",
+                                        progress=0)
+            
+        elif event.kind in ('item', 'exists'):
+            # 标题格式：列表任务-x：正在下载第y个/共z个：视频标题 或 单视频任务-x：视频标题
+            list_id = event.task_id.split('-')[1] if '-' in event.task_id else "1"
+            if task.parent_id:
+                prefix = f"第{event.task_id.rpartition('.')[2]}个"
+            elif event.is_playlist and event.item_index:
+                prefix = f"列表任务-{list_id}：正在下载第{event.item_index}个/共{event.item_count}个"
+            else:
+                prefix = f"单视频任务-{list_id}"
+            title = event.title or "正在获取视频信息..."
+            full_title = f"{prefix}：{title}"
+            # 检查标题长度并在必要时截断，完整标题作为工具提示
+            display_title = f"{prefix}：{title[:38]}..." if len(title) > 40 else full_title
+            
+            if event.kind == 'exists':
+                self.task_model.update_task(event.task_id, title=display_title, tooltip=full_title,
+                                            status="文件已存在，已跳过", progress=100, state='exists')
             else:
-                # 普通视频
-                title = text.split(': ', 1)[1]
-                task['title_label'].setText(title)
-                task['status_label'].setText("文件已存在，已跳过")
-            task['progress_bar'].setValue(100)
-            task['progress_bar'].setStyleSheet("QProgressBar::chunk { background-color: #FFA500; }")
+                self.task_model.update_task(event.task_id, title=display_title, tooltip=full_title,
+                                            status="准备下载...", progress=0, state='active')
+                
+        elif event.kind == 'progress':
+            self.task_model.update_task(event.task_id, progress=int(event.percent),
+                                        status=format_transfer(event.total_bytes, event.speed, event.eta))
         
     def download_finished(self, success, message, title, task_id):
-        if task_id not in self.download_tasks:
+        self.progress_coalescer.discard(task_id)
+        task = self.task_model.get(task_id)
+        if task is None:
+            return
+        
+        if task.parent_id:
+            self.child_task_finished(task, success, message, title)
             return
-            
-        task = self.download_tasks[task_id]
         
         # 检查是否为取消状态
         if message == "下载已取消":
-            task['status_label'].setText("已取消")
-            task['progress_bar'].setStyleSheet("QProgressBar::chunk { background-color: #999; }")
+            self.task_model.update_task(task_id, status="已取消", state='canceled')
             
             # 添加到下载历史
-            self.config.config['download_history'].append({
-                'title': title,
-                'path': self.downloader.get_current_download_path(task_id),
-                'timestamp': datetime.datetime.now().isoformat(),
-                'status': '已取消'
-            })
+            entry = self.history.add(title, '已取消', self.downloader.get_current_download_path(task_id),
+                                     url=self.task_model.get(task_id).url)
+            self.history_model.prepend(entry)
         elif success:
-            task['progress_bar'].setValue(100)
             # 更新任务标题为最终的列表/视频标题
-            task['title_label'].setText(title)
-            task['progress_bar'].setTextVisible(False)  # 完成后不显示百分比
-            task['status_label'].setText("下载完成")
-            task['progress_bar'].setStyleSheet("""
-                QProgressBar {
-                    border: none;
-                    background-color: #f0f0f0;
-                    text-align: center;
-                }
-                QProgressBar::chunk {
-                    background-color: #32CD32;
-                }
-            """)
+            self.task_model.update_task(task_id, title=title, status="下载完成", progress=100, state='success')
             
             # 添加到下载历史
             if '已存在' in message:
@@ -948,19 +774,24 @@ class MainWindow(QMainWindow):
             else:
                 status = '完成'
             
-            self.config.config['download_history'].append({
-                'title': title,
-                'path': self.downloader.get_current_download_path(task_id),
-                'timestamp': datetime.datetime.now().isoformat(),
-                'status': status
-            })
-            self.config.save_config()
+            # 记录 yt-dlp 报告的最终文件路径，打开文件时不再搜索目录
+            video_id, filepath = self.downloader.get_task_output(task_id)
+            entry = self.history.add(title, status, self.downloader.get_current_download_path(task_id),
+                                     url=self.task_model.get(task_id).url, video_id=video_id, filepath=filepath)
             
-            # 立即更新历史显示
-            self.update_history_display()
+            # 新记录直接插入到历史列表顶部
+            self.history_model.prepend(entry)
         else:
-            task['status_label'].setText("下载失败")
-            task['progress_bar'].setStyleSheet("QProgressBar::chunk { background-color: #FF0000; }")
+            # 失败原因（如需要登录、视频不可用）由下载器根据错误输出判断
+            self.task_model.update_task(task_id, status=message or "下载失败", state='failed')
+        
+        # 同步任务：记录来源的同步结果，下次只获取之后的新视频
+        source_id = self.sync_tasks.pop(task_id, None)
+        if source_id is not None and message != "下载已取消":
+            self.sources.mark_synced(source_id, success, title=title.split(' (列表')[0] if success else None,
+                                     last_video_id=self.downloader.get_newest_video(task_id))
+            if self.sources_dialog is not None:
+                self.sources_dialog.refresh()
         
         # 更新完成计数
         self.completed_urls += 1
@@ -969,6 +800,22 @@ class MainWindow(QMainWindow):
         if self.completed_urls >= self.total_urls:
             self._enable_controls()
         
+    def child_task_finished(self, task, success, message, title):
+        """播放列表中的一个视频完成；列表任务的完成由下载器在最后一个视频完成后通知"""
+        if message == "下载已取消":
+            self.task_model.update_task(task.task_id, status="已取消", state='canceled')
+        elif success:
+            self.task_model.update_task(task.task_id, title=title, status="下载完成", progress=100,
+                                        state='exists' if '已存在' in message else 'success')
+            # 每个视频单独记录历史，可以直接打开对应的文件
+            video_id, filepath = self.downloader.get_task_output(task.task_id)
+            self.history_model.prepend(self.history.add(
+                title, '已存在' if '已存在' in message else '完成',
+                self.downloader.get_current_download_path(task.task_id),
+                url=task.url, video_id=video_id, filepath=filepath))
+        else:
+            self.task_model.update_task(task.task_id, status=message or "下载失败", state='failed')
+        
     def _enable_controls(self):
         """重新启用控件但保持界面显示"""
         try:
@@ -988,19 +835,19 @@ class MainWindow(QMainWindow):
         self.browse_button.setEnabled(True)
         self.browser_combo.setEnabled(True)
         self.advanced_button.setEnabled(True)
+        self.sources_button.setEnabled(True)
         self.download_button.setText("开始下载")
         
     def toggle_advanced_mode(self):
         if self.advanced_button.text() == "高级模式":
             # 检查下载状态
-            if any(p.state() == QProcess.ProcessState.Running for p in self.downloader.processes):
+            if self.downloader.is_busy():
                 QMessageBox.warning(self, "警告", "下载进行中，请等待下载完成后再切换模式")
                 return
             
             # 切换到高级模式前保存浏览器设置和下载路径
             self.save_browser_setting()
-            self.config.config['last_download_path'] = self.path_input.text()
-            self.config.save_config()
+            self.config.set('last_download_path', self.path_input.text())
             
             # 切换到高级模式
             if self.current_mode_widget:
@@ -1023,12 +870,25 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "错误", "下载已在进行中！")
 
     def save_browser_setting(self):
-        self.config.config['browser'] = self.browser_combo.currentData()
-        self.config.save_config()
+        self.config.set('browser', self.browser_combo.currentData())
+        
+    def save_batch_setting(self, state):
+        """保存批量模式设置，下载器通过配置变更通知更新"""
+        self.update_batch_checkbox_text(state)
+        self.config.set('batch_size', DEFAULT_BATCH_SIZE if self.batch_checkbox.isChecked() else 0)
+        
+    def save_shard_setting(self, state):
+        """保存分段下载设置，下载器通过配置变更通知更新"""
+        self.update_shard_checkbox_text(state)
+        self.config.set('playlist_shard_size', DEFAULT_SHARD_SIZE if self.shard_checkbox.isChecked() else 0)
+        
+    def save_parallel_setting(self, value):
+        """保存同时下载数，下载器通过配置变更通知更新"""
+        self.config.set('max_parallel_downloads', value)
 
     def switch_to_basic_mode(self):
         try:
-            if any(p.state() == QProcess.ProcessState.Running for p in self.downloader.processes):
+            if self.downloader.is_busy():
                 QMessageBox.warning(self, "警告", "下载进行中，请等待下载完成后再切换模式")
                 return
             
@@ -1039,8 +899,6 @@ class MainWindow(QMainWindow):
                 self.current_mode_widget.parent().layout().removeWidget(self.current_mode_widget)
             
             QApplication.processEvents()
-            # 确保在切换模式前已保存最新的配置
-            self.config.save_config()
             # 创建基础模式
             self.create_basic_mode()
             self.advanced_button.setText("高级模式")
@@ -1060,22 +918,48 @@ class MainWindow(QMainWindow):
         self.browse_button.setEnabled(False)
         self.browser_combo.setEnabled(False)
         self.advanced_button.setEnabled(False)
+        self.sources_button.setEnabled(False)
         self.download_button.setText("取消下载")
         self.download_button.clicked.disconnect()
         self.download_button.clicked.connect(self.cancel_download)
 
     def clear_download_history(self):
         """清空下载历史"""
-        self.config.config['download_history'] = []
-        self.config.save_config()
-        self.update_history_display()
+        self.history.clear()
+        self.history_model.reload()
+
+    def open_history_entry(self, index):
+        """左键点击历史记录时打开文件所在位置"""
+        entry = index.data(HistoryRole)
+        if entry:
+            self.open_file_location(entry)
 
     def show_history_context_menu(self, position):
         """显示历史记录的右键菜单"""
+        global_pos = self.history_area.viewport().mapToGlobal(position)
+        entry = self.history_area.indexAt(position).data(HistoryRole)
+        if entry:
+            self.show_file_context_menu(global_pos, entry)
+            return
         menu = QMenu(self)
         clear_action = menu.addAction("清空历史记录")
         clear_action.triggered.connect(self.clear_download_history)
-        menu.exec(self.history_area.mapToGlobal(position))
+        archive_action = menu.addAction("清空当前下载位置的下载记录")
+        archive_action.triggered.connect(self.clear_download_archive)
+        menu.exec(global_pos)
+
+    def clear_download_archive(self):
+        """清空当前下载位置的下载记录，记录中的视频再次下载时不会被跳过"""
+        output_path = self.path_input.text().strip()
+        if not output_path:
+            return
+        reply = QMessageBox.question(
+            self, "清空下载记录",
+            f"清空后，{output_path} 中已记录的视频再次下载或同步时将重新下载。\n确定要清空吗？")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        removed = self.downloader.clear_archive(output_path)
+        QMessageBox.information(self, "清空下载记录", f"已清空 {removed} 条下载记录")
 
     def check_full_disk_access(self):
         """检查完全磁盘访问权限"""
@@ -1095,38 +979,52 @@ class MainWindow(QMainWindow):
                 "4. 重启应用"
             )
 
-    def open_file_location(self, path, title):
+    def needs_index(self, entry):
+        """旧版迁移来的记录只有标题，需要在目录索引中按标题查找"""
+        return not entry.get('filepath') and not entry.get('url')
+
+    def find_history_file(self, entry):
+        """查找历史记录对应的文件，找不到或目录尚未索引完成时返回 None"""
+        filepath = entry.get('filepath')
+        if filepath:
+            # 新记录保存了 yt-dlp 报告的最终路径，只需要检查文件是否还在
+            return filepath if os.path.isfile(filepath) else None
+        if entry.get('url'):
+            # 播放列表、取消或失败的任务没有单个文件
+            return None
+        # 不在界面线程中扫描目录：尚未索引时在后台开始扫描，完成后发出 root_ready
+        if not self.file_index.is_ready(entry['path']):
+            self.file_index.add_root(entry['path'])
+            return None
+        return self.file_index.find_title(entry['path'], entry['title'].split('[')[0], VIDEO_EXTENSIONS)
+
+    def _on_index_ready(self, root):
+        """目录索引完成后打开等待中的历史记录"""
+        entry = self.pending_reveal
+        if entry is not None and self.file_index.is_ready(entry['path']):
+            self.pending_reveal = None
+            self.open_file_location(entry)
+
+    def open_file_location(self, entry):
         """打开文件所在位置"""
+        if self.needs_index(entry) and not self.file_index.is_ready(entry['path']):
+            # 目录扫描完成后再打开（见 _on_index_ready）
+            self.pending_reveal = entry
+            self.file_index.add_root(entry['path'])
+            return
         try:
-            # 构建完整的文件路径
-            import glob
-            # 获取目录下所有文件
-            all_files = glob.glob(os.path.join(path, "*"))
-            video_extensions = ['.mp4', '.mkv', '.webm', '.avi', '.mov']
-            
-            # 查找匹配的视频文件
-            video_files = []
-            for file in all_files:
-                # 检查扩展名
-                if os.path.splitext(file)[1].lower() in video_extensions:
-                    # 获取文件名（不含扩展名）
-                    file_name = os.path.splitext(os.path.basename(file))[0]
-                    # 如果文件名包含标题的主要部分，就认为是匹配的
-                    if title.split('[')[0].strip() in file_name:
-                        video_files.append(file)
-            
-            file_path = video_files[0] if video_files else None
-            
+            file_path = self.find_history_file(entry)
             if file_path:
                 # 如果找到文件，打开其所在文件夹并选中该文件
                 os.system(f'open -R "{file_path}"')
             else:
                 # 如果没找到文件，只打开文件夹
+                path = entry['path']
                 os.system(f'open "{path}"')
         except Exception as e:
             QMessageBox.warning(self, "打开失败", f"无法打开文件位置：{str(e)}")
 
-    def show_file_context_menu(self, pos, path, title):
+    def show_file_context_menu(self, global_pos, entry):
         """显示文件右键菜单"""
         menu = QMenu(self)
         menu.setStyleSheet("""
@@ -1154,24 +1052,8 @@ class MainWindow(QMainWindow):
         # 设置鼠标样式
         menu.setCursor(Qt.CursorShape.PointingHandCursor)
         
-        # 查找可能的文件
-        import glob
-        # 获取目录下所有文件
-        all_files = glob.glob(os.path.join(path, "*"))
-        video_extensions = ['.mp4', '.mkv', '.webm', '.avi', '.mov']
-        
-        # 查找匹配的视频文件
-        video_files = []
-        for file in all_files:
-            # 检查扩展名
-            if os.path.splitext(file)[1].lower() in video_extensions:
-                # 获取文件名（不含扩展名）
-                file_name = os.path.splitext(os.path.basename(file))[0]
-                # 如果文件名包含标题的主要部分，就认为是匹配的
-                if title.split('[')[0].strip() in file_name:
-                    video_files.append(file)
-        
-        file_path = video_files[0] if video_files else None
+        file_path = self.find_history_file(entry)
+        path = entry['path']
         
         if file_path:
             # 打开视频
@@ -1186,7 +1068,7 @@ class MainWindow(QMainWindow):
             show_action = menu.addAction("打开下载文件夹")
             show_action.triggered.connect(lambda: os.system(f'open "{path}"'))
         
-        menu.exec(self.sender().mapToGlobal(pos))
+        menu.exec(global_pos)
 
     def update_checkbox_text(self, state):
         if state == Qt.CheckState.Checked:
@@ -1200,6 +1082,18 @@ class MainWindow(QMainWindow):
         else:
             self.subtitle_checkbox.setText("下载字幕") 
 
+    def update_shard_checkbox_text(self, state):
+        if state == Qt.CheckState.Checked or state == Qt.CheckState.Checked.value:
+            self.shard_checkbox.setText("☑️ 分段下载")
+        else:
+            self.shard_checkbox.setText("分段下载")
+
+    def update_batch_checkbox_text(self, state):
+        if state == Qt.CheckState.Checked or state == Qt.CheckState.Checked.value:
+            self.batch_checkbox.setText("☑️ 批量模式")
+        else:
+            self.batch_checkbox.setText("批量模式")
+
     def closeEvent(self, event):
         """在应用关闭前保存所有设置"""
         try:
@@ -1209,10 +1103,14 @@ class MainWindow(QMainWindow):
                 
             # 保存下载路径
             if hasattr(self, 'path_input') and self.path_input:
-                self.config.config['last_download_path'] = self.path_input.text()
+                self.config.set('last_download_path', self.path_input.text())
                 
-            # 保存配置
-            self.config.save_config()
+            # 停止所有下载任务
+            self.downloader.shutdown()
+            self.prefetcher.shutdown()
+            
+            # 立即写入尚未保存的配置
+            self.config.flush()
         except Exception as e:
             print(f"保存设置时出错: {str(e)}")
             
@@ -0,0 +1,46 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# 进度刷新到界面的默认频率（次/秒）
+DEFAULT_REFRESH_HZ = 10
+
+
+class ProgressCoalescer(QObject):
+    """合并下载进度事件，按固定频率刷新界面
+
+    每个任务只保留最新的一条进度，由同一个定时器统一发出；
+    标题、列表条目变化等其他事件立即发出，并丢弃该任务尚未发出的旧进度。
+    """
+    event_ready = pyqtSignal(object)  # DownloadEvent
+
+    def __init__(self, refresh_hz=DEFAULT_REFRESH_HZ, parent=None):
+        super().__init__(parent)
+        self._pending = {}  # task_id -> 最新的进度事件
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self.set_refresh_rate(refresh_hz)
+
+    def set_refresh_rate(self, refresh_hz):
+        self._timer.setInterval(max(1, int(1000 / max(1, refresh_hz))))
+
+    def push(self, event):
+        """接收 Downloader.event_received 发出的事件"""
+        if event.kind != 'progress':
+            self._pending.pop(event.task_id, None)
+            self.event_ready.emit(event)
+            return
+        self._pending[event.task_id] = event
+        # 没有待刷新的进度时停止定时器，空闲时不占用主线程
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self, task_id):
+        """任务结束时调用，避免旧进度覆盖完成状态"""
+        self._pending.pop(task_id, None)
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            self._timer.stop()
+            return
+        for event in pending.values():
+            self.event_ready.emit(event)
@@ -0,0 +1,127 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
+                             QSpinBox, QMessageBox)
+from PyQt6.QtCore import Qt, pyqtSignal
+import datetime
+from .styles import *  # 导入样式
+
+
+class SourcesDialog(QDialog):
+    """订阅的频道和播放列表：添加、删除和同步"""
+    sync_requested = pyqtSignal(list)  # 要同步的来源
+
+    def __init__(self, sources, config, validate_url, default_path, parent=None):
+        super().__init__(parent)
+        self.sources = sources
+        self.config = config
+        self.validate_url = validate_url
+        self.default_path = default_path
+        self.setWindowTitle("订阅同步")
+        self.setMinimumSize(640, 360)
+        self.setStyleSheet(f"background-color: {COLORS['background']};")
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(16, 16, 16, 16)
+        layout.setSpacing(10)
+
+        # 添加来源
+        add_layout = QHBoxLayout()
+        self.url_input = QLineEdit()
+        self.url_input.setStyleSheet(INPUT_STYLE)
+        self.url_input.setPlaceholderText("频道或播放列表链接，同步时只下载上次同步之后的新视频")
+        self.url_input.returnPressed.connect(self.add_source)
+        add_button = QPushButton("添加")
+        add_button.setStyleSheet(BROWSE_BUTTON_STYLE)
+        add_button.clicked.connect(self.add_source)
+        add_layout.addWidget(self.url_input)
+        add_layout.addWidget(add_button)
+        layout.addLayout(add_layout)
+
+        # 来源列表
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["名称", "保存位置", "上次同步", "状态"])
+        self.table.setStyleSheet(INPUT_STYLE)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        layout.addWidget(self.table)
+
+        # 自动同步和操作按钮
+        button_layout = QHBoxLayout()
+        interval_label = QLabel("自动同步")
+        interval_label.setStyleSheet(LABEL_STYLE)
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setStyleSheet(INPUT_STYLE)
+        self.interval_spin.setRange(0, 48)
+        self.interval_spin.setSuffix(" 小时")
+        self.interval_spin.setSpecialValueText("关闭")
+        self.interval_spin.setValue(self.config.config.get('source_sync_interval', 0))
+        self.interval_spin.setToolTip("程序运行期间每隔一段时间自动同步全部订阅，0 表示关闭")
+        self.interval_spin.valueChanged.connect(lambda value: self.config.set('source_sync_interval', value))
+        button_layout.addWidget(interval_label)
+        button_layout.addWidget(self.interval_spin)
+        button_layout.addStretch()
+
+        remove_button = QPushButton("删除")
+        remove_button.setStyleSheet(BUTTON_STYLE)
+        remove_button.clicked.connect(self.remove_selected)
+        sync_selected_button = QPushButton("同步选中")
+        sync_selected_button.setStyleSheet(BUTTON_STYLE)
+        sync_selected_button.clicked.connect(self.sync_selected)
+        sync_all_button = QPushButton("同步全部")
+        sync_all_button.setStyleSheet(BUTTON_STYLE)
+        sync_all_button.clicked.connect(lambda: self.sync_requested.emit(self.sources.all()))
+        button_layout.addWidget(remove_button)
+        button_layout.addWidget(sync_selected_button)
+        button_layout.addWidget(sync_all_button)
+        layout.addLayout(button_layout)
+
+    def refresh(self):
+        """重新读取来源列表和同步状态"""
+        rows = self.sources.all()
+        self.table.setRowCount(len(rows))
+        for row, source in enumerate(rows):
+            name = QTableWidgetItem(source['title'] or source['url'])
+            name.setData(Qt.ItemDataRole.UserRole, source['id'])
+            name.setToolTip(source['url'])
+            self.table.setItem(row, 0, name)
+            self.table.setItem(row, 1, QTableWidgetItem(source['output_path']))
+            last_sync = "从未同步"
+            if source['last_sync']:
+                last_sync = datetime.datetime.fromisoformat(source['last_sync']).strftime("%Y-%m-%d %H:%M")
+            self.table.setItem(row, 2, QTableWidgetItem(last_sync))
+            self.table.setItem(row, 3, QTableWidgetItem(source['last_status'] or ""))
+
+    def _selected_ids(self):
+        return [self.table.item(index.row(), 0).data(Qt.ItemDataRole.UserRole)
+                for index in self.table.selectionModel().selectedRows()]
+
+    def add_source(self):
+        url = self.url_input.text().strip()
+        if not url:
+            return
+        if not self.validate_url(url):
+            QMessageBox.warning(self, "错误", "请输入有效的频道或播放列表链接！")
+            return
+        self.sources.add(url, self.default_path())
+        self.url_input.clear()
+        self.refresh()
+
+    def remove_selected(self):
+        for source_id in self._selected_ids():
+            self.sources.remove(source_id)
+        self.refresh()
+
+    def sync_selected(self):
+        selected = [self.sources.get(source_id) for source_id in self._selected_ids()]
+        selected = [source for source in selected if source]
+        if selected:
+            self.sync_requested.emit(selected)
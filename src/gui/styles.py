@@ -114,18 +114,6 @@ QComboBox QAbstractItemView::item:selected {
 }
 """
 
-# 历史记录项样式
-HISTORY_ITEM_STYLE = """
-QWidget#historyItem {
-    background-color: transparent;
-    border-radius: 0px;
-    padding: 8px 6px;
-}
-QWidget#historyItem:hover {
-    background-color: rgba(0, 0, 0, 0.02);
-}
-"""
-
 # 通用滚动条样式
 SCROLLBAR_STYLE = """
 QScrollBar:vertical {
@@ -145,13 +133,13 @@ QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
 }
 """
 
-# 历史区域样式
-HISTORY_AREA_STYLE = """
-QScrollArea {
+# 历史记录列表样式（记录行由 HistoryItemDelegate 绘制）
+HISTORY_LIST_STYLE = """
+QListView {
     border: 1px solid #E0E0E0;
     border-radius: 6px;
     background-color: white;
-    padding: 2px;
+    padding: 4px;
 }
 """ + SCROLLBAR_STYLE
 
@@ -227,16 +215,14 @@ QWidget#taskArea {
 }
 """
 
-# 单个任务项样式
-TASK_ITEM_STYLE = """
-QWidget#taskItem {
-    background-color: transparent;
-    padding: 6px 6px;
-}
-QWidget#taskItem:last-child {
-    border-bottom: none;
+# 下载任务列表样式（任务行由 TaskItemDelegate 绘制）
+TASK_LIST_STYLE = """
+QListView {
+    border: none;
+    background: transparent;
+    padding: 4px 4px 8px 4px;
 }
-"""
+""" + SCROLLBAR_STYLE
 
 # 清空按钮样式
 CLEAR_BUTTON_STYLE = """
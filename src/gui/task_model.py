@@ -0,0 +1,187 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRect
+from PyQt6.QtGui import QColor, QPen, QFont
+from PyQt6.QtWidgets import QStyledItemDelegate
+from .styles import COLORS
+
+TaskRole = Qt.ItemDataRole.UserRole + 1
+
+# 进度条颜色：下载中 / 完成 / 已存在 / 失败 / 已取消
+TASK_BAR_COLORS = {
+    'active': '#666666',
+    'success': COLORS['success'],
+    'exists': COLORS['warning'],
+    'failed': COLORS['error'],
+    'canceled': '#999999',
+}
+
+
+class TaskItem:
+    """一个下载任务在列表中的显示状态"""
+    __slots__ = ('task_id', 'url', 'title', 'tooltip', 'status', 'progress', 'state',
+                 'parent_id', 'children', 'expanded')
+
+    def __init__(self, task_id, url, parent_id=None):
+        self.task_id = task_id
+        self.url = url
+        self.title = "正在准备下载..."
+        self.tooltip = ""
+        self.status = "准备下载..."
+        self.progress = 0
+        self.state = 'active'
+        self.parent_id = parent_id  # 播放列表展开后的子任务所属的列表任务
+        self.children = []  # 子任务ID
+        self.expanded = False  # 是否显示子任务
+
+
+class TaskListModel(QAbstractListModel):
+    """下载任务列表，每个任务只保存少量字段，由 TaskItemDelegate 绘制
+
+    播放列表展开后的子任务默认折叠，只在展开列表任务时插入到它的下方。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []  # 当前显示的行
+        self._rows = {}  # task_id -> 行号（只包括显示的行）
+        self._tasks = {}  # task_id -> TaskItem（包括折叠的子任务）
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self._items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.title
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return item.tooltip or None
+        if role == TaskRole:
+            return item
+        return None
+
+    def reset_tasks(self, tasks):
+        """用 (task_id, url) 列表替换全部任务"""
+        self.beginResetModel()
+        self._items = [TaskItem(task_id, url) for task_id, url in tasks]
+        self._tasks = {item.task_id: item for item in self._items}
+        self._reindex()
+        self.endResetModel()
+
+    def _reindex(self):
+        self._rows = {item.task_id: row for row, item in enumerate(self._items)}
+
+    def get(self, task_id):
+        return self._tasks.get(task_id)
+
+    def items(self):
+        return list(self._tasks.values())
+
+    def add_children(self, parent_id, children):
+        """为列表任务添加子任务，children 为 [(task_id, url, 标题)]"""
+        parent = self._tasks.get(parent_id)
+        if parent is None:
+            return
+        for task_id, url, title in children:
+            item = TaskItem(task_id, url, parent_id)
+            item.title = title
+            item.status = "排队中..."
+            self._tasks[task_id] = item
+            parent.children.append(task_id)
+        if parent.expanded:
+            self._show_children(parent)
+        self.update_task(parent_id)
+
+    def toggle(self, task_id):
+        """展开或折叠列表任务的子任务"""
+        parent = self._tasks.get(task_id)
+        if parent is None or not parent.children:
+            return
+        if parent.expanded:
+            row = self._rows[task_id]
+            self.beginRemoveRows(QModelIndex(), row + 1, row + len(parent.children))
+            del self._items[row + 1:row + 1 + len(parent.children)]
+            parent.expanded = False
+            self._reindex()
+            self.endRemoveRows()
+        else:
+            parent.expanded = True
+            self._show_children(parent)
+        self.update_task(task_id)
+
+    def _show_children(self, parent):
+        row = self._rows[parent.task_id] + 1
+        shown = sum(1 for task_id in parent.children if task_id in self._rows)
+        new = [self._tasks[task_id] for task_id in parent.children[shown:]]
+        if not new:
+            return
+        self.beginInsertRows(QModelIndex(), row + shown, row + shown + len(new) - 1)
+        self._items[row + shown:row + shown] = new
+        self._reindex()
+        self.endInsertRows()
+
+    def update_task(self, task_id, **fields):
+        """修改任务的显示字段，只刷新对应的一行（折叠的子任务不需要刷新）"""
+        item = self._tasks.get(task_id)
+        if item is None:
+            return
+        for name, value in fields.items():
+            setattr(item, name, value)
+        row = self._rows.get(task_id)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class TaskItemDelegate(QStyledItemDelegate):
+    """绘制任务行：上方是标题，下方是细进度条和状态文本"""
+    ROW_HEIGHT = 46
+    MARGIN_X = 8
+    MARGIN_Y = 4
+    STATUS_MIN_WIDTH = 200
+    CHILD_INDENT = 20
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        item = index.data(TaskRole)
+        if item is None:
+            return
+        painter.save()
+        font = QFont(option.font)
+        font.setPointSize(11)  # 与历史记录一致
+        painter.setFont(font)
+        metrics = painter.fontMetrics()
+
+        indent = self.CHILD_INDENT if item.parent_id else 0
+        rect = option.rect.adjusted(self.MARGIN_X + indent, self.MARGIN_Y, -self.MARGIN_X, -self.MARGIN_Y)
+        line_height = rect.height() // 2
+
+        # 标题，有子任务的列表任务前显示展开/折叠标记
+        title = item.title
+        if item.children:
+            title = f"{'▾' if item.expanded else '▸'} {title}"
+        title_rect = QRect(rect.left(), rect.top(), rect.width(), line_height)
+        painter.setPen(QColor(COLORS['text'] if not item.parent_id else COLORS['text_secondary']))
+        painter.drawText(title_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         metrics.elidedText(title, Qt.TextElideMode.ElideRight, title_rect.width()))
+
+        # 进度条占约三分之二宽度，其余显示状态
+        status_width = max(self.STATUS_MIN_WIDTH, rect.width() // 3)
+        bar_width = max(0, rect.width() - status_width - 5)
+        bar_top = rect.top() + line_height + line_height // 2 - 1
+        painter.fillRect(QRect(rect.left(), bar_top, bar_width, 2), QColor('#F5F5F5'))
+        painter.fillRect(QRect(rect.left(), bar_top, bar_width * item.progress // 100, 2),
+                         QColor(TASK_BAR_COLORS.get(item.state, TASK_BAR_COLORS['active'])))
+
+        status_rect = QRect(rect.right() - status_width, rect.top() + line_height, status_width, line_height)
+        painter.setPen(QColor(COLORS['text']))
+        painter.drawText(status_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         metrics.elidedText(item.status, Qt.TextElideMode.ElideRight, status_rect.width()))
+
+        # 行之间的分隔线
+        painter.setPen(QPen(QColor(COLORS['border'])))
+        painter.drawLine(option.rect.left() + self.MARGIN_X, option.rect.bottom(),
+                         option.rect.right() - self.MARGIN_X, option.rect.bottom())
+        painter.restore()
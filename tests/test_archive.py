@@ -0,0 +1,39 @@
+from core.archive import DownloadArchive, format_key, YOUTUBE_EXTRACTOR
+
+
+def test_format_key():
+    assert format_key(["--newline", "-o", "%(title)s.%(ext)s"]) == ""
+    assert format_key(["-f", "ba/b", "-x", "--audio-format", "mp3"]) == "-f ba/b -x --audio-format mp3"
+
+
+def test_formats_are_recorded_separately(tmp_path):
+    archive = DownloadArchive(tmp_path / "archives")
+    root = str(tmp_path / "videos")
+    audio = format_key(["-f", "ba/b", "-x", "--audio-format", "mp3"])
+    archive.add(root, YOUTUBE_EXTRACTOR, "dQw4w9WgXcQ")
+    assert archive.contains(root, YOUTUBE_EXTRACTOR, "dQw4w9WgXcQ")
+    assert not archive.contains(root, YOUTUBE_EXTRACTOR, "dQw4w9WgXcQ", audio)
+    assert not archive.contains(str(tmp_path / "other"), YOUTUBE_EXTRACTOR, "dQw4w9WgXcQ")
+
+
+def test_reloads_when_file_changes(tmp_path):
+    archive = DownloadArchive(tmp_path / "archives")
+    root = str(tmp_path)
+    assert archive.count(root) == 0
+    # yt-dlp 在下载完成后直接追加记录文件
+    with open(archive.archive_file(root), 'a', encoding='utf-8') as f:
+        f.write("youtube aaaaaaaaaaa\nyoutube bbbbbbbbbbb\n")
+    assert archive.count(root) == 2
+    assert archive.contains(root, "YouTube", "bbbbbbbbbbb")
+
+
+def test_clear_removes_all_formats(tmp_path):
+    archive = DownloadArchive(tmp_path / "archives")
+    root = str(tmp_path / "videos")
+    archive.add(root, YOUTUBE_EXTRACTOR, "aaaaaaaaaaa")
+    archive.add(root, YOUTUBE_EXTRACTOR, "aaaaaaaaaaa", "-f ba/b -x")
+    archive.add(str(tmp_path / "other"), YOUTUBE_EXTRACTOR, "aaaaaaaaaaa")
+    assert archive.clear(root) == 2
+    assert not archive.contains(root, YOUTUBE_EXTRACTOR, "aaaaaaaaaaa")
+    assert not archive.contains(root, YOUTUBE_EXTRACTOR, "aaaaaaaaaaa", "-f ba/b -x")
+    assert archive.contains(str(tmp_path / "other"), YOUTUBE_EXTRACTOR, "aaaaaaaaaaa")
@@ -0,0 +1,45 @@
+import os
+import stat
+
+from core.cookies import CookieJarCache, remove_copy
+
+
+def _cache_with_cookies(tmp_path):
+    cache = CookieJarCache(tmp_path / "cookies")
+    exported = tmp_path / "exported.txt"
+    exported.write_text("# Netscape HTTP Cookie File\n.youtube.com\tTRUE\t/\tTRUE\t0\tSID\tabc\n")
+    assert cache._store("firefox", exported, None)
+    return cache
+
+
+def test_each_process_gets_private_copy(tmp_path):
+    cache = _cache_with_cookies(tmp_path)
+    original = cache.cookie_file("firefox")
+    first_args, first = cache.process_cookie_args("firefox")
+    second_args, second = cache.process_cookie_args("firefox")
+
+    assert first_args == ["--cookies", first]
+    assert first != second and first != str(original)
+    assert stat.S_IMODE(os.stat(first).st_mode) == 0o600
+
+    # yt-dlp 退出时会改写自己的副本，不能影响缓存文件
+    with open(first, 'w') as f:
+        f.write("")
+    assert "SID" in original.read_text()
+
+    remove_copy(first)
+    remove_copy(second)
+    assert not os.path.exists(first) and not os.path.exists(second)
+
+
+def test_falls_back_to_browser_without_cache(tmp_path):
+    cache = CookieJarCache(tmp_path / "cookies")
+    assert cache.process_cookie_args("firefox") == (["--cookies-from-browser", "firefox"], None)
+
+
+def test_leftover_copies_are_removed(tmp_path):
+    cache = _cache_with_cookies(tmp_path)
+    args, copy = cache.process_cookie_args("firefox")
+    CookieJarCache(tmp_path / "cookies")
+    assert not os.path.exists(copy)
+    assert cache.is_valid("firefox")
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+QProcess = QtCore.QProcess
+
+from core.downloader import Downloader, shown_url_matches
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+LONG_URL = "https://example.com/watch?" + "&".join(f"param{i}=value{i}" for i in range(12))
+
+
+def _shown(url):
+    # yt-dlp 非 verbose 模式下的 truncate_string(url, 100, 20)
+    return url if len(url) <= 120 else f"{url[:97]}...{url[-20:]}"
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path))  # 不启动 yt-dlp 探测进程
+    downloader = Downloader()
+    downloader.use_archive = False
+    finished = []
+    downloader.download_finished.connect(lambda *args: finished.append(args))
+    yield downloader, finished
+
+
+def _start_batch(downloader, urls):
+    members = [{'task_id': f"Task-{i}", 'url': url, 'video_id': video_id, 'output_path': "/tmp",
+                'archive_format': ""} for i, (url, video_id) in enumerate(urls, 1)]
+    process = QProcess()
+    process.setProperty("task_id", members[0]['task_id'])
+    downloader.batch_jobs[process] = {'members': members, 'current': 0, 'started': False,
+                                      'failed': set(), 'archived': set(), 'batch_file': "/nonexistent"}
+    return process
+
+
+def _results(finished):
+    return {task_id: (success, message) for success, message, title, task_id in finished}
+
+
+def test_shown_url_matches():
+    assert shown_url_matches("https://a.com/x", "https://a.com/x")
+    assert len(LONG_URL) > 120
+    assert shown_url_matches(LONG_URL, _shown(LONG_URL))
+    assert not shown_url_matches(LONG_URL + "x", _shown(LONG_URL))
+
+
+def test_members_are_finished_exactly_once(downloader):
+    downloader, finished = downloader
+    process = _start_batch(downloader, [
+        (LONG_URL, ""),                                          # 链接过长，被截断显示
+        ("https://www.youtube.com/watch?v=bbbbbbbbbbb", "bbbbbbbbbbb"),  # 已记录在下载记录中
+        ("https://example.com/skipped.mp4", ""),                 # 没有任何输出
+        (LONG_URL, ""),                                          # 重复的链接
+        ("https://example.com/missing.mp4", ""),
+    ])
+    for line in [
+        f"[generic] Extracting URL: {_shown(LONG_URL)}",
+        "[info] long: Downloading 1 format(s): mp4",
+        "[download] bbbbbbbbbbb: has already been recorded in the archive",
+        f"[generic] Extracting URL: {_shown(LONG_URL)}",
+        "[download] Destination: /tmp/long.mp4",
+        "[generic] Extracting URL: https://example.com/missing.mp4",
+        "ERROR: [generic] Unable to download webpage: HTTP Error 404: Not Found",
+    ]:
+        downloader._handle_line(process, line)
+    downloader._finish_batch(process, 1, QProcess.ExitStatus.NormalExit)
+
+    assert len(finished) == 5
+    assert _results(finished) == {
+        "Task-1": (True, "下载完成"),
+        "Task-2": (True, "已存在于下载记录中"),
+        "Task-3": (True, "已跳过"),
+        "Task-4": (True, "下载完成"),
+        "Task-5": (False, "下载失败"),
+    }
+
+
+def test_error_belongs_to_truncated_member(downloader):
+    downloader, finished = downloader
+    process = _start_batch(downloader, [("https://example.com/a.mp4", ""), (LONG_URL, "")])
+    for line in [
+        "[generic] Extracting URL: https://example.com/a.mp4",
+        "ERROR: [generic] Unable to download webpage: HTTP Error 404: Not Found",
+        f"[generic] Extracting URL: {_shown(LONG_URL)}",
+        "[download] Destination: /tmp/long.mp4",
+    ]:
+        downloader._handle_line(process, line)
+    downloader._finish_batch(process, 1, QProcess.ExitStatus.NormalExit)
+    assert _results(finished) == {"Task-1": (False, "下载失败"), "Task-2": (True, "下载完成")}
+
+
+@pytest.mark.parametrize("exit_code, status, expected", [
+    (0, QProcess.ExitStatus.NormalExit, (True, "已跳过")),
+    (1, QProcess.ExitStatus.NormalExit, (False, "下载失败")),
+    (0, QProcess.ExitStatus.CrashExit, (False, "下载失败")),
+])
+def test_trailing_members_without_output(downloader, exit_code, status, expected):
+    downloader, finished = downloader
+    process = _start_batch(downloader, [("https://example.com/a.mp4", ""), ("https://example.com/b.mp4", "")])
+    downloader._handle_line(process, "[generic] Extracting URL: https://example.com/a.mp4")
+    downloader._finish_batch(process, exit_code, status)
+    assert len(finished) == 2
+    assert _results(finished)["Task-2"] == expected
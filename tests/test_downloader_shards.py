@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+QProcess = QtCore.QProcess
+
+from core.downloader import Downloader
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path))  # 不启动 yt-dlp 探测进程
+    downloader = Downloader()
+    downloader.embedded_engine = None
+    downloader.shard_size = 2
+    downloader.max_parallel = 1
+    downloader._schedule_next = lambda: None
+    finished = []
+    downloader.download_finished.connect(lambda *args: finished.append(args))
+    yield downloader, finished
+
+
+def _finish_shard_process(downloader, shard, exit_code, error=False):
+    process = QProcess()
+    process.setProperty("task_id", shard['task_id'])
+    process.setProperty("shard_of", shard['shard_of'])
+    process.setProperty("is_playlist", True)
+    process.setProperty("error_seen", error)
+    downloader._update_shard(process, position=2, selected=1, total=1, name="列表")
+    downloader._handle_finished(process, exit_code, QProcess.ExitStatus.NormalExit)
+
+
+@pytest.mark.parametrize("exit_code, error, message", [
+    (0, False, "下载完成"),
+    (1, False, "下载完成，1段出错"),
+    (0, True, "下载完成，1段出错"),
+])
+def test_failed_shards_are_counted(downloader, tmp_path, exit_code, error, message):
+    downloader, finished = downloader
+    task = {'task_id': "task-1", 'url': "https://www.youtube.com/playlist?list=PLx", 'output_path': str(tmp_path),
+            'args': [], 'browser': "firefox", 'is_playlist': True, 'video_id': "", 'sync': False, 'parent': None}
+    downloader._start_sharding(task)
+    shard = downloader.pending_tasks.popleft()
+    _finish_shard_process(downloader, shard, exit_code, error)
+    assert finished == [(True, message, "列表 (列表, 共1个视频)", "task-1")]
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from core.downloader import Downloader
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path))  # 不启动 yt-dlp 探测进程
+    downloader = Downloader()
+    downloader.download_paths["task-1"] = str(tmp_path)
+    return downloader
+
+
+def test_newest_video_by_upload_date(downloader):
+    # 播放列表的顺序由创建者决定，第一个下载的不一定是最新的
+    downloader._record_file("task-1", "b.mp4", "bbb", upload_date="20240101", playlist_index=1)
+    downloader._record_file("task-1", "c.mp4", "ccc", upload_date="20240301", playlist_index=2)
+    downloader._record_file("task-1", "a.mp4", "aaa", upload_date="20231201", playlist_index=3)
+    assert downloader.get_newest_video("task-1") == "ccc"
+
+
+def test_newest_video_without_dates_uses_playlist_order(downloader):
+    downloader._record_file("task-1", "b.mp4", "bbb", playlist_index=2)
+    downloader._record_file("task-1", "a.mp4", "aaa", playlist_index=1)
+    downloader._record_file("task-1", "x.mp4", "xxx")
+    assert downloader.get_newest_video("task-1") == "aaa"
+
+
+def test_no_newest_video_without_files(downloader):
+    assert downloader.get_newest_video("task-1") is None
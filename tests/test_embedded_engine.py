@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import embedded_engine
+
+pytestmark = pytest.mark.skipif(not embedded_engine.is_available(), reason="未安装 yt_dlp")
+
+
+class _FailingEntry:
+    """代替 _PooledYoutubeDL，下载返回非零的返回码"""
+
+    def __init__(self):
+        self.job = None
+        self.ydl = SimpleNamespace(_download_retcode=0, download=lambda urls: 1)
+
+
+def _run_job(task):
+    engine = embedded_engine.EmbeddedEngine()
+    engine._executor.shutdown()
+    engine._executor = SimpleNamespace(submit=lambda fn, *args: fn(*args))  # 在当前线程中执行
+    engine._acquire = lambda key, output_path, args: _FailingEntry()
+    engine._release = lambda key, entry: None
+    results = []
+    engine.job_finished.connect(lambda task_id, success, message, title: results.append((success, message)))
+    engine.submit(task, ["--yes-playlist"])
+    return results
+
+
+def _task(**fields):
+    return dict({'task_id': "Task-1", 'url': "https://www.youtube.com/@channel", 'output_path': "/tmp",
+                 'is_playlist': True}, **fields)
+
+
+def test_failed_sync_playlist_is_reported_as_failed():
+    assert _run_job(_task(sync=True)) == [(False, "下载失败")]
+
+
+def test_playlist_with_errors_still_counts_as_finished():
+    assert _run_job(_task()) == [(True, "下载完成")]
@@ -0,0 +1,31 @@
+from core.line_reader import LineReader
+
+
+def test_splits_lines_across_reads():
+    reader = LineReader()
+    assert reader.feed(b"[download] first\n[download] sec") == ["[download] first"]
+    assert reader.feed(b"ond\r[download]  50.0%\r\n\n") == ["[download] second", "[download]  50.0%"]
+    assert reader.flush() == []
+
+
+def test_cjk_character_split_across_reads():
+    data = "[download] 下载完成\n".encode('utf-8')
+    reader = LineReader()
+    lines = []
+    # 逐字节读取，每个汉字都会被截断在两次读取之间
+    for i in range(len(data)):
+        lines.extend(reader.feed(data[i:i + 1]))
+    assert lines == ["[download] 下载完成"]
+
+
+def test_flush_returns_incomplete_line():
+    reader = LineReader()
+    assert reader.feed("最后一行".encode('utf-8')[:-1]) == []
+    assert reader.flush() == ["最后一�"]
+
+
+def test_line_length_cap():
+    reader = LineReader(max_line_length=10)
+    assert reader.feed(b"a" * 25) == ["a" * 10, "a" * 10]
+    assert reader.feed(b"bb\nc") == ["a" * 5 + "bb"]
+    assert reader.flush() == ["c"]
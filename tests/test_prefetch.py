@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+
+from core.config import get_config
+from core.prefetch import InfoPrefetcher
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.fixture
+def prefetcher(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", str(tmp_path))  # 没有 yt-dlp，预取只排队不启动
+    prefetcher = InfoPrefetcher(get_config())
+    prefetcher.enabled = True
+    return prefetcher
+
+
+def test_claimed_url_is_not_prefetched_until_released(prefetcher):
+    prefetcher.schedule([URL])
+    prefetcher.flush()
+    assert prefetcher.is_pending(URL)
+
+    # 开始下载：排队中的预取不再启动，输入框变化后也不会重新加入
+    assert prefetcher.claim(URL, "Task-1") is False
+    assert prefetcher.claim(URL, "Task-2") is False
+    prefetcher.flush()
+    assert not prefetcher.is_pending(URL)
+
+    prefetcher.release("Task-1")
+    prefetcher.flush()
+    assert not prefetcher.is_pending(URL)  # 仍有任务在下载该链接
+
+    prefetcher.release("Task-2")
+    prefetcher.flush()
+    assert prefetcher.is_pending(URL)
@@ -0,0 +1,42 @@
+from core.progress import parse_line
+
+
+def test_parse_progress():
+    record = parse_line("[yg-progress]downloading\t1024\tNA\t4096\t512.5\t6\t2\tdQw4w9WgXcQ")
+    assert record.kind == 'progress'
+    assert record.status == 'downloading'
+    assert record.downloaded_bytes == 1024
+    assert record.total_bytes == 4096  # 没有总大小时使用估计值
+    assert record.speed == 512.5
+    assert record.eta == 6
+    assert record.playlist_index == 2
+    assert record.video_id == "dQw4w9WgXcQ"
+    assert record.percent == 25.0
+
+
+def test_parse_progress_missing_fields():
+    record = parse_line("[yg-progress]downloading\t1024\tNA\tNA\tNA\tNA\tNA\tNA")
+    assert record.total_bytes == 0
+    assert record.eta is None
+    assert record.video_id == ""
+    assert record.percent == 0.0
+
+
+def test_parse_item_title_with_separator():
+    record = parse_line("[yg-item]3\t10\tabc\ttitle\twith tab")
+    assert (record.kind, record.playlist_index, record.playlist_count) == ('item', 3, 10)
+    assert record.title == "title\twith tab"
+
+
+def test_parse_file():
+    record = parse_line("[yg-file]abc\t20240102\t3\t/tmp/视频\t[abc].mp4")
+    assert (record.kind, record.video_id, record.filepath) == ('file', 'abc', "/tmp/视频\t[abc].mp4")
+    assert (record.upload_date, record.playlist_index) == ("20240102", 3)
+    record = parse_line("[yg-file]abc\tNA\tNA\t/tmp/a.mp4")
+    assert (record.upload_date, record.playlist_index) == ("", 0)
+
+
+def test_other_lines_are_ignored():
+    assert parse_line("[download]  50.0% of 10.00MiB") is None
+    assert parse_line("[yg-progress]downloading\t1") is None
+    assert parse_line("[yg-unknown]x") is None
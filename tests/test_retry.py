@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from core.retry import (FailureClassifier, RetryPolicy, classify_line, retry_after_hint,
+                        RETRYABLE, RATE_LIMITED, AUTH, PERMANENT, STALLED)
+
+
+@pytest.mark.parametrize("line, kind", [
+    ("ERROR: unable to download video data: HTTP Error 503: Service Unavailable", RETRYABLE),
+    ("ERROR: fragment 3 not found, unable to continue", RETRYABLE),
+    ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", RATE_LIMITED),
+    ("ERROR: [youtube] abc: Video unavailable. This content isn't available, try again later.", RATE_LIMITED),
+    ("ERROR: [youtube] abc: Sign in to confirm your age", AUTH),
+    ("ERROR: [youtube] abc: Video unavailable", PERMANENT),
+    ("ERROR: Requested format is not available (fragment)", PERMANENT),
+    ("ERROR: [youtube] abc: Please log in to view this video", AUTH),
+    ("ERROR: Use --cookies-from-browser to login before downloading", AUTH),
+    ("ERROR: unable to read catalog in response: HTTP Error 503", RETRYABLE),
+    ("ERROR: something nobody has seen before", None),
+])
+def test_classify_line(line, kind):
+    assert classify_line(line) == kind
+
+
+def test_permanent_takes_precedence_over_retryable():
+    # 同一行中同时出现时取更严重的类型
+    assert classify_line("ERROR: HTTP Error 404: Not Found (timed out)") == PERMANENT
+    classifier = FailureClassifier()
+    classifier.feed("ERROR: HTTP Error 503: Service Unavailable")
+    classifier.feed("ERROR: [youtube] abc: Private video")
+    classifier.feed("ERROR: HTTP Error 503: Service Unavailable")
+    assert classifier.kind == AUTH
+
+
+def test_warnings_do_not_set_kind():
+    classifier = FailureClassifier()
+    classifier.feed("WARNING: [youtube] HTTP Error 429: Too Many Requests. Retry-After: 30")
+    assert classifier.kind is None
+    assert classifier.retry_after == 30
+
+
+def test_stalled_is_not_overridden():
+    classifier = FailureClassifier()
+    classifier.mark_stalled()
+    classifier.feed("ERROR: [youtube] abc: Video unavailable")
+    assert classifier.kind == STALLED
+
+
+def test_retry_after_hint():
+    assert retry_after_hint("Retry-After: 120") == 120
+    assert retry_after_hint("please try again in 5 minutes") == 300
+    assert retry_after_hint("HTTP Error 429") is None
+
+
+@pytest.mark.parametrize("kind, base", [(RETRYABLE, 5), (STALLED, 5), (RATE_LIMITED, 20)])
+def test_backoff_bounds(kind, base):
+    random.seed(0)
+    policy = RetryPolicy(max_retries=3, base_delay=5, max_delay=300)
+    for attempt in range(1, 4):
+        full = min(300, base * 2 ** (attempt - 1))
+        for _ in range(50):
+            assert full / 2 <= policy.delay(kind, attempt) <= full
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(max_retries=20, base_delay=5, max_delay=60)
+    assert all(policy.delay(RETRYABLE, 15) <= 60 for _ in range(50))
+
+
+def test_no_retry_for_permanent_failures_or_after_limit():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.delay(PERMANENT, 1) is None
+    assert policy.delay(AUTH, 1) is None
+    assert policy.delay(None, 1) is None
+    assert policy.delay(RETRYABLE, 3) is None
+
+
+def test_retry_after_is_capped():
+    policy = RetryPolicy(max_delay=300)
+    assert policy.delay(RATE_LIMITED, 1, retry_after=30) == 30
+    assert policy.delay(RATE_LIMITED, 1, retry_after=86400) == 300